@@ -0,0 +1,66 @@
+# Benchmark of the time to start up for different uses of the package.
+#
+# Each case is run in a fresh Python interpreter, so nothing is already
+# imported, and the time reported is the median wall time of running
+# the interpreter, including the time to start Python itself, which is
+# reported on the first line for reference. Bokeh, pyserial, and
+# pandas are only imported when a use needs them, so checking inputs
+# on the command line or streaming data without the dashboard does not
+# pay for them.
+#
+# Usage:
+#
+#   python bench_import.py
+
+import statistics
+import subprocess
+import sys
+import time
+
+cases = [
+    ("python alone", "pass"),
+    ("import serial_dashboard", "import serial_dashboard"),
+    (
+        "CLI input checks",
+        "from serial_dashboard.scripts import serialdashboard as s; "
+        "s._check_inputs_cli(115200, 10, 'comma', 'none', 'ms', 'none', 400, "
+        "'lines', 'ascii', 'memory', 'auto', 'separate', 1000, 'async', '', 1, "
+        "20, 90, 1000, '', 1.0)",
+    ),
+    ("serialdashboard --help", None),
+    ("headless streaming", "import serial_dashboard; serial_dashboard.stream"),
+    ("dashboard", "import serial_dashboard; serial_dashboard.launch"),
+    (
+        "dashboard and pandas",
+        "import serial_dashboard; serial_dashboard.launch; import pandas",
+    ),
+]
+
+
+def bench_startup(code, n_runs=7):
+    """Median wall time in seconds of running `code` in a fresh
+    interpreter. If `code` is None, the command line interface is run
+    with --help."""
+    if code is None:
+        args = [
+            sys.executable,
+            "-c",
+            "from serial_dashboard.scripts.serialdashboard import cli; cli()",
+            "--help",
+        ]
+    else:
+        args = [sys.executable, "-c", code]
+
+    times = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    print(f"{'use':>24} {'ms':>8}")
+    for name, code in cases:
+        print(f"{name:>24} {1000 * bench_startup(code):8.0f}")
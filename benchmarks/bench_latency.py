@@ -0,0 +1,66 @@
+# Benchmark of the latency the dashboard adds to a round trip.
+#
+# The device is a pyserial loopback port, which sends back everything
+# written to it at once, so that the latency measured is that of the
+# dashboard alone. Tagged commands are sent through the write queue of
+# the connection by a `latency.LatencyProbe`, as the "probe latency"
+# button does, while `comms.daq_stream()` reads the port every
+# `daq_delay` milliseconds and passes what it reads to the probe. The
+# percentiles reported are of the time from the start of the write of a
+# command until its tag is read back.
+#
+# Usage:
+#
+#   python bench_latency.py
+#
+# The time until the browser shows an update is not measured here, since
+# it needs a browser. It is shown in the dashboard after probing.
+
+import asyncio
+
+import serial
+
+import serial_dashboard
+from serial_dashboard import comms
+
+
+async def _probe(plotter, monitor, serial_connection, n_probes, interval):
+    """Send probes and wait until they are all back or lost."""
+    task = asyncio.create_task(comms.daq_stream(plotter, monitor, serial_connection))
+    serial_connection.write_queue.start()
+
+    probe = serial_connection.latency_probe
+    serial_connection.write_queue.put(probe.steps(n_probes, interval))
+
+    while (
+        len(serial_connection.write_queue) > 0
+        or probe.n_sent < n_probes
+        or probe.pending() > 0
+    ):
+        await asyncio.sleep(0.1)
+
+    serial_connection.write_queue.stop()
+    task.cancel()
+
+
+def bench_latency(daq_delay, n_probes=200, interval=20):
+    """Percentiles of the read latency in milliseconds."""
+    plotter = serial_dashboard.SerialPlotter(max_cols=1)
+    monitor = serial_dashboard.SerialMonitor()
+
+    serial_connection = serial_dashboard.SerialConnection(daq_delay=daq_delay)
+    serial_connection.ser = serial.serial_for_url("loop://", timeout=0)
+    serial_connection.baudrate = serial_connection.ser.baudrate
+    serial_connection.latency_probe.reset()
+
+    asyncio.run(_probe(plotter, monitor, serial_connection, n_probes, interval))
+
+    return serial_connection.latency_probe.summary()
+
+
+if __name__ == "__main__":
+    print(f"{'daq delay (ms)':>14} {'p50':>6} {'p95':>6} {'p99':>6} {'lost':>5}")
+    for daq_delay in [1, 5, 20, 50]:
+        summary = bench_latency(daq_delay)
+        p50, p95, p99 = summary["read"]
+        print(f"{daq_delay:14d} {p50:6.1f} {p95:6.1f} {p99:6.1f} {summary['lost']:5d}")
@@ -0,0 +1,97 @@
+# Benchmark of parsing reads of delimited data.
+#
+# Reads of lines of comma-separated numbers are parsed with
+# `parsers.parse_read()`, as `comms.daq_stream()` does for each chunk
+# read from the device. The time reported is the median time per line,
+# without accounting for parse errors and with accounting into a
+# `parsers.ParseErrors` instance, for clean data and for data in which
+# one line in a hundred has a field that is not a number and one in a
+# hundred has a byte that is not valid UTF-8. The difference between
+# the two columns is the overhead of the accounting.
+#
+# Also reported is the time per line for lines of `key:value` pairs
+# parsed with a `parsers.ColumnLayout`, which detects the keys on the
+# first line and parses the lines that follow with a compiled regular
+# expression, compared with plain lines with the same values.
+#
+# Usage:
+#
+#   python bench_parse.py
+
+import statistics
+import time
+
+import numpy as np
+
+from serial_dashboard import parsers
+
+
+def _read(n_lines, n_cols, bad_every=None):
+    """Bytes of `n_lines` lines of `n_cols` columns. If `bad_every` is
+    not None, every `bad_every` lines one has a field that is not a
+    number and another has an invalid byte."""
+    rng = np.random.default_rng(0)
+    lines = []
+    for i in range(n_lines):
+        fields = [str(i)] + [f"{x:.4f}" for x in rng.normal(size=n_cols - 1)]
+        line = ",".join(fields).encode()
+
+        if bad_every is not None and i % bad_every == 0:
+            line = line.replace(b",", b",oops", 1)
+        elif bad_every is not None and i % bad_every == bad_every // 2:
+            line = line.replace(b",", b",\xff", 1)
+
+        lines.append(line)
+
+    return b"\n".join(lines) + b"\n"
+
+
+def _keyvalue_read(n_lines, n_cols):
+    """Bytes of `n_lines` lines of `n_cols` `key:value` pairs."""
+    rng = np.random.default_rng(0)
+    lines = []
+    for i in range(n_lines):
+        values = [str(i)] + [f"{x:.4f}" for x in rng.normal(size=n_cols - 1)]
+        lines.append(",".join(f"ch{j}:{x}" for j, x in enumerate(values)).encode())
+
+    return b"\n".join(lines) + b"\n"
+
+
+def bench_parse(read, n_lines, errors, layout=None, n_runs=21):
+    """Median time per line in microseconds of parsing `read`."""
+    times = []
+    for _ in range(n_runs):
+        if errors is not None:
+            errors.reset()
+
+        if layout is not None:
+            layout.reset()
+
+        start = time.perf_counter()
+        parsers.parse_read(read, sep=",", errors=errors, layout=layout)
+        times.append(time.perf_counter() - start)
+
+    return 1e6 * statistics.median(times) / n_lines
+
+
+if __name__ == "__main__":
+    n_lines = 10000
+    print(f"{'columns':>8} {'data':>6} {'µs/line':>8} {'counted':>8}")
+    for n_cols in [3, 10, 32]:
+        for name, bad_every in [("clean", None), ("dirty", 100)]:
+            read = _read(n_lines, n_cols, bad_every=bad_every)
+            plain = bench_parse(read, n_lines, None)
+            counted = bench_parse(read, n_lines, parsers.ParseErrors())
+            print(f"{n_cols:8d} {name:>6} {plain:8.2f} {counted:8.2f}")
+
+    print()
+    print(f"{'columns':>8} {'plain':>8} {'keyvalue':>8}")
+    for n_cols in [3, 10, 32]:
+        plain = bench_parse(_read(n_lines, n_cols), n_lines, None)
+        keyvalue = bench_parse(
+            _keyvalue_read(n_lines, n_cols),
+            n_lines,
+            None,
+            layout=parsers.ColumnLayout(),
+        )
+        print(f"{n_cols:8d} {plain:8.2f} {keyvalue:8.2f}")
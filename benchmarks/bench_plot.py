@@ -0,0 +1,128 @@
+# Benchmark of the server-side cost of updating the plotter.
+#
+# For each combination of number of columns and rollover, the plot is
+# first filled to its rollover and then updated repeatedly with a
+# fixed number of new rows per update, as happens each `streamdelay`
+# milliseconds in a running dashboard. The time reported is the mean
+# wall time of `callbacks.stream_update()`, which converts the new rows
+# and streams them into the ColumnDataSources of the plot, for both
+# separate and batched glyphs. Also reported is the size of the
+# messages sent to the browser per plotted value, as sent and as
+# compressed with permessage-deflate at the default level of 1.
+#
+# Usage:
+#
+#   python bench_plot.py
+#
+# This measures only the Python side. Rendering time in the browser
+# depends on the browser and the GPU.
+
+import time
+import zlib
+
+import numpy as np
+
+import bokeh.document
+import bokeh.protocol
+
+import serial_dashboard
+from serial_dashboard import callbacks
+
+
+def _rows(n_rows, n_cols, start):
+    """Rows like those produced by parsers.parse_read(), with the time
+    in milliseconds in the first column."""
+    t = np.arange(start, start + n_rows)
+    return [
+        [int(ti)] + [float(x) for x in np.sin(ti / 100 + np.arange(n_cols - 1))]
+        for ti in t
+    ]
+
+
+def _message_sizes(events):
+    """Size in bytes of the message sent to the browser for a list of
+    document events, uncompressed and compressed with raw deflate, as
+    permessage-deflate does."""
+    msg = bokeh.protocol.Protocol().create("PATCH-DOC", events)
+    parts = [msg.header_json, msg.content_json] + [
+        buffer.to_bytes() for buffer in msg.buffers
+    ]
+
+    size = 0
+    compressed_size = 0
+    for part in parts:
+        part = part.encode() if isinstance(part, str) else part
+        compressor = zlib.compressobj(1, zlib.DEFLATED, -15)
+        size += len(part)
+        compressed_size += len(compressor.compress(part) + compressor.flush())
+
+    return size, compressed_size
+
+
+def bench_stream_update(
+    n_cols, rollover, renderer="separate", rows_per_update=100, n_updates=20
+):
+    """Mean time in seconds of a plot update of a full plot, and mean
+    bytes per plotted value sent to the browser, uncompressed and
+    compressed."""
+    plotter = serial_dashboard.SerialPlotter(
+        max_cols=n_cols, timecolumn=0, rollover=rollover, renderer=renderer
+    )
+    monitor = serial_dashboard.SerialMonitor()
+    plotter.streaming = True
+
+    doc = bokeh.document.Document()
+    doc.add_root(plotter.plot)
+    callbacks._populate_glyphs(plotter)
+    plotter.history = callbacks._new_history(plotter)
+
+    # Fill the plot up to its rollover
+    plotter.data += _rows(rollover, n_cols, 0)
+    callbacks.stream_update(plotter, monitor, None, None)
+
+    events = []
+    doc.on_change(events.append)
+
+    elapsed = 0.0
+    n_bytes = 0
+    n_compressed_bytes = 0
+    for i in range(n_updates):
+        plotter.data += _rows(
+            rows_per_update, n_cols, rollover + i * rows_per_update
+        )
+
+        start = time.perf_counter()
+        callbacks.stream_update(plotter, monitor, None, None)
+        elapsed += time.perf_counter() - start
+
+        size, compressed_size = _message_sizes(events)
+        n_bytes += size
+        n_compressed_bytes += compressed_size
+        events.clear()
+
+    n_values = n_updates * rows_per_update * (n_cols - 1)
+
+    return elapsed / n_updates, n_bytes / n_values, n_compressed_bytes / n_values
+
+
+if __name__ == "__main__":
+    print(
+        f"{'columns':>8} {'rollover':>9} {'backend':>8} {'renderer':>9} "
+        f"{'ms/update':>10} {'bytes/value':>12} {'deflated':>9}"
+    )
+    for n_cols, rollover in [
+        (3, 400),
+        (10, 3200),
+        (32, 1000),
+        (32, 5000),
+        (32, 20000),
+    ]:
+        for renderer in ["separate", "batched"]:
+            t, n_bytes, n_compressed_bytes = bench_stream_update(
+                n_cols, rollover, renderer=renderer
+            )
+            backend = callbacks._output_backend(rollover, n_cols)
+            print(
+                f"{n_cols:8d} {rollover:9d} {backend:>8} {renderer:>9} "
+                f"{1000 * t:10.2f} {n_bytes:12.1f} {n_compressed_bytes:9.1f}"
+            )
@@ -0,0 +1,104 @@
+# Benchmark of the throughput of the dashboard's data path.
+#
+# A raw capture of lines of comma-separated numbers is written and then
+# replayed as fast as possible through the same path as data from a
+# device: `comms.daq_stream()` reads and parses the bytes and fills the
+# monitor, and `callbacks.stream_update()` updates the plot and monitor
+# every `streamdelay` milliseconds. Since a replay delivers the same
+# bytes in the same chunks on every run, the results are comparable
+# between runs and between versions of the dashboard. The rate
+# reported is the number of lines per second from the start of the
+# replay until all lines have been plotted.
+#
+# Usage:
+#
+#   python bench_replay.py
+#
+# This measures only the Python side. Rendering time in the browser
+# depends on the browser and the GPU.
+
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import bokeh.document
+
+import serial_dashboard
+from serial_dashboard import callbacks
+from serial_dashboard import capture
+from serial_dashboard import comms
+from serial_dashboard import replay
+
+
+def _write_capture(stem, n_lines, n_cols, chunk_lines=100):
+    """Write a raw capture of `n_lines` lines of `n_cols` columns, with
+    the time in milliseconds in the first column."""
+    rng = np.random.default_rng(0)
+    raw_capture = capture.RawCaptureFile(stem)
+    t0 = time.monotonic_ns()
+
+    for start in range(0, n_lines, chunk_lines):
+        t = np.arange(start, min(start + chunk_lines, n_lines))
+        y = rng.normal(size=(len(t), n_cols - 1))
+        lines = "".join(
+            f"{ti}," + ",".join(f"{x:.4f}" for x in row) + "\n"
+            for ti, row in zip(t, y)
+        )
+        raw_capture.append(lines.encode(), t0 + 1_000_000 * start)
+
+    raw_capture.close()
+
+
+async def _replay(plotter, monitor, serial_connection, n_lines, stream_delay):
+    """Replay until all lines are plotted, updating the plot as the
+    dashboard does."""
+    task = asyncio.create_task(comms.daq_stream(plotter, monitor, serial_connection))
+
+    while plotter.prev_data_length < n_lines:
+        await asyncio.sleep(stream_delay / 1000)
+        callbacks.stream_update(plotter, monitor, None, serial_connection)
+
+    task.cancel()
+
+
+def bench_replay(n_cols, n_lines=100000, daq_delay=5, stream_delay=90):
+    """Lines per second and megabytes per second through the data path."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stem = os.path.join(tmpdir, "bench")
+        _write_capture(stem, n_lines, n_cols)
+
+        plotter = serial_dashboard.SerialPlotter(
+            max_cols=n_cols, timecolumn=0, rollover=1000
+        )
+        monitor = serial_dashboard.SerialMonitor()
+        plotter.streaming = True
+        monitor.streaming = True
+
+        doc = bokeh.document.Document()
+        doc.add_root(plotter.plot)
+        callbacks._populate_glyphs(plotter)
+        plotter.history = callbacks._new_history(plotter)
+
+        serial_connection = serial_dashboard.SerialConnection(
+            daq_delay=daq_delay, replay=stem, replay_speed=0
+        )
+        serial_connection.connect(replay.port_prefix + stem)
+        n_bytes = serial_connection.ser.n_bytes
+
+        start = time.perf_counter()
+        asyncio.run(
+            _replay(plotter, monitor, serial_connection, n_lines, stream_delay)
+        )
+        elapsed = time.perf_counter() - start
+
+    return n_lines / elapsed, n_bytes / elapsed / 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'columns':>8} {'lines/s':>10} {'MB/s':>6}")
+    for n_cols in [3, 10, 32]:
+        lines_per_s, mb_per_s = bench_replay(n_cols)
+        print(f"{n_cols:8d} {lines_per_s:10.0f} {mb_per_s:6.2f}")
@@ -2,9 +2,68 @@
 
 """Top-level package for serial-plotter."""
 
-from .dashboard import *
+import importlib
+
+from .options import *
 
 
 __author__ = """Justin Bois"""
 __email__ = "bois@caltech.edu"
 __version__ = "0.1.2"
+
+
+# Names importing Bokeh, pyserial, or the acquisition machinery are
+# only imported when first used, so that the command line interface
+# and headless use start quickly.
+_lazy_names = {
+    "SerialConnection": "connection",
+    "Controls": "dashboard",
+    "SerialPlotter": "dashboard",
+    "SerialMonitor": "dashboard",
+    "app": "dashboard",
+    "launch": "dashboard",
+    "load_profile": "profiles",
+    "stream": "streaming",
+    "Stream": "streaming",
+}
+
+_submodules = (
+    "boards",
+    "callbacks",
+    "capture",
+    "comms",
+    "connection",
+    "dashboard",
+    "derived",
+    "history",
+    "latency",
+    "linestore",
+    "options",
+    "parsers",
+    "profiles",
+    "pump",
+    "replay",
+    "sending",
+    "stats",
+    "streaming",
+    "trigger",
+    "worker",
+)
+
+
+def __getattr__(name):
+    if name in _lazy_names:
+        module = importlib.import_module(f".{_lazy_names[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+
+        return value
+
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_names) | set(_submodules))
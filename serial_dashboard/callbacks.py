@@ -1,15 +1,27 @@
 import asyncio
+import codecs
+import colorsys
 import copy
+import datetime
+import html
 import os
+import re
 
 import serial
 import numpy as np
-import pandas as pd
 
 import bokeh.models
 
+from . import capture
 from . import comms
+from . import derived
+from . import history
 from . import parsers
+from . import replay
+from . import sending
+from . import stats
+from . import trigger
+from . import worker
 
 # Color palette is from colorcet
 _colors = [
@@ -25,6 +37,53 @@ _colors = [
     "#16bdcf",
 ]
 
+# Number of lines shown below a match jumped to in the monitor
+_monitor_context = 5
+
+# Most bytes of a line shown in the monitor, and most characters of
+# lines sent to the browser in one update of it
+_monitor_max_line_bytes = 1000
+_monitor_max_chars = 50000
+
+# Bytes per row of the hex dump of the monitor
+_hex_row_bytes = 16
+
+# Number of points on the plot (rollover times columns) beyond which
+# we render with WebGL instead of on an HTML canvas
+_webgl_threshold = 10000
+
+
+def _palette(n_colors):
+    """Colors for `n_colors` columns.
+
+    The first ten colors are from colorcet. Further colors step through
+    hues by the golden angle, alternating between dark and light, so
+    that neighboring columns are always easy to tell apart.
+    """
+    if n_colors <= len(_colors):
+        return _colors[:n_colors]
+
+    colors = list(_colors)
+    for i in range(n_colors - len(_colors)):
+        hue = (0.1 + i * 0.618033988749895) % 1.0
+        lightness = 0.35 if i % 2 == 0 else 0.6
+        r, g, b = colorsys.hls_to_rgb(hue, lightness, 0.8)
+        colors.append(f"#{int(255 * r):02x}{int(255 * g):02x}{int(255 * b):02x}")
+
+    return colors
+
+
+def _output_backend(rollover, max_cols, choice="auto"):
+    """Output backend for a plot with `rollover` points per column.
+
+    If `choice` is "canvas" or "webgl", that backend is used. If it is
+    "auto", WebGL is used for plots with many points.
+    """
+    if choice != "auto":
+        return choice
+
+    return "webgl" if rollover * max_cols > _webgl_threshold else "canvas"
+
 
 def _update_legend(plotter):
     """Updates entries shown in legend"""
@@ -32,7 +91,16 @@ def _update_legend(plotter):
         x for i, x in enumerate(plotter.col_labels) if i != plotter.time_column
     ]
 
-    if plotter.lines_visible and plotter.dots_visible:
+    # Batched glyphs show all columns in one renderer, so each entry
+    # points to its column's line within the multi_line
+    if plotter.renderer == "batched":
+        plotter.legend.items = [
+            bokeh.models.LegendItem(
+                label=col_label, renderers=[plotter.lines[0]], index=col
+            )
+            for col, col_label in enumerate(active_col_labels[: plotter.max_cols])
+        ]
+    elif plotter.lines_visible and plotter.dots_visible:
         plotter.legend.items = [
             bokeh.models.LegendItem(label=col_label, renderers=[line, dot], index=col)
             for col, (col_label, line, dot) in enumerate(
@@ -52,6 +120,13 @@ def _update_legend(plotter):
             for col, (col_label, dot) in enumerate(zip(active_col_labels, plotter.dots))
         ]
 
+    # Derived channels follow the columns
+    if len(plotter.derived_lines) > 0:
+        plotter.legend.items = plotter.legend.items + [
+            bokeh.models.LegendItem(label=label, renderers=[line])
+            for label, line in zip(plotter.derived.labels, plotter.derived_lines)
+        ]
+
 
 def _glyph_visibility(plotter):
     """Updates visibility of glyphs"""
@@ -60,7 +135,249 @@ def _glyph_visibility(plotter):
         plotter.lines[i].visible = plotter.lines_visible
 
 
-def _populate_glyphs(plotter, colors=_colors):
+def _populate_batched_glyphs(plotter, colors):
+    """Use a single multi_line for the lines and a single scatter for
+    the dots of all columns, regardless of the number of columns."""
+    n_cols = plotter.max_cols
+
+    # Points of each column shown in the plot
+    plotter.batched_t = [np.array([]) for _ in range(n_cols)]
+    plotter.batched_y = [
+        np.array([], dtype=parsers._plot_dtype) for _ in range(n_cols)
+    ]
+
+    plotter.line_source = bokeh.models.ColumnDataSource(
+        data=dict(
+            xs=[[] for _ in range(n_cols)],
+            ys=[[] for _ in range(n_cols)],
+            color=colors[:n_cols],
+        )
+    )
+
+    # Dots are colored by their column number
+    plotter.dot_source = bokeh.models.ColumnDataSource(
+        data=dict(t=[], y=[], channel=[])
+    )
+    color_mapper = bokeh.models.LinearColorMapper(
+        palette=colors[:n_cols], low=-0.5, high=n_cols - 0.5
+    )
+
+    plotter.lines = [
+        plotter.plot.multi_line(
+            source=plotter.line_source, xs="xs", ys="ys", line_color="color"
+        )
+    ]
+
+    plotter.dots = [
+        plotter.plot.scatter(
+            source=plotter.dot_source,
+            x="t",
+            y="y",
+            color={"field": "channel", "transform": color_mapper},
+            size=3,
+        )
+    ]
+
+    _refresh_batched(plotter)
+
+
+def _ring_spans(first, last, n_slots, bridge):
+    """Slices of a ring of `n_slots` slots covering the slots from
+    `first` through `last`, which wrap past the end back to slot
+    `bridge`. Slots before `bridge` copy the end of the ring and are
+    covered when it is."""
+    if first <= last:
+        spans = [slice(first, last + 1)]
+    else:
+        spans = [slice(first, n_slots), slice(0, last + 1)]
+
+    if bridge > 0 and first <= last and last == n_slots - 1:
+        spans.append(slice(0, bridge))
+
+    return spans
+
+
+def _refresh_batched(plotter):
+    """Send the points of all columns to the batched glyphs.
+
+    New points are patched into the glyphs rather than sent in full, so
+    each column has a ring of `batched_capacity` points, the larger of
+    `rollover` and the number of points shown. The line of a column is
+    a ring of `batched_capacity + 2` slots. Slot 0 copies the last slot
+    so that the line continues where the ring wraps, and a NaN after
+    the newest point breaks the line before the oldest. The dots of
+    column `i` are the `i`th block of `batched_capacity` points of the
+    scatter.
+    """
+    capacity = max([plotter.rollover] + [len(t) for t in plotter.batched_t])
+    plotter.batched_capacity = capacity
+    plotter.batched_written = [len(t) for t in plotter.batched_t]
+
+    if plotter.lines_visible:
+        xs = []
+        ys = []
+        for t, y in zip(plotter.batched_t, plotter.batched_y):
+            xs.append(np.full(capacity + 2, np.nan))
+            xs[-1][1 : 1 + len(t)] = t
+            ys.append(np.full(capacity + 2, np.nan, dtype=parsers._plot_dtype))
+            ys[-1][1 : 1 + len(y)] = y
+
+        plotter.line_source.data = dict(
+            xs=xs, ys=ys, color=plotter.line_source.data["color"]
+        )
+
+    if plotter.dots_visible:
+        n_cols = len(plotter.batched_t)
+        t = np.full(n_cols * capacity, np.nan)
+        y = np.full(n_cols * capacity, np.nan, dtype=parsers._plot_dtype)
+        for i, (t_col, y_col) in enumerate(zip(plotter.batched_t, plotter.batched_y)):
+            t[i * capacity : i * capacity + len(t_col)] = t_col
+            y[i * capacity : i * capacity + len(y_col)] = y_col
+
+        plotter.dot_source.data = dict(
+            t=t, y=y, channel=np.repeat(np.arange(n_cols, dtype=np.int32), capacity)
+        )
+
+
+def _ring_spans(first, last, n_slots):
+    """Slices covering the slots of a ring from `first` through `last`,
+    which may wrap past the end of the ring."""
+    first, last = int(first), int(last)
+    if first <= last:
+        return [slice(first, last + 1)]
+
+    return [slice(first, n_slots), slice(0, last + 1)]
+
+
+def _patch_batched(plotter, ty_dicts):
+    """Patch new points into the rings of the batched glyphs, which
+    hold `rollover` points of each column."""
+    rollover = plotter.rollover
+    line_patches = dict(xs=[], ys=[])
+    dot_patches = dict(t=[], y=[])
+
+    for i, ty_dict in enumerate(ty_dicts):
+        t, y = ty_dict["t"], ty_dict["y"]
+        if len(t) == 0:
+            continue
+
+        # Points that would be overwritten in the same update are skipped
+        n_skipped = max(len(t) - rollover, 0)
+        written = plotter.batched_written[i] + n_skipped
+        t, y = t[n_skipped:], y[n_skipped:]
+        plotter.batched_written[i] = written + len(t)
+
+        if plotter.lines_visible:
+            # Slots of the new points and of the NaN after them
+            slots = 1 + (written + np.arange(len(t) + 1)) % (rollover + 1)
+            spans = _ring_spans(slots[0], slots[-1], rollover + 2)
+
+            # The copy of the last slot changes with it
+            if slots[0] <= slots[-1] == rollover + 1:
+                spans.append(slice(0, 1))
+
+            for name, values in (("xs", t), ("ys", y)):
+                ring = plotter.line_source.data[name][i]
+                ring[slots[:-1]] = values
+                ring[slots[-1]] = np.nan
+                ring[0] = ring[-1]
+                line_patches[name] += [((i, span), ring[span]) for span in spans]
+
+        if plotter.dots_visible:
+            slots = (written + np.arange(len(t))) % rollover
+            spans = _ring_spans(slots[0], slots[-1], rollover)
+            start = i * rollover
+
+            for name, values in (("t", t), ("y", y)):
+                ring = plotter.dot_source.data[name][start : start + rollover]
+                ring[slots] = values
+                dot_patches[name] += [
+                    (slice(start + span.start, start + span.stop), ring[span])
+                    for span in spans
+                ]
+
+    if len(line_patches["xs"]) > 0:
+        plotter.line_source.patch(line_patches)
+
+    if len(dot_patches["t"]) > 0:
+        plotter.dot_source.patch(dot_patches)
+
+
+def _stream_plot_data(plotter, ty_dicts):
+    """Stream new points into the plot, keeping the last `rollover`
+    points of each column."""
+    if plotter.renderer != "batched":
+        for i, ty_dict in enumerate(ty_dicts):
+            plotter.sources[i].stream(ty_dict, plotter.rollover)
+
+        return
+
+    if sum(len(ty_dict["t"]) for ty_dict in ty_dicts) == 0:
+        return
+
+    for i, ty_dict in enumerate(ty_dicts):
+        plotter.batched_t[i] = np.concatenate((plotter.batched_t[i], ty_dict["t"]))[
+            -plotter.rollover :
+        ]
+        plotter.batched_y[i] = np.concatenate((plotter.batched_y[i], ty_dict["y"]))[
+            -plotter.rollover :
+        ]
+
+    # A multi_line cannot be streamed to, so new points are patched into
+    # its lines, once they are laid out for `rollover` points
+    if plotter.batched_capacity == plotter.rollover:
+        _patch_batched(plotter, ty_dicts)
+    else:
+        _refresh_batched(plotter)
+
+
+def _replace_plot_data(plotter, ty_dicts):
+    """Replace the points shown in the plot."""
+    if plotter.renderer != "batched":
+        for i, ty_dict in enumerate(ty_dicts):
+            plotter.sources[i].data = ty_dict
+
+        return
+
+    for i in range(plotter.max_cols):
+        if i < len(ty_dicts):
+            plotter.batched_t[i] = np.asarray(ty_dicts[i]["t"], dtype=float)
+            plotter.batched_y[i] = np.asarray(
+                ty_dicts[i]["y"], dtype=parsers._plot_dtype
+            )
+        else:
+            plotter.batched_t[i] = np.array([])
+            plotter.batched_y[i] = np.array([], dtype=parsers._plot_dtype)
+
+    _refresh_batched(plotter)
+
+
+def _last_point(plotter):
+    """Last point of the first column shown in the plot, or None."""
+    if plotter.renderer == "batched":
+        if len(plotter.batched_t) > 0 and len(plotter.batched_t[0]) > 0:
+            return float(plotter.batched_t[0][-1]), float(plotter.batched_y[0][-1])
+    elif len(plotter.sources) > 0 and len(plotter.sources[0].data["t"]) > 0:
+        return (
+            float(plotter.sources[0].data["t"][-1]),
+            float(plotter.sources[0].data["y"][-1]),
+        )
+
+    return None
+
+
+def _populate_glyphs(plotter, colors=None):
+    if colors is None:
+        colors = _palette(plotter.max_cols)
+
+    if plotter.renderer == "batched":
+        _populate_batched_glyphs(plotter, colors)
+        _glyph_visibility(plotter)
+        _populate_derived_glyphs(plotter, colors)
+        plotter.plot.legend.visible = True
+
+        return
+
     # Define the data sources
     plotter.sources = [
         bokeh.models.ColumnDataSource(data=dict(t=[], y=[]))
@@ -82,8 +399,8 @@ def _populate_glyphs(plotter, colors=_colors):
     # Set visibility
     _glyph_visibility(plotter)
 
-    # Make a legend
-    _update_legend(plotter)
+    # Set up derived channels and make a legend
+    _populate_derived_glyphs(plotter, colors)
 
     # Make legend visible
     plotter.plot.legend.visible = True
@@ -93,42 +410,667 @@ def _adjust_time_axis_label(plotter, monitor, controls, serial_connection):
     plotter.plot.xaxis.axis_label = parsers._xaxis_label(
         plotter.time_column, plotter.time_units
     )
+    plotter.spectrum_plot.xaxis.axis_label = derived._frequency_label(
+        plotter.time_column, plotter.time_units
+    )
 
 
-def stream_update(plotter, monitor, controls, serial_connection):
-    if monitor.streaming:
-        monitor.monitor.text = (
-            monitor.monitor.text[:-18]
-            + "".join(monitor.data[monitor.prev_data_length :])
-            + "</pre></div></div>"
+def _populate_derived_glyphs(plotter, colors=None):
+    """Set up glyphs for the derived channels, replacing any previous
+    ones, and update the legends."""
+    if colors is None:
+        colors = _palette(plotter.max_cols)
+
+    plotter.plot.renderers = [
+        renderer
+        for renderer in plotter.plot.renderers
+        if renderer not in plotter.derived_lines
+    ]
+    plotter.spectrum_plot.renderers = []
+
+    plotter.derived_sources = []
+    plotter.derived_lines = []
+    plotter.spectrum_sources = []
+    plotter.spectrum_lines = []
+
+    if plotter.derived is not None:
+        for kind, column, _ in plotter.derived.channels:
+            # Draw in the color of the column it is derived from
+            j = plotter.derived._plot_column(column, plotter.time_column)
+            color = colors[j] if j is not None and j < len(colors) else "gray"
+
+            if kind == "fft":
+                source = bokeh.models.ColumnDataSource(dict(f=[], amplitude=[]))
+                plotter.spectrum_sources.append(source)
+                plotter.spectrum_lines.append(
+                    plotter.spectrum_plot.line(
+                        source=source, x="f", y="amplitude", line_color=color
+                    )
+                )
+            else:
+                source = bokeh.models.ColumnDataSource(dict(t=[], y=[]))
+                plotter.derived_sources.append(source)
+                plotter.derived_lines.append(
+                    plotter.plot.line(
+                        source=source,
+                        x="t",
+                        y="y",
+                        line_color=color,
+                        line_dash="dashed",
+                        line_width=2,
+                    )
+                )
+
+    plotter.spectrum_legend.items = [
+        bokeh.models.LegendItem(label=label, renderers=[line])
+        for label, line in zip(
+            [] if plotter.derived is None else plotter.derived.fft_labels,
+            plotter.spectrum_lines,
         )
+    ]
+    plotter.spectrum_plot.visible = len(plotter.spectrum_lines) > 0
+
+    _update_legend(plotter)
+
+
+def _stream_derived(plotter, t, y, show_lines=True):
+    """Update the derived channels with new rows and show them."""
+    values = plotter.derived.process(t, y, plotter.time_column)
+
+    # Glyphs may not be set up yet
+    if show_lines and len(plotter.derived_sources) == len(values):
+        for source, x in zip(plotter.derived_sources, values):
+            keep = ~np.isnan(x)
+            source.stream(
+                dict(t=t[keep], y=x[keep].astype(parsers._plot_dtype)),
+                plotter.rollover,
+            )
+
+    if len(plotter.spectrum_sources) > 0:
+        spectra = plotter.derived.spectra(plotter.time_column, plotter.time_units)
+        for source, (f, amplitude) in zip(plotter.spectrum_sources, spectra):
+            if len(f) > 0:
+                source.data = dict(
+                    f=f, amplitude=amplitude.astype(parsers._plot_dtype)
+                )
+
+
+def stream_update(plotter, monitor, controls, serial_connection):
+    # Only send updates to the browser if there is something new
+    if monitor.streaming and monitor.data.n_bytes > monitor.prev_data_length:
+        if monitor.regex is not None:
+            _update_matches(monitor)
 
-        monitor.prev_data_length = len(monitor.data)
+        # A window scrolled back to earlier lines does not change
+        if monitor.view_end is None:
+            _render_monitor(monitor)
 
-    # Update plot by streaming in data
-    if plotter.streaming:
-        ty_dicts = parsers.data_to_dicts(
+        monitor.prev_data_length = monitor.data.n_bytes
+
+    # Catch up with columns detected in the data
+    if plotter.layout is not None and plotter.layout.n_changes != plotter.layout_shown:
+        layout_callback(plotter, monitor, controls, serial_connection)
+
+    # Update plot by streaming in data, which wait for a rebuild of the
+    # history so that times are unwrapped in order
+    if (
+        plotter.streaming
+        and plotter.history_rebuild is None
+        and len(plotter.data) > plotter.prev_data_length
+    ):
+        # Host times are plotted in seconds since the first stamp
+        if plotter.time_column == "host" and len(plotter.host_times) > 0:
+            host_times = (
+                np.array(plotter.host_times[plotter.prev_data_length :])
+                - plotter.host_times[0]
+            ) / 1e9
+        else:
+            host_times = None
+
+        t, y = parsers.data_to_arrays(
             plotter.data[plotter.prev_data_length :],
             plotter.max_cols,
             plotter.time_column,
             plotter.time_units,
             plotter.prev_data_length,
+            time_unwrapper=plotter.time_unwrapper,
+            host_times=host_times,
         )
 
-        for i, ty_dict in enumerate(ty_dicts):
-            plotter.sources[i].stream(ty_dict, plotter.rollover)
+        if plotter.history is not None:
+            plotter.history.append(t, y, start=plotter.prev_data_length)
 
-        # Adjust new phantom data point if new data arrived
-        if len(plotter.sources) > 0 and len(plotter.sources[0].data["t"]) > 0:
-            plotter.phantom_source.data = dict(
-                t=[plotter.sources[0].data["t"][-1]],
-                y=[plotter.sources[0].data["y"][-1]],
-            )
+        # Derived channels are not drawn against the times of frames
+        if plotter.derived is not None and len(t) > 0:
+            _stream_derived(plotter, t, y, show_lines=plotter.trigger is None)
+
+        plotter.stats.append(y, _stats_times(plotter, t))
+
+        # With a trigger, the plot only changes when a frame is captured
+        if plotter.trigger is not None:
+            _trigger_update(plotter, controls, t, y)
+
+        # While viewing the history, the sources show the history instead
+        elif not plotter.history_mode:
+            _stream_plot_data(plotter, parsers.arrays_to_dicts(t, y))
+
+            # Adjust new phantom data point if new data arrived
+            last_point = _last_point(plotter)
+            if last_point is not None:
+                plotter.phantom_source.data = dict(
+                    t=[last_point[0]], y=[last_point[1]]
+                )
 
         # Reset the array length
         plotter.prev_data_length = len(plotter.data)
 
 
+def _show_trigger_frame(plotter):
+    """Show the last captured frame in the plot."""
+    if plotter.trigger_frame is None:
+        _replace_plot_data(plotter, [])
+        return
+
+    _replace_plot_data(plotter, parsers.arrays_to_dicts(*plotter.trigger_frame))
+
+    last_point = _last_point(plotter)
+    if last_point is not None:
+        plotter.phantom_source.data = dict(t=[last_point[0]], y=[last_point[1]])
+
+
+def _trigger_status(plotter, controls):
+    """Describe the state of the trigger."""
+    if plotter.trigger is None:
+        text = "Trigger off."
+    else:
+        text = f"Frames captured: {plotter.trigger.n_frames}; "
+        text += "armed." if plotter.trigger.armed else "press arm to capture again."
+
+    text = f'<p style="font-size: 8pt;">{text}</p>'
+    if controls.trigger_status.text != text:
+        controls.trigger_status.text = text
+
+
+def _trigger_update(plotter, controls, t, y):
+    """Search new rows for triggers and show the last captured frame."""
+    frames = plotter.trigger.process(t, y)
+
+    if len(frames) == 0:
+        return
+
+    plotter.trigger_frame = frames[-1][:2]
+
+    if not plotter.history_mode:
+        _show_trigger_frame(plotter)
+
+    _trigger_status(plotter, controls)
+
+
+def _monitor_length(monitor):
+    """Number of lines the monitor can show, which are rows of the hex
+    dump in hex mode and only the lines matching the search when
+    filtering."""
+    if monitor.hex:
+        return -(-monitor.data.n_bytes // _hex_row_bytes)
+
+    if monitor.filter and monitor.regex is not None:
+        return len(monitor.matches)
+
+    return len(monitor.data)
+
+
+def _monitor_window(monitor):
+    """Range of lines in the window ending at `monitor.view_end`."""
+    n_lines = _monitor_length(monitor)
+    end = n_lines if monitor.view_end is None else min(monitor.view_end, n_lines)
+
+    return max(end - monitor.window_lines, 0), end
+
+
+def _render_monitor(monitor):
+    """Send the window of lines ending at `monitor.view_end` to the
+    browser, highlighting matches of the search."""
+    start, end = _monitor_window(monitor)
+
+    if monitor.hex:
+        html_lines = _hex_dump_html(monitor, start, end)
+    else:
+        html_lines = _monitor_lines_html(monitor, start, end)
+
+    # Keep the last lines, up to a total length
+    n_chars = 0
+    for i in range(len(html_lines) - 1, -1, -1):
+        n_chars += len(html_lines[i]) + 1
+        if n_chars > _monitor_max_chars:
+            html_lines = html_lines[i + 1 :]
+            break
+
+    monitor.monitor.text = (
+        monitor.empty_text[:-18] + "\n".join(html_lines) + "</pre></div></div>"
+    )
+
+
+def _monitor_lines_html(monitor, start, end):
+    """Lines of text of the monitor window as HTML."""
+    if monitor.filter and monitor.regex is not None:
+        indices = monitor.matches[start:end]
+    else:
+        indices = range(start, end)
+
+    if monitor.match_index is None:
+        current = None
+    else:
+        current = monitor.matches[monitor.match_index]
+
+    lines = monitor.data.lines(indices, max_bytes=_monitor_max_line_bytes)
+    times = monitor.data.times(indices) if monitor.timestamps else None
+
+    html_lines = []
+    for k, (i, line) in enumerate(zip(indices, lines)):
+        # A line still arriving or cut short may end within a character
+        if i < monitor.data.n_complete and len(line) < _monitor_max_line_bytes:
+            text = line.decode(errors="replace")
+        else:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            text = decoder.decode(line, final=False)
+            if len(line) == _monitor_max_line_bytes:
+                text += " …"
+
+        html_line = _monitor_line_html(monitor, text)
+        if i == current:
+            html_line = f'<span style="background-color: gold;">{html_line}</span>'
+
+        if times is not None:
+            html_line = f"{_monitor_timestamp(times[k])} -> {html_line}"
+
+        html_lines.append(html_line)
+
+    return html_lines
+
+
+def _monitor_timestamp(t):
+    """Local time of day to the millisecond of a time in nanoseconds
+    since the epoch."""
+    return datetime.datetime.fromtimestamp(t / 1e9).strftime("%H:%M:%S.%f")[:-3]
+
+
+def _hex_dump_html(monitor, start, end):
+    """Rows of the hex dump of the monitor window as HTML, each with
+    the offset, the bytes in hex, and the bytes as ASCII."""
+    raw = monitor.data.byte_range(start * _hex_row_bytes, end * _hex_row_bytes)
+
+    html_lines = []
+    for i in range(0, len(raw), _hex_row_bytes):
+        row = raw[i : i + _hex_row_bytes]
+        ascii_text = "".join(chr(b) if 32 <= b < 127 else "." for b in row)
+        html_lines.append(
+            f"{start * _hex_row_bytes + i:08x}  "
+            f"{row.hex(' '):<{3 * _hex_row_bytes - 1}}  "
+            f"|{html.escape(ascii_text)}|"
+        )
+
+    return html_lines
+
+
+def _monitor_line_html(monitor, line):
+    """Escape a line for display, marking matches of the search."""
+    if monitor.display_regex is None:
+        return html.escape(line)
+
+    out = []
+    pos = 0
+    for match in monitor.display_regex.finditer(line):
+        if match.end() > match.start():
+            out.append(html.escape(line[pos : match.start()]))
+            out.append(f"<mark>{html.escape(match.group())}</mark>")
+            pos = match.end()
+
+    out.append(html.escape(line[pos:]))
+
+    return "".join(out)
+
+
+def _update_matches(monitor):
+    """Search lines that arrived since the last search."""
+    # The last line may not be complete, so it is searched again
+    n_kept = np.searchsorted(monitor.matches, monitor.n_searched)
+    monitor.matches = np.concatenate(
+        (
+            monitor.matches[:n_kept],
+            monitor.data.search(monitor.regex, monitor.n_searched),
+        )
+    )
+    monitor.n_searched = monitor.data.n_complete
+
+
+def _monitor_search_status(monitor, controls):
+    if monitor.regex is None:
+        text = "" if controls.monitor_search.value == "" else "invalid search"
+    elif monitor.match_index is None:
+        text = f"{len(monitor.matches)} matches"
+    else:
+        text = f"match {monitor.match_index + 1} of {len(monitor.matches)}"
+
+    text = f'<p style="font-size: 8pt;">{text}</p>'
+    if controls.monitor_search_status.text != text:
+        controls.monitor_search_status.text = text
+
+
+def _stats_times(plotter, t):
+    """Times in seconds of the newly plotted rows for computing sample
+    rates, from the time column if it has units of time and from the
+    host timestamps otherwise. None if neither is available."""
+    if plotter.time_column == "host":
+        return t
+
+    if (
+        plotter.time_column != "none"
+        and plotter.time_units in derived._seconds_per_unit
+    ):
+        return t * derived._seconds_per_unit[plotter.time_units]
+
+    host_times = plotter.host_times[plotter.prev_data_length : len(plotter.data)]
+    if len(host_times) == len(t) and len(t) > 0:
+        return np.array(host_times) / 1e9
+
+    return None
+
+
+def _new_history(plotter):
+    """Make an empty history, on disk next to the capture if there is
+    one, and in memory otherwise."""
+    if isinstance(plotter.data, capture.CaptureFile):
+        stem = plotter.data.fname[: -len("_capture.npy")]
+
+        def store_factory(ncols, level):
+            return capture.CaptureFile(f"{stem}_history{level}.npy", ncols)
+
+        values = None
+
+    else:
+        store_factory = None
+
+        # Values are fetched from the data rather than held twice
+        def values(indices):
+            return _history_values(plotter, indices)
+
+    return history.History(plotter.max_cols, store_factory=store_factory, values=values)
+
+
+def _history_values(plotter, indices):
+    """Plotted values of the rows of the data at `indices`."""
+    if len(indices) == 0:
+        return np.empty((0, plotter.max_cols))
+
+    data, _ = parsers.fill_nans([list(plotter.data[i]) for i in indices], 0)
+    cols = min(data.shape[1], plotter.max_cols)
+
+    if plotter.time_column in ("none", "host"):
+        return data[:, :cols]
+
+    return data[:, [j for j in range(cols) if j != plotter.time_column]]
+
+
+def _rebuild_history(plotter, block_size=65536):
+    """Rebuild the history from the data already plotted, e.g., after
+    the time column changes. The time unwrapper state is rebuilt along
+    with it so that subsequent data continue seamlessly.
+
+    The rebuild is done one block of rows per tick of the document so
+    that the dashboard stays responsive. Until it is done, new data are
+    held and not plotted.
+    """
+    plotter.time_unwrapper = parsers.TimeUnwrapper(plotter.time_unwrapper.counter_bits)
+
+    if plotter.history is None:
+        plotter.history_rebuild = None
+        return
+
+    plotter.history.clear()
+
+    # A rebuild started later supersedes this one
+    state = dict(i=0)
+    plotter.history_rebuild = state
+
+    doc = plotter.plot.document if plotter.plot is not None else None
+
+    def rebuild_block():
+        if plotter.history_rebuild is not state:
+            return
+
+        _rebuild_history_block(plotter, state, block_size)
+
+        if state["i"] < plotter.prev_data_length:
+            doc.add_next_tick_callback(rebuild_block)
+            return
+
+        plotter.history_rebuild = None
+
+        if plotter.history_mode:
+            _history_reset_view(plotter)
+        elif plotter.trigger is None:
+            _history_live_view(plotter)
+
+    if doc is None:
+        while plotter.history_rebuild is state:
+            rebuild_block()
+    else:
+        doc.add_next_tick_callback(rebuild_block)
+
+
+def _rebuild_history_block(plotter, state, block_size):
+    """Add the next block of rows of the data to the history."""
+    i = state["i"]
+    j = min(i + block_size, plotter.prev_data_length)
+
+    if plotter.time_column == "host" and len(plotter.host_times) >= j:
+        host_times = (np.array(plotter.host_times[i:j]) - plotter.host_times[0]) / 1e9
+    else:
+        host_times = None
+
+    t, y = parsers.data_to_arrays(
+        plotter.data[i:j],
+        plotter.max_cols,
+        plotter.time_column,
+        plotter.time_units,
+        i,
+        time_unwrapper=plotter.time_unwrapper,
+        host_times=host_times,
+    )
+
+    plotter.history.append(t, y, start=i)
+    state["i"] = j
+
+
+def _history_view(plotter, t_start, t_end):
+    """Show a decimated view of the history in the plot sources."""
+    t, y = plotter.history.query(t_start, t_end, plotter.plot.frame_width)
+
+    _replace_plot_data(plotter, parsers.arrays_to_dicts(t, y))
+
+
+def _history_reset_view(plotter):
+    """Show the whole history."""
+    extent = plotter.history.extent()
+
+    if extent is not None:
+        plotter.plot.x_range.start, plotter.plot.x_range.end = extent
+        _history_view(plotter, *extent)
+
+
+def _history_live_view(plotter):
+    """Show the last rollover points of the history."""
+    t, y = plotter.history.tail(plotter.rollover)
+
+    _replace_plot_data(plotter, parsers.arrays_to_dicts(t, y))
+
+
+def plot_history_callback(plotter, monitor, controls, serial_connection):
+    """Switch between the live view and the history view."""
+    plotter.history_mode = controls.plot_history.active
+
+    if plotter.history is None:
+        return
+
+    if plotter.history_mode:
+        _history_reset_view(plotter)
+    else:
+        if plotter.trigger is None:
+            _history_live_view(plotter)
+        else:
+            _show_trigger_frame(plotter)
+
+        # Let the x range follow the data again
+        plotter.plot.x_range.start = np.nan
+        plotter.plot.x_range.end = np.nan
+
+
+def history_range_callback(plotter, monitor, controls, serial_connection):
+    """Fetch the history at screen resolution for a new x range."""
+    if plotter.history_mode and plotter.history is not None:
+        _history_view(plotter, plotter.plot.x_range.start, plotter.plot.x_range.end)
+
+
+def plot_stats_callback(plotter, monitor, controls, serial_connection):
+    """Show or hide the table of statistics."""
+    plotter.stats_table.visible = controls.plot_stats.active
+    stats_table_callback(plotter, monitor, controls, serial_connection)
+
+
+def stats_table_callback(plotter, monitor, controls, serial_connection):
+    """Refresh the table of statistics if it is shown."""
+    if not plotter.stats_table.visible:
+        return
+
+    active_col_labels = [
+        x for i, x in enumerate(plotter.col_labels) if i != plotter.time_column
+    ]
+
+    # Only send the table if something changed since it was last sent
+    shown = (plotter.stats.n_rows, plotter.stats.window, tuple(active_col_labels))
+    if shown == plotter.stats_shown:
+        return
+
+    n_channels = len(active_col_labels)
+    data = {
+        key: value[:n_channels] for key, value in plotter.stats.summary().items()
+    }
+    data["channel"] = active_col_labels
+
+    plotter.stats_source.data = data
+    plotter.stats_shown = shown
+
+
+def plot_errors_callback(plotter, monitor, controls, serial_connection):
+    """Show or hide the parse errors."""
+    plotter.errors_div.visible = controls.plot_errors.active
+    parse_errors_callback(plotter, monitor, controls, serial_connection)
+
+
+def parse_errors_callback(plotter, monitor, controls, serial_connection):
+    """Refresh the counts and quarantined lines of parse errors if they
+    are shown."""
+    if not plotter.errors_div.visible:
+        return
+
+    errors = plotter.parse_errors
+    text = (
+        '<p style="font-size: 8pt;">parse errors: '
+        + ", ".join(f"{kind}: {n}" for kind, n in errors.counts.items())
+        + "</p>"
+    )
+
+    # Most recent offending lines last, with invalid bytes escaped
+    if len(errors.quarantine) > 0:
+        lines = "<br>".join(
+            f"{kind}: " + html.escape(raw.decode(errors="backslashreplace"))
+            for kind, raw in errors.quarantine
+        )
+        text += (
+            '<div style="font-size: 8pt; font-family: monospace; '
+            + 'max-height: 150px; overflow-y: auto; white-space: pre;">'
+            + lines
+            + "</div>"
+        )
+
+    if plotter.errors_div.text != text:
+        plotter.errors_div.text = text
+
+
+def trigger_callback(plotter, monitor, controls, serial_connection):
+    """Set up the trigger from the controls, starting over."""
+    mode = controls.trigger_mode.value
+    controls.trigger_arm.disabled = mode != "single"
+
+    was_triggered = plotter.trigger is not None
+    plotter.trigger = None
+    plotter.trigger_frame = None
+
+    if mode != "off":
+        column = derived.DerivedChannels._plot_column(
+            int(controls.trigger_column.value), plotter.time_column
+        )
+
+        if column is None:
+            controls.trigger_status.text = (
+                '<p style="font-size: 8pt;">ERROR: The trigger column is the time column.</p>'
+            )
+            return
+
+        plotter.trigger = trigger.Trigger(
+            column,
+            edge=controls.trigger_edge.value,
+            level=float(controls.trigger_level.value),
+            pre=int(controls.trigger_pre.value),
+            post=int(controls.trigger_post.value),
+            mode=mode,
+        )
+
+    _trigger_status(plotter, controls)
+
+    # Glyphs may not be set up yet, and the history is still shown
+    if plotter.lines is None or plotter.history_mode:
+        return
+
+    if plotter.trigger is not None:
+        # Wait for the first frame with a blank plot
+        _show_trigger_frame(plotter)
+
+        for source in plotter.derived_sources:
+            source.data = dict(t=[], y=[])
+    elif was_triggered and plotter.history is not None:
+        _history_live_view(plotter)
+
+    # Let the x range follow the data
+    plotter.plot.x_range.start = np.nan
+    plotter.plot.x_range.end = np.nan
+
+
+def trigger_arm_callback(plotter, monitor, controls, serial_connection):
+    """Arm the trigger for another capture."""
+    if plotter.trigger is not None:
+        plotter.trigger.arm()
+        _trigger_status(plotter, controls)
+
+
+def cadence_callback(plotter, monitor, controls, serial_connection):
+    """Change how often data are acquired, the plotter and monitor are
+    updated, and ports are checked."""
+    # A cleared entry keeps the current value
+    if controls.daq_delay.value is None:
+        controls.daq_delay.value = serial_connection.daq_delay
+    if controls.stream_delay.value is None:
+        controls.stream_delay.value = serial_connection.update_pump.stream_delay
+    if controls.port_search_delay.value is None:
+        controls.port_search_delay.value = serial_connection.port_search_delay
+
+    serial_connection.set_cadence(
+        daq_delay=controls.daq_delay.value,
+        stream_delay=controls.stream_delay.value,
+        port_search_delay=controls.port_search_delay.value,
+    )
+
+
 def port_search_callback(plotter, monitor, controls, serial_connection):
     """Update available ports"""
     if controls.port.options != list(serial_connection.reverse_available_ports.keys()):
@@ -138,6 +1080,79 @@ def port_search_callback(plotter, monitor, controls, serial_connection):
         if controls.port.value is None or controls.port.value == "":
             controls.port.value = controls.port.options[0]
 
+    # Connect to a port matching the profile once, and start plotting
+    if serial_connection.auto_connect and serial_connection.ser is None:
+        option_name = serial_connection.matching_port()
+        if option_name is not None:
+            serial_connection.auto_connect = False
+            controls.port.value = option_name
+            port_select_callback(plotter, monitor, controls, serial_connection)
+            port_connect_callback(plotter, monitor, controls, serial_connection)
+
+            if serial_connection.port_status == "connected":
+                controls.plot_stream.active = True
+                plot_stream_callback(plotter, monitor, controls, serial_connection)
+
+
+def update_stats_callback(plotter, monitor, controls, serial_connection):
+    """Show statistics of plot and monitor updates"""
+    if serial_connection.update_pump is None:
+        return
+
+    stats = serial_connection.update_pump.stats()
+    if stats["frames"] == 0:
+        return
+
+    text = (
+        '<p style="font-size: 8pt;">'
+        + f"updates: {stats['frames']}, "
+        + f"rows/update: {stats['rows_per_frame']:.1f}, "
+        + f"signals/update: {stats['notifications_per_frame']:.1f}, "
+        + f"unacknowledged: {stats['in_flight']}, "
+        + f"held: {stats['held']}"
+    )
+
+    # Rows the worker process produced faster than they were taken
+    n_lost = getattr(serial_connection.ser, "n_lost", 0)
+    if n_lost > 0:
+        text += f", rows lost: {n_lost}"
+
+    n_errors = plotter.parse_errors.n_errors
+    if n_errors > 0:
+        text += f", parse errors: {n_errors}"
+
+    latency = serial_connection.latency_probe.summary()
+    if latency["n"] > 0 or latency["lost"] > 0:
+        text += "<br>latency p50/p95/p99 (ms): "
+        for name in ("read", "shown"):
+            if latency[name] is not None:
+                text += f"{name} " + "/".join(f"{x:.1f}" for x in latency[name])
+                text += ", "
+        text += f"probes: {latency['n']}, lost: {latency['lost']}"
+
+        histogram = serial_connection.latency_probe.histogram()
+        for name in ("read", "shown"):
+            if histogram[name].sum() > 0:
+                text += f"<br>{name} histogram (ms): "
+                text += _latency_histogram_text(histogram["edges"], histogram[name])
+
+    text += "</p>"
+
+    if controls.update_stats.text != text:
+        controls.update_stats.text = text
+
+
+def _latency_histogram_text(edges, counts):
+    """Nonempty bins of a latency histogram, such as "5-10: 3"."""
+    bins = []
+    for i in np.flatnonzero(counts):
+        if i == len(counts) - 1:
+            bins.append(f"{edges[i]:g}+: {counts[i]}")
+        else:
+            bins.append(f"{edges[i]:g}-{edges[i + 1]:g}: {counts[i]}")
+
+    return ", ".join(bins)
+
 
 def port_select_callback(plotter, monitor, controls, serial_connection):
     """Store the selected port"""
@@ -166,16 +1181,71 @@ def port_connect_callback(plotter, monitor, controls, serial_connection):
             serial_connection.port, allow_disconnect=True, handshake=True
         )
 
-        # Start DAQ
-        serial_connection.daq_task = asyncio.create_task(
-            comms.daq_stream(
-                plotter,
-                monitor,
-                serial_connection,
-                n_reads_per_chunk=1,
-                reader=comms.read_all,
+        # Board counters restart on connection, so forget previous wraps
+        plotter.time_unwrapper.reset()
+
+        # A different device may use a different delimiter
+        if controls.delimiter.value == "auto":
+            plotter.delimiter = "auto"
+
+        # A different device may send different columns
+        if plotter.layout is not None:
+            plotter.layout.reset()
+            plotter.layout_shown = 0
+
+        # Open capture files once max_cols is locked in
+        if plotter.capture == "disk" and not isinstance(
+            plotter.data, capture.CaptureFile
+        ):
+            plotter.data, plotter.host_times = capture.new_capture_files(
+                plotter.fileprefix, plotter.max_cols
             )
-        )
+
+        if plotter.history is None:
+            plotter.history = _new_history(plotter)
+
+        # Record the raw bytes from a device, but not from a replay
+        if serial_connection.record_raw and not isinstance(
+            serial_connection.ser, replay.ReplaySerial
+        ):
+            serial_connection.raw_capture = capture.new_raw_capture_file(
+                plotter.fileprefix
+            )
+
+        # Start DAQ; a replay is always read in the dashboard process
+        if serial_connection.acquisition == "process" and not isinstance(
+            serial_connection.ser, replay.ReplaySerial
+        ):
+            # Hand the port over to a worker process
+            serial_connection.ser.close()
+            serial_connection.ser = worker.WorkerSerial(
+                serial_connection.port,
+                baudrate=serial_connection.baudrate,
+                bytesize=serial_connection.bytesize,
+                parity=serial_connection.parity,
+                stopbits=serial_connection.stopbits,
+                delimiter=plotter.delimiter,
+                ncols=plotter.max_cols,
+                autocolumns=plotter.layout is not None,
+                timeout=serial_connection.daq_delay / 1000,
+            )
+
+            serial_connection.daq_task = asyncio.create_task(
+                comms.daq_stream_worker(plotter, monitor, serial_connection)
+            )
+        else:
+            serial_connection.daq_task = asyncio.create_task(
+                comms.daq_stream(
+                    plotter,
+                    monitor,
+                    serial_connection,
+                    n_reads_per_chunk=1,
+                    reader=comms.read_all,
+                )
+            )
+
+        # Data are sent to the device from a queue
+        serial_connection.write_queue.start()
 
         # Set up ColumnDataSources and populate glyphs for the plot
         _populate_glyphs(plotter)
@@ -193,6 +1263,8 @@ def port_connect_callback(plotter, monitor, controls, serial_connection):
 
         # Enable sending data
         controls.input_send.disabled = False
+        controls.input_stop.disabled = False
+        controls.latency_probe.disabled = False
 
         #  Update status
         port_status_callback(plotter, monitor, controls, serial_connection)
@@ -205,6 +1277,12 @@ def port_connect_callback(plotter, monitor, controls, serial_connection):
         except:
             pass
 
+        serial_connection.write_queue.stop()
+
+        if serial_connection.raw_capture is not None:
+            serial_connection.raw_capture.close()
+            serial_connection.raw_capture = None
+
 
 def port_disconnect_callback(plotter, monitor, controls, serial_connection):
     """Disconnect serial device."""
@@ -212,9 +1290,24 @@ def port_disconnect_callback(plotter, monitor, controls, serial_connection):
     serial_connection.daq_task.cancel()
     serial_connection.daq_task = None
 
+    # Anything not yet sent is discarded
+    serial_connection.write_queue.stop()
+
     # Close connection
     serial_connection.ser.close()
 
+    if serial_connection.raw_capture is not None:
+        serial_connection.raw_capture.close()
+        serial_connection.raw_capture = None
+
+    # Make sure everything captured so far is on disk
+    if isinstance(plotter.data, capture.CaptureFile):
+        plotter.data.flush()
+        plotter.host_times.flush()
+
+        for store in plotter.history.levels:
+            store.flush()
+
     # Re-enable buttons
     controls.port_connect.disabled = False
     controls.port.disabled = False
@@ -226,6 +1319,8 @@ def port_disconnect_callback(plotter, monitor, controls, serial_connection):
     # Disable disconnecting
     controls.port_disconnect.disabled = True
     controls.input_send.disabled = True
+    controls.input_stop.disabled = True
+    controls.latency_probe.disabled = True
 
     # Start port sniffer
     serial_connection.port_search_task = asyncio.create_task(
@@ -247,6 +1342,10 @@ def port_status_callback(plotter, monitor, controls, serial_connection):
         controls.port_status.text = (
             f"<p><b>port status:</b> connected to {serial_connection.port}.</p>"
         )
+
+        if serial_connection.raw_capture is not None:
+            controls.port_status.text += f'<p style="font-size: 8pt;">Recording raw bytes to {serial_connection.raw_capture.stem}_raw.bin.</p>'
+
     elif serial_connection.port_status == "failed":
         pass
         controls.port_status.text = f'<p><b>port status:</b> <font style="color: tomato;">unable to connect to {serial_connection.port}.</font></p>'
@@ -257,36 +1356,220 @@ def plot_stream_callback(plotter, monitor, controls, serial_connection):
 
 
 def plot_clear_callback(plotter, monitor, controls, serial_connection):
-    # Blank the data set
-    plotter.data = []
+    # Blank the data set, keeping any previous capture on disk
+    if isinstance(plotter.data, capture.CaptureFile):
+        plotter.data.close()
+        plotter.host_times.close()
+        plotter.data, plotter.host_times = capture.new_capture_files(
+            plotter.fileprefix, plotter.max_cols
+        )
+    else:
+        plotter.data = []
+        plotter.host_times = []
+    plotter.prev_data_length = 0
+    plotter.time_unwrapper.reset()
+    plotter.history_rebuild = None
+
+    if plotter.history is not None:
+        plotter.history.close()
+        plotter.history = _new_history(plotter)
 
     # Reset all data sources
-    for i in range(len(plotter.sources)):
-        plotter.sources[i].data = dict(t=[], y=[])
+    if plotter.renderer == "batched":
+        if plotter.lines is not None:
+            _replace_plot_data(plotter, [])
+    else:
+        for i in range(len(plotter.sources)):
+            plotter.sources[i].data = dict(t=[], y=[])
 
-    # Clear any remaining shrapnel from stale plots
-    for renderer in plotter.plot.renderers:
-        renderer.data_source.data = dict(t=[], y=[])
+        # Clear any remaining shrapnel from stale plots
+        for renderer in plotter.plot.renderers:
+            renderer.data_source.data = dict(t=[], y=[])
 
     # Reset the phantom data
     plotter.phantom_source.data = dict(phantom_t=[0], phantom_y=[0])
 
+    # Derived channels, statistics, parse errors, and the trigger start over
+    if plotter.derived is not None:
+        plotter.derived.reset()
+
+    plotter.stats.reset()
+    plotter.parse_errors.reset()
+
+    if plotter.trigger is not None:
+        plotter.trigger.reset()
+        plotter.trigger_frame = None
+        _trigger_status(plotter, controls)
+
+    for source in plotter.derived_sources:
+        source.data = dict(t=[], y=[])
+
+    for source in plotter.spectrum_sources:
+        source.data = dict(f=[], amplitude=[])
+
 
 def monitor_stream_callback(plotter, monitor, controls, serial_connection):
     monitor.streaming = controls.monitor_stream.active
 
 
 def monitor_clear_callback(plotter, monitor, controls, serial_connection):
-    monitor.data = ""
-    monitor.monitor.text = monitor.base_text
+    monitor.data.clear()
+    monitor.prev_data_length = 0
+    monitor.matches = np.array([], dtype=np.int64)
+    monitor.n_searched = 0
+    monitor.match_index = None
+    monitor.view_end = None
+    monitor.monitor.text = monitor.empty_text
+
+    _monitor_search_status(monitor, controls)
+    monitor_scroll_range_callback(plotter, monitor, controls, serial_connection)
+
+
+def monitor_scroll_callback(plotter, monitor, controls, serial_connection):
+    """Show the window of lines chosen with the scroll bar."""
+    value = controls.monitor_scroll.value_throttled
+
+    # At the end, the window follows arriving lines
+    if value >= controls.monitor_scroll.end:
+        monitor.view_end = None
+    else:
+        monitor.view_end = int(value)
+
+    _render_monitor(monitor)
+
+
+def monitor_scroll_range_callback(plotter, monitor, controls, serial_connection):
+    """Extend the scroll bar over lines that have arrived."""
+    end = max(_monitor_length(monitor), 1)
+    value = end if monitor.view_end is None else min(monitor.view_end, end)
+
+    if controls.monitor_scroll.end != end:
+        controls.monitor_scroll.end = end
+
+    if controls.monitor_scroll.value != value:
+        controls.monitor_scroll.value = value
+
+    _monitor_search_status(monitor, controls)
+
+
+def monitor_search_callback(plotter, monitor, controls, serial_connection):
+    """Search all lines received for a regular expression."""
+    pattern = controls.monitor_search.value
+
+    monitor.regex = None
+    monitor.display_regex = None
+    monitor.matches = np.array([], dtype=np.int64)
+    monitor.n_searched = 0
+    monitor.match_index = None
+
+    if pattern != "":
+        try:
+            monitor.regex = re.compile(pattern.encode(), re.MULTILINE)
+            monitor.display_regex = re.compile(pattern, re.MULTILINE)
+        except re.error:
+            monitor.regex = None
+            monitor.display_regex = None
+        else:
+            _update_matches(monitor)
+
+    # Lines shown while filtering change with the search
+    if monitor.filter:
+        monitor.view_end = None
+
+    _render_monitor(monitor)
+    monitor_scroll_range_callback(plotter, monitor, controls, serial_connection)
+
+
+def monitor_display_callback(plotter, monitor, controls, serial_connection):
+    """Switch between text and a hex dump in the monitor."""
+    monitor.hex = controls.monitor_display.active == 1
+    monitor.view_end = None
+    monitor.match_index = None
+
+    _render_monitor(monitor)
+    monitor_scroll_range_callback(plotter, monitor, controls, serial_connection)
+
+
+def monitor_timestamps_callback(plotter, monitor, controls, serial_connection):
+    """Show or hide the time each line arrived in the monitor."""
+    monitor.timestamps = controls.monitor_timestamps.active
+
+    _render_monitor(monitor)
+
+
+def monitor_filter_callback(plotter, monitor, controls, serial_connection):
+    """Show only lines matching the search, or all lines."""
+    monitor.filter = controls.monitor_filter.active
+    monitor.view_end = None
+    monitor.match_index = None
+
+    _render_monitor(monitor)
+    monitor_scroll_range_callback(plotter, monitor, controls, serial_connection)
+
+
+def _monitor_jump(monitor, step):
+    """Show the match `step` matches away from the current one."""
+    n_matches = len(monitor.matches)
+    if n_matches == 0:
+        return
+
+    if monitor.match_index is None:
+        monitor.match_index = 0 if step > 0 else n_matches - 1
+    else:
+        monitor.match_index = (monitor.match_index + step) % n_matches
+
+    # The monitor is scrolled to the bottom of the window, so show the
+    # match a few lines above its end
+    if monitor.hex:
+        line = (
+            monitor.data.line_start(monitor.matches[monitor.match_index])
+            // _hex_row_bytes
+        )
+    elif monitor.filter:
+        line = monitor.match_index
+    else:
+        line = monitor.matches[monitor.match_index]
+
+    monitor.view_end = int(min(line + 1 + _monitor_context, _monitor_length(monitor)))
+
+    _render_monitor(monitor)
+
+
+def monitor_prev_callback(plotter, monitor, controls, serial_connection):
+    _monitor_jump(monitor, -1)
+    monitor_scroll_range_callback(plotter, monitor, controls, serial_connection)
+
+
+def monitor_next_callback(plotter, monitor, controls, serial_connection):
+    _monitor_jump(monitor, 1)
+    monitor_scroll_range_callback(plotter, monitor, controls, serial_connection)
 
 
 def time_column_callback(plotter, monitor, controls, serial_connection):
-    if controls.time_column.value == "none":
-        plotter.time_column = "none"
+    if controls.time_column.value in ("none", "host"):
+        plotter.time_column = controls.time_column.value
     else:
         plotter.time_column = int(controls.time_column.value)
 
+    # Times in the history and wraps seen in a previous time column
+    # are meaningless for the new one
+    _rebuild_history(plotter)
+
+    # Statistics are of plotted columns, which are now different
+    plotter.stats.reset()
+
+    # Derived channels refer to columns of incoming data, which now map
+    # to different plotted columns
+    if plotter.derived is not None:
+        plotter.derived.reset()
+
+        if plotter.lines is not None:
+            _populate_derived_glyphs(plotter)
+
+    # So does the column the trigger watches
+    if controls.trigger_mode.value != "off":
+        trigger_callback(plotter, monitor, controls, serial_connection)
+
     _adjust_time_axis_label(plotter, monitor, controls, serial_connection)
 
     # Update legend if possible (i.e., if _populate_glyphs() has already been called)
@@ -306,6 +1589,15 @@ def max_cols_callback(plotter, monitor, controls, serial_connection):
             str(col) for col in range(len(plotter.col_labels), plotter.max_cols)
         ]
 
+    controls.time_column.options = ["none", "host"] + [
+        str(col) for col in range(plotter.max_cols)
+    ]
+    controls.trigger_column.options = [str(col) for col in range(plotter.max_cols)]
+
+    plotter.plot.output_backend = _output_backend(
+        plotter.rollover, plotter.max_cols, plotter.output_backend
+    )
+
 
 def col_labels_callback(plotter, monitor, controls, serial_connection):
     col_labels = parsers._column_labels_str_to_list(
@@ -322,8 +1614,68 @@ def col_labels_callback(plotter, monitor, controls, serial_connection):
         pass
 
 
+def layout_callback(plotter, monitor, controls, serial_connection):
+    """Take up the column labels detected in the data, and add columns
+    to the plot if more were detected than it has."""
+    layout = plotter.layout
+    plotter.layout_shown = layout.n_changes
+
+    # Columns of a capture on disk, or of the rows of a worker process,
+    # are fixed when it is opened
+    if (
+        layout.n_cols > plotter.max_cols
+        and plotter.lines is not None
+        and not isinstance(plotter.data, capture.CaptureFile)
+        and not isinstance(
+            getattr(serial_connection, "ser", None), worker.WorkerSerial
+        )
+    ):
+        _add_columns(plotter, monitor, controls, serial_connection, layout.n_cols)
+
+    col_labels = list(plotter.col_labels)
+    for i, label in enumerate(layout.labels[: plotter.max_cols]):
+        col_labels[i] = label
+
+    if col_labels != plotter.col_labels:
+        plotter.col_labels = col_labels
+        sep = {"whitespace": " ", "auto": ","}.get(plotter.delimiter, plotter.delimiter)
+        controls.col_labels.value = sep.join(col_labels)
+
+        _update_legend(plotter)
+
+
+def _add_columns(plotter, monitor, controls, serial_connection, max_cols):
+    """Grow the plot to `max_cols` columns while connected, replotting
+    the data so far."""
+    plotter.plot.renderers = [
+        renderer
+        for renderer in plotter.plot.renderers
+        if renderer not in plotter.lines and renderer not in plotter.dots
+    ]
+
+    controls.max_cols.value = max_cols
+    max_cols_callback(plotter, monitor, controls, serial_connection)
+
+    # Statistics and history have a fixed number of columns
+    plotter.stats = stats.StreamingStats(max_cols, window=plotter.rollover)
+    plotter.stats_shown = None
+
+    _populate_glyphs(plotter)
+
+    if plotter.history is not None:
+        plotter.history = _new_history(plotter)
+        _rebuild_history(plotter)
+
+    if controls.trigger_mode.value != "off":
+        trigger_callback(plotter, monitor, controls, serial_connection)
+
+
 def rollover_callback(plotter, monitor, controls, serial_connection):
     plotter.rollover = int(controls.rollover.value)
+    plotter.stats.set_window(plotter.rollover)
+    plotter.plot.output_backend = _output_backend(
+        plotter.rollover, plotter.max_cols, plotter.output_backend
+    )
 
 
 def glyph_callback(plotter, monitor, controls, serial_connection):
@@ -336,6 +1688,10 @@ def glyph_callback(plotter, monitor, controls, serial_connection):
     except:
         pass
 
+    # Batched glyphs are only updated while visible, so bring them up to date
+    if plotter.renderer == "batched" and plotter.lines is not None:
+        _refresh_batched(plotter)
+
     # Update legend if possible (i.e., if _populate_glyphs() has already been called)
     try:
         _update_legend(plotter)
@@ -343,39 +1699,164 @@ def glyph_callback(plotter, monitor, controls, serial_connection):
         pass
 
 
+def derived_callback(plotter, monitor, controls, serial_connection):
+    spec = controls.derived.value
+
+    if spec.startswith("ERROR"):
+        return
+
+    try:
+        plotter.derived = derived.DerivedChannels(spec) if spec.strip() else None
+    except RuntimeError as e:
+        controls.derived.value = f"ERROR: {e}"
+        return
+
+    # Update glyphs if _populate_glyphs() has already been called
+    if plotter.lines is not None:
+        _populate_derived_glyphs(plotter)
+
+
 def time_units_callback(plotter, monitor, controls, serial_connection):
     plotter.time_units = controls.time_units.value
+    _rebuild_history(plotter)
+
+    # Sample rates so far were computed in the old units
+    plotter.stats.reset()
     _adjust_time_axis_label(plotter, monitor, controls, serial_connection)
 
 
+def time_counter_bits_callback(plotter, monitor, controls, serial_connection):
+    if controls.time_counter_bits.value == "none":
+        plotter.time_unwrapper = parsers.TimeUnwrapper(None)
+    else:
+        plotter.time_unwrapper = parsers.TimeUnwrapper(
+            int(controls.time_counter_bits.value)
+        )
+
+    _rebuild_history(plotter)
+
+
 def delimiter_select_callback(plotter, monitor, controls, serial_connection):
-    plotter.delimiter = parsers.delimiter_convert(controls.delimiter.value)
+    plotter.delimiter = parsers._delimiter_convert(controls.delimiter.value)
+    delimiter_status_callback(plotter, monitor, controls, serial_connection)
+
+
+def delimiter_status_callback(plotter, monitor, controls, serial_connection):
+    """Show the delimiter found from the data when it is found
+    automatically."""
+    title = "delimiter"
+    if controls.delimiter.value == "auto" and plotter.delimiter != "auto":
+        title += f" (found {parsers._delimiter_name(plotter.delimiter)})"
+
+    if controls.delimiter.title != title:
+        controls.delimiter.title = title
 
 
 def input_send_callback(plotter, monitor, controls, serial_connection):
-    """Send input to serial device."""
+    """Queue input to send to serial device."""
     if (
         serial_connection.ser is not None
         and serial_connection.ser.is_open
         and controls.input_window.value != ""
     ):
-        message_ok = True
-        if controls.ascii_bytes.active == 1:
+        if controls.ascii_bytes.active == 2:
+            # A script is kept in the window when it has an error
+            try:
+                steps = sending.parse_script(controls.input_window.value)
+            except RuntimeError as e:
+                serial_connection.write_queue.status = f"ERROR: {e}"
+                input_status_callback(plotter, monitor, controls, serial_connection)
+                return
+        elif controls.ascii_bytes.active == 1:
             try:
                 # Input as bytes
-                message = bytes([int(controls.input_window.value)])
-            except:
-                controls.input_window.value = "ERROR: Inputted bytes must be integers."
-                message_ok = False
+                message = sending.parse_bytes(controls.input_window.value)
+            except RuntimeError as e:
+                controls.input_window.value = f"ERROR: {e}"
+                return
+
+            steps = [sending.Step("write", message)]
         else:
             try:
                 message = controls.input_window.value.encode("ascii")
             except:
                 controls.input_window.value = "ERROR: Cannot encode input as ASCII."
-                message_ok = False
+                return
+
+            steps = [sending.Step("write", message)]
+
+        serial_connection.write_queue.put(steps)
+        input_status_callback(plotter, monitor, controls, serial_connection)
+
+
+def input_stop_callback(plotter, monitor, controls, serial_connection):
+    """Stop sending, discarding queued input."""
+    serial_connection.write_queue.start()
+    input_status_callback(plotter, monitor, controls, serial_connection)
+
+
+def latency_probe_callback(plotter, monitor, controls, serial_connection):
+    """Send tagged commands to measure the round-trip latency."""
+    if serial_connection.ser is None or not serial_connection.ser.is_open:
+        return
+
+    probe = serial_connection.latency_probe
+    try:
+        probe.command = codecs.decode(controls.latency_command.value, "unicode_escape")
+        steps = probe.steps()
+    except (UnicodeDecodeError, UnicodeEncodeError):
+        serial_connection.write_queue.status = "ERROR: Cannot encode probe command."
+    except RuntimeError as e:
+        serial_connection.write_queue.status = f"ERROR: {e}"
+    else:
+        probe.reset()
+        serial_connection.write_queue.put(steps)
+
+    input_status_callback(plotter, monitor, controls, serial_connection)
 
-        if message_ok:
-            serial_connection.ser.write(message)
+
+def input_status_callback(plotter, monitor, controls, serial_connection):
+    """Show what is being sent to the device."""
+    write_queue = serial_connection.write_queue
+    text = html.escape(write_queue.status)
+    if len(write_queue) > 0:
+        text += f", {len(write_queue)} queued"
+
+    text = f'<p style="font-size: 8pt;">{text}</p>'
+
+    if controls.input_status.text != text:
+        controls.input_status.text = text
+
+
+def _plot_data_blocks(plotter, block_size=65536):
+    """Yield the plot data in blocks of rows.
+
+    Each block is a 2D Numpy array, NaN-padded so that all rows have
+    the same length, together with the host timestamps of its rows, or
+    None if they are not available. Data held in a CaptureFile are read
+    one block at a time so that saving does not load the whole capture
+    into memory.
+    """
+    n_rows = len(plotter.data)
+    have_host_times = len(plotter.host_times) == n_rows
+
+    if isinstance(plotter.data, capture.CaptureFile):
+        for i in range(0, n_rows, block_size):
+            data = np.array(plotter.data[i : i + block_size])
+            if have_host_times:
+                host_times = np.array(plotter.host_times[i : i + block_size])
+            else:
+                host_times = None
+
+            yield data, host_times
+    else:
+        data, _ = parsers.fill_nans(copy.copy(plotter.data), 0)
+        if have_host_times:
+            host_times = np.array(plotter.host_times)
+        else:
+            host_times = None
+
+        yield data, host_times
 
 
 def plot_save_callback(plotter, monitor, controls, serial_connection):
@@ -396,12 +1877,28 @@ def plot_write_callback(plotter, monitor, controls, serial_connectionr):
         notice_text = f'<p style="font-size: 8pt; color: tomato;">File {fname} exists. Refused to overwrite.</p>'
     else:
         try:
-            # Fill out data set with NaNs
-            data, ncols = parsers.fill_nans(copy.copy(plotter.data), 0)
+            # Pandas is slow to import and only needed here
+            import pandas as pd
+
+            unwrapper = parsers.TimeUnwrapper(plotter.time_unwrapper.counter_bits)
+            n_written = 0
+
+            for data, host_times in _plot_data_blocks(plotter):
+                if len(data) == 0:
+                    continue
+
+                ncols = data.shape[1]
+
+                # Write out a monotonic time column if counter wraps are removed
+                if (
+                    plotter.time_column not in ("none", "host")
+                    and plotter.time_column < ncols
+                    and unwrapper.counter_bits is not None
+                ):
+                    data[:, plotter.time_column] = unwrapper(
+                        data[:, plotter.time_column]
+                    )
 
-            if len(data) == 0 or ncols == 0:
-                notice_text = f'<p style="font-size: 8pt; color: tomato;">No plotter data available to write.</p>'
-            else:
                 # Appropriately pad data set if too many/few columns
                 if ncols > len(plotter.col_labels):
                     columns = plotter.col_labels + [
@@ -413,8 +1910,21 @@ def plot_write_callback(plotter, monitor, controls, serial_connectionr):
                         data = parsers.backfill_nans(data, len(plotter.col_labels))
                     df = pd.DataFrame(data=data, columns=plotter.col_labels)
 
-                df.to_csv(fname, index=False)
+                # Host wall-clock timestamps in seconds since the epoch
+                if host_times is not None:
+                    df["host time (s)"] = host_times / 1e9
+
+                df.to_csv(
+                    fname,
+                    index=False,
+                    mode="w" if n_written == 0 else "a",
+                    header=(n_written == 0),
+                )
+                n_written += len(df)
 
+            if n_written == 0:
+                notice_text = f'<p style="font-size: 8pt; color: tomato;">No plotter data available to write.</p>'
+            else:
                 notice_text = (
                     f'<p style="font-size: 8pt;">Data last saved to {fname}.</p>'
                 )
@@ -441,8 +1951,8 @@ def monitor_write_callback(plotter, monitor, controls, serial_connection):
         notice_text = f'<p style="font-size: 8pt; color: tomato;">File {fname} exists. Refused to overwrite.</p>'
     else:
         try:
-            with open(fname, "w") as f:
-                f.write("".join(monitor.data))
+            with open(fname, "wb") as f:
+                f.write(monitor.data.tobytes())
 
             notice_text = f'<p style="font-size: 8pt;">Data last saved to {fname}.</p>'
 
@@ -487,6 +1997,8 @@ def confirm_shutdown_callback(plotter, monitor, controls, serial_connection):
     except:
         pass
 
+    serial_connection.write_queue.stop()
+
     # Close the connection if open
     if serial_connection.ser is not None:
         try:
@@ -495,6 +2007,17 @@ def confirm_shutdown_callback(plotter, monitor, controls, serial_connection):
         except:
             pass
 
+    # Trim capture files to the data written
+    if isinstance(plotter.data, capture.CaptureFile):
+        plotter.data.close()
+        plotter.host_times.close()
+
+    if serial_connection.raw_capture is not None:
+        serial_connection.raw_capture.close()
+
+    if plotter.history is not None:
+        plotter.history.close()
+
     serial_connection.port_status = "disconnected"
     port_status_callback(plotter, monitor, controls, serial_connection)
 
@@ -0,0 +1,549 @@
+import os
+import time
+
+import numpy as np
+
+from . import parsers
+
+# Size of the .npy header we write. It is fixed so that the shape can
+# be rewritten in place as the file grows, and it is a multiple of 64
+# so that the data are aligned as NumPy expects.
+_header_size = 128
+
+
+def _npy_header(dtype, shape):
+    """Build a fixed-size .npy (format version 1.0) header.
+
+    Parameters
+    ----------
+    dtype : Numpy dtype
+        Data type of the stored array.
+    shape : tuple of ints
+        Shape of the stored array.
+
+    Returns
+    -------
+    output : bytes
+        Header of length `_header_size`.
+    """
+    header_dict = {
+        "descr": np.lib.format.dtype_to_descr(dtype),
+        "fortran_order": False,
+        "shape": shape,
+    }
+    header_str = repr(header_dict)
+
+    # Magic string, version, and header length take up 10 bytes
+    header_len = _header_size - 10
+    header_str = header_str.ljust(header_len - 1) + "\n"
+
+    return (
+        np.lib.format.MAGIC_PREFIX
+        + bytes([1, 0])
+        + header_len.to_bytes(2, "little")
+        + header_str.encode("latin1")
+    )
+
+
+def _as_rows(rows, ncols, dtype):
+    """Convert rows to a Numpy array with `ncols` columns.
+
+    Parameters
+    ----------
+    rows : list of lists, list of scalars, or Numpy array
+        Rows to convert. A list of lists is NaN-padded as in
+        `parsers.fill_nans()`.
+    ncols : int or None
+        Number of columns. Longer rows are truncated and shorter ones
+        are padded with NaNs. If None, the rows are scalars.
+    dtype : Numpy dtype
+        Data type of the output.
+
+    Returns
+    -------
+    output : Numpy array
+        Array of shape `(len(rows),)` if `ncols` is None and
+        `(len(rows), ncols)` otherwise.
+    """
+    if ncols is None:
+        return np.asarray(rows, dtype=dtype)
+
+    if not isinstance(rows, np.ndarray):
+        rows, _ = parsers.fill_nans(rows, ncols)
+
+    return parsers.backfill_nans(rows, ncols)[:, :ncols]
+
+
+class MemoryStore(object):
+    """Growable in-memory store of rows with the interface of
+    CaptureFile.
+
+    Attributes
+    ----------
+    ncols : int or None
+        Number of columns in each row. If None, the store is
+        one-dimensional.
+    dtype : Numpy dtype
+        Data type of the stored values.
+    n_rows : int
+        Number of rows that have been written.
+    capacity : int
+        Number of rows that fit in the store without growing it.
+    """
+
+    def __init__(self, ncols, dtype=np.float64, capacity=1024):
+        """Create an empty in-memory store.
+
+        Parameters
+        ----------
+        ncols : int or None
+            Number of columns in each row. Longer rows are truncated and
+            shorter ones are padded with NaNs. If None, the store is
+            one-dimensional.
+        dtype : Numpy dtype, default np.float64
+            Data type of the stored values.
+        capacity : int, default 1024
+            Number of rows to initially preallocate.
+        """
+        self.ncols = ncols
+        self.dtype = np.dtype(dtype)
+        self.n_rows = 0
+        self.capacity = capacity
+        self._array = np.empty(self._shape(capacity), dtype=self.dtype)
+
+    def _shape(self, n_rows):
+        return (n_rows,) if self.ncols is None else (n_rows, self.ncols)
+
+    def append(self, rows):
+        """Append rows to the store.
+
+        Parameters
+        ----------
+        rows : list of lists, list of scalars, or Numpy array
+            Rows to append. For a two-dimensional store, a list of
+            lists is NaN-padded as in `parsers.fill_nans()`.
+        """
+        if len(rows) == 0:
+            return
+
+        rows = _as_rows(rows, self.ncols, self.dtype)
+
+        n_new = len(rows)
+        if self.n_rows + n_new > self.capacity:
+            self.capacity = max(2 * self.capacity, self.n_rows + n_new)
+            array = np.empty(self._shape(self.capacity), dtype=self.dtype)
+            array[: self.n_rows] = self._array[: self.n_rows]
+            self._array = array
+
+        self._array[self.n_rows : self.n_rows + n_new] = rows
+        self.n_rows += n_new
+
+    def __iadd__(self, rows):
+        self.append(rows)
+        return self
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, key):
+        return self._array[: self.n_rows][key]
+
+    def clear(self):
+        """Discard all rows. The preallocated space is kept."""
+        self.n_rows = 0
+
+    def flush(self):
+        """Does nothing; present for compatibility with CaptureFile."""
+        pass
+
+    def close(self):
+        """Does nothing; present for compatibility with CaptureFile."""
+        pass
+
+
+class CaptureFile(object):
+    """Append-only store of parsed rows in a memory-mapped .npy file.
+
+    Rows are written into a preallocated memory map that is grown
+    geometrically as needed, so appending is amortized O(new rows) and
+    the resident memory of the process does not grow with the length
+    of the capture. The file is a valid .npy file at all times, so it
+    may be loaded with `np.load()` (with or without `mmap_mode`) during
+    or after a session.
+
+    A CaptureFile supports the parts of the list interface used for
+    `SerialPlotter.data`: `len()`, slicing (returning Numpy views into
+    the memory map), `+=` to append rows, and `clear()`.
+
+    Attributes
+    ----------
+    fname : str
+        Name of the .npy file.
+    ncols : int or None
+        Number of columns in each row. If None, the store is
+        one-dimensional.
+    dtype : Numpy dtype
+        Data type of the stored values.
+    n_rows : int
+        Number of rows that have been written.
+    capacity : int
+        Number of rows that fit in the file without growing it.
+    """
+
+    def __init__(self, fname, ncols, dtype=np.float64, capacity=65536):
+        """Create a new capture file.
+
+        Parameters
+        ----------
+        fname : str
+            Name of the .npy file. If it exists, it is overwritten.
+        ncols : int or None
+            Number of columns in each row. Longer rows are truncated and
+            shorter ones are padded with NaNs. If None, the store is
+            one-dimensional.
+        dtype : Numpy dtype, default np.float64
+            Data type of the stored values.
+        capacity : int, default 65536
+            Number of rows to initially preallocate.
+        """
+        self.fname = fname
+        self.ncols = ncols
+        self.dtype = np.dtype(dtype)
+        self.n_rows = 0
+        self.capacity = 0
+
+        self._file = open(fname, "w+b")
+        self._file.write(_npy_header(self.dtype, self._shape(0)))
+        self._mm = None
+        self._grow(capacity)
+
+    def _shape(self, n_rows):
+        return (n_rows,) if self.ncols is None else (n_rows, self.ncols)
+
+    def _row_size(self):
+        return self.dtype.itemsize * (1 if self.ncols is None else self.ncols)
+
+    def _grow(self, capacity):
+        """Extend the file and remap it to hold `capacity` rows."""
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+
+        self._file.truncate(_header_size + capacity * self._row_size())
+        self.capacity = capacity
+        self._mm = np.memmap(
+            self._file,
+            dtype=self.dtype,
+            mode="r+",
+            offset=_header_size,
+            shape=self._shape(capacity),
+        )
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, self._shape(self.n_rows)))
+        self._file.flush()
+
+    def append(self, rows):
+        """Append rows to the capture.
+
+        Parameters
+        ----------
+        rows : list of lists, list of scalars, or Numpy array
+            Rows to append. For a two-dimensional store, a list of
+            lists is NaN-padded as in `parsers.fill_nans()`.
+        """
+        if len(rows) == 0:
+            return
+
+        rows = _as_rows(rows, self.ncols, self.dtype)
+
+        n_new = len(rows)
+        if self.n_rows + n_new > self.capacity:
+            self._grow(max(2 * self.capacity, self.n_rows + n_new))
+
+        self._mm[self.n_rows : self.n_rows + n_new] = rows
+        self.n_rows += n_new
+
+        # Keep the header current so the file is always loadable
+        self._write_header()
+
+    def __iadd__(self, rows):
+        self.append(rows)
+        return self
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, key):
+        return self._mm[: self.n_rows][key]
+
+    def clear(self):
+        """Discard all rows. The preallocated space is kept."""
+        self.n_rows = 0
+        self._write_header()
+
+    def flush(self):
+        """Flush written rows and the header to disk."""
+        self._mm.flush()
+        self._write_header()
+
+    def close(self):
+        """Flush the capture and trim the file to the rows written."""
+        if self._file.closed:
+            return
+
+        self.flush()
+        self._mm = None
+        self._file.truncate(_header_size + self.n_rows * self._row_size())
+        self._file.close()
+
+
+def new_capture_files(fileprefix, ncols):
+    """Open a pair of capture files for a new recording.
+
+    Parameters
+    ----------
+    fileprefix : str
+        Prefix of the file names. The files are named
+        `{fileprefix}_{timestamp}_capture.npy` for the parsed data and
+        `{fileprefix}_{timestamp}_host_times.npy` for the host
+        timestamps in nanoseconds since the epoch.
+    ncols : int
+        Number of columns of parsed data to store.
+
+    Returns
+    -------
+    data : CaptureFile instance
+        Two-dimensional float64 store of parsed data.
+    host_times : CaptureFile instance
+        One-dimensional int64 store of host timestamps.
+    """
+    stem = f"{fileprefix}_{time.strftime('%Y%m%d-%H%M%S')}"
+
+    # Do not clobber a capture started in the same second
+    i = 1
+    base_stem = stem
+    while os.path.exists(f"{stem}_capture.npy"):
+        stem = f"{base_stem}-{i}"
+        i += 1
+
+    data = CaptureFile(f"{stem}_capture.npy", ncols)
+    host_times = CaptureFile(f"{stem}_host_times.npy", None, dtype=np.int64)
+
+    return data, host_times
+
+
+class RawCaptureFile(object):
+    """Append-only record of the raw bytes read from a port.
+
+    The bytes are written, exactly as read, to `{stem}_raw.bin`. Each
+    chunk of bytes read at once gets a row in `{stem}_raw_index.npy`, a
+    two-column int64 CaptureFile holding the offset of the chunk in the
+    byte file and the host monotonic time in nanoseconds at which it was
+    read. A recording can thus be reparsed with
+    `reparse_raw_capture()` or replayed with its original timing with
+    `replay.ReplaySerial`.
+
+    Writes are buffered, and both files are flushed at least every
+    `flush_interval` seconds while chunks arrive, so that appending a
+    chunk costs no more than a copy into a buffer. Index rows are only
+    written once their bytes are, so the files on disk are always
+    consistent.
+
+    Attributes
+    ----------
+    stem : str
+        Stem of the file names.
+    n_bytes : int
+        Number of bytes written.
+    n_chunks : int
+        Number of chunks written.
+    flush_interval : float
+        Longest time in seconds between flushes while chunks arrive.
+    """
+
+    def __init__(self, stem, buffer_size=1048576, flush_interval=1.0):
+        """Create a new raw capture.
+
+        Parameters
+        ----------
+        stem : str
+            Stem of the file names. Existing files are overwritten.
+        buffer_size : int, default 1048576
+            Size in bytes of the write buffer of the byte file.
+        flush_interval : float, default 1.0
+            Longest time in seconds between flushes while chunks arrive.
+        """
+        self.stem = stem
+        self.n_bytes = 0
+        self.flush_interval = flush_interval
+
+        self._file = open(f"{stem}_raw.bin", "wb", buffering=buffer_size)
+        self._index = CaptureFile(f"{stem}_raw_index.npy", 2, dtype=np.int64)
+
+        # Index rows not yet written
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    @property
+    def n_chunks(self):
+        return self._index.n_rows + len(self._pending)
+
+    def append(self, raw, t=None):
+        """Write a chunk of bytes.
+
+        Parameters
+        ----------
+        raw : bytes
+            Bytes read from the port.
+        t : int or None, default None
+            Host monotonic time in nanoseconds at which the bytes were
+            read. If None, the current time is used.
+        """
+        if len(raw) == 0:
+            return
+
+        if t is None:
+            t = time.monotonic_ns()
+
+        self._file.write(raw)
+        self._pending.append((self.n_bytes, t))
+        self.n_bytes += len(raw)
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Flush written bytes and the index to disk."""
+        if self._file.closed:
+            return
+
+        self._file.flush()
+
+        if len(self._pending) > 0:
+            self._index.append(np.array(self._pending, dtype=np.int64))
+            self._pending = []
+
+        self._index.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flush and close the files."""
+        if self._file.closed:
+            return
+
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+
+def new_raw_capture_file(fileprefix):
+    """Open a raw capture for a new recording.
+
+    Parameters
+    ----------
+    fileprefix : str
+        Prefix of the file names. The files are named
+        `{fileprefix}_{timestamp}_raw.bin` for the bytes and
+        `{fileprefix}_{timestamp}_raw_index.npy` for the index.
+
+    Returns
+    -------
+    output : RawCaptureFile instance
+    """
+    stem = f"{fileprefix}_{time.strftime('%Y%m%d-%H%M%S')}"
+
+    # Do not clobber a capture started in the same second
+    i = 1
+    base_stem = stem
+    while os.path.exists(f"{stem}_raw.bin"):
+        stem = f"{base_stem}-{i}"
+        i += 1
+
+    return RawCaptureFile(stem)
+
+
+def load_raw_capture(stem):
+    """Load a raw capture written by a RawCaptureFile.
+
+    Parameters
+    ----------
+    stem : str
+        Stem of the file names.
+
+    Returns
+    -------
+    raw : Numpy array of uint8
+        The bytes, memory mapped.
+    index : Numpy array of int64
+        Array of shape `(n_chunks, 2)` with the offset of each chunk
+        in `raw` and the host monotonic time in nanoseconds at which it
+        was read.
+    """
+    fname = f"{stem}_raw.bin"
+    if os.path.getsize(fname) == 0:
+        raw = np.zeros(0, dtype=np.uint8)
+    else:
+        raw = np.memmap(fname, dtype=np.uint8, mode="r")
+
+    index = np.load(f"{stem}_raw_index.npy").reshape(-1, 2)
+
+    return raw, index
+
+
+def reparse_raw_capture(stem, sep=",", ncols=None, block_bytes=4194304):
+    """Parse all lines of a raw capture.
+
+    Parameters
+    ----------
+    stem : str
+        Stem of the file names.
+    sep : str, default ","
+        Delimiter of the data, as for `parsers.parse_read()`.
+    ncols : int or None, default None
+        Number of columns of the output. Longer rows are truncated and
+        shorter ones padded with NaNs. If None, the number of columns
+        is that of the longest line.
+    block_bytes : int, default 4194304
+        Number of bytes parsed at a time.
+
+    Returns
+    -------
+    data : 2D Numpy array
+        Parsed data, one row per complete line.
+    t : Numpy array of int64
+        Host monotonic time in nanoseconds at which the chunk holding
+        the end of each line was read.
+    """
+    raw, index = load_raw_capture(stem)
+
+    blocks = []
+    stamps = []
+    remaining = b""
+    for start in range(0, len(raw), block_bytes):
+        # Offset in the file of the start of the buffer
+        offset = start - len(remaining)
+
+        buffer = remaining + raw[start : start + block_bytes].tobytes()
+        data, _, remaining = parsers.parse_read(buffer, sep=sep)
+
+        # Each line is stamped with the chunk holding its newline
+        newlines = np.flatnonzero(np.frombuffer(buffer, dtype=np.uint8) == 10)
+        chunks = np.searchsorted(index[:, 0], offset + newlines, side="right") - 1
+        t = index[np.maximum(chunks, 0), 1]
+
+        if len(data) > 0:
+            blocks.append(parsers.fill_nans(data, 0)[0])
+            stamps.append(t[: len(data)])
+
+    if ncols is None:
+        ncols = max([block.shape[1] for block in blocks], default=0)
+
+    data = np.concatenate(
+        [_as_rows(block, ncols, np.float64) for block in blocks]
+        or [np.empty((0, ncols))]
+    )
+    t = np.concatenate(stamps or [np.empty(0, dtype=np.int64)])
+
+    return data, t
@@ -4,7 +4,6 @@ import time
 
 import numpy as np
 
-from . import callbacks
 from . import parsers
 from . import boards
 
@@ -75,8 +74,62 @@ def read_all_newlines(ser, read_buffer=b"", n_reads=1):
     return raw
 
 
+def bits_per_byte(serial_connection):
+    """Number of bits on the wire for each byte transferred.
+
+    Parameters
+    ----------
+    serial_connection : SerialConnection instance
+        Details about the serial connection
+
+    Returns
+    -------
+    output : float
+        Start bit plus data bits, parity bit, and stop bits.
+    """
+    parity_bits = 0 if serial_connection.parity == serial.PARITY_NONE else 1
+
+    return 1 + serial_connection.bytesize + parity_bits + serial_connection.stopbits
+
+
+def line_timestamps(buffer, t_end, byte_time):
+    """Estimate the host time at which each line in a buffer arrived.
+
+    Parameters
+    ----------
+    buffer : byte string
+        Bytes, the last of which arrived at time `t_end`.
+    t_end : int
+        Host time, in nanoseconds, at which the buffer was read.
+    byte_time : float
+        Time, in nanoseconds, to transfer a single byte over the wire.
+
+    Returns
+    -------
+    output : Numpy array of int64
+        Estimated arrival time in nanoseconds of the newline ending
+        each complete line in `buffer`.
+
+    Notes
+    -----
+    .. The bytes are assumed to have arrived back to back at the line
+       rate, with the last one arriving just before `t_end`. Lines
+       sent while the device was idle will thus be stamped a bit late,
+       but never later than when they were actually read.
+    """
+    newlines = np.flatnonzero(np.frombuffer(buffer, dtype=np.uint8) == 10)
+    bytes_after = len(buffer) - 1 - newlines
+
+    return t_end - (bytes_after * byte_time).astype(np.int64)
+
+
 async def daq_stream(
-    plotter, monitor, serial_connection, n_reads_per_chunk=1, reader=read_all
+    plotter,
+    monitor,
+    serial_connection,
+    n_reads_per_chunk=1,
+    reader=read_all,
+    host_timestamps=True,
 ):
     """Obtain streaming data
 
@@ -97,32 +150,80 @@ async def daq_stream(
         Either `read_all` or `read_all_newlines`. `read_all_newlines` is
         only necessary on some windows machines that have problems
         reading in data that does not end with a newline.
+    host_timestamps : bool, default True
+        If True, each parsed line is stamped with an estimate of the
+        host wall-clock time at which it arrived, in nanoseconds since
+        the epoch, and the stamps are stored in `plotter.host_times`.
+        The stamps are derived from the monotonic clock, so they do not
+        jump if the system clock is adjusted during acquisition.
     """
+    # Wall-clock time is monotonic time plus a fixed offset
+    wall_offset = time.time_ns() - time.monotonic_ns()
+
+    # Time to transfer a byte in nanoseconds
+    byte_time = 1e9 * bits_per_byte(serial_connection) / serial_connection.baudrate
+
     # Receive data
     read_buffer = [b""]
     while True:
         # Read in chunk` of data
-        raw = reader(serial_connection.ser, read_buffer=b"", n_reads=n_reads_per_chunk)
+        with serial_connection.port_lock:
+            raw = reader(
+                serial_connection.ser, read_buffer=b"", n_reads=n_reads_per_chunk
+            )
+        t_monotonic = time.monotonic_ns()
+        t_read = t_monotonic + wall_offset
 
-        if monitor.streaming:
-            monitor.data += raw.decode()
+        # Everything read is recorded, streaming or not
+        if serial_connection.raw_capture is not None:
+            serial_connection.raw_capture.append(raw, t_monotonic)
+
+        # Scripted sends and latency probes may be waiting for a response
+        serial_connection.write_queue.received(raw)
+        serial_connection.latency_probe.received(raw, t_monotonic)
 
-        if plotter.streaming:
-            # Parse it, passing if it is gibberish or otherwise corrupted
+        if monitor.streaming:
+            monitor.data.append(raw, t_read)
+
+        # Hold data until the delimiter is found from the first lines
+        if plotter.streaming and plotter.delimiter == "auto":
+            delimiter = parsers.sniff_delimiter(read_buffer[0] + raw)
+            if delimiter is None:
+                read_buffer[0] += raw
+            else:
+                plotter.delimiter = parsers._delimiter_convert(delimiter)
+
+        if plotter.streaming and plotter.delimiter != "auto":
+            # Parse it; lines that do not parse cleanly are accounted for
             try:
+                buffer = read_buffer[0] + raw
                 data, n_reads, read_buffer[0] = parsers.parse_read(
-                    read_buffer[0] + raw, sep=plotter.delimiter
+                    buffer,
+                    sep=plotter.delimiter,
+                    errors=plotter.parse_errors,
+                    layout=plotter.layout,
                 )
 
                 # Proceed if we actually read in data
                 if len(data) > 0:
-                    # If this is our first data, add them into plot_data
-                    if len(plotter.data) == 0:
-                        plotter.data = data
-                    else:
-                        plotter.data += data
+                    if host_timestamps:
+                        t_lines = line_timestamps(buffer, t_read, byte_time)
+
+                        # Fall back to time of read if lines were skipped
+                        if len(t_lines) == len(data):
+                            plotter.host_times += t_lines.tolist()
+                        else:
+                            plotter.host_times += [t_read] * len(data)
+
+                    # plotter.data is a list or a CaptureFile; both append
+                    plotter.data += data
+
+                    _notify(serial_connection, len(data))
             except:
-                pass
+                plotter.parse_errors.record("chunk", raw)
+
+        if monitor.streaming and len(raw) > 0:
+            _notify(serial_connection)
 
         # Sleep 80% of the time before we need to start reading chunks
         await asyncio.sleep(
@@ -130,6 +231,102 @@ async def daq_stream(
         )
 
 
+async def daq_stream_worker(plotter, monitor, serial_connection):
+    """Obtain streaming data read and parsed in a worker process.
+
+    Parameters
+    ----------
+    plotter : SerialPlotter instance
+        Plotter displaying parsed data. plotter.data is updated in this
+        coroutine.
+    monitor : SerialMonitor instance
+        Monitor displaying data coming from the serial connection.
+        monitor.data is updated in this coroutine.
+    serial_connection : SerialConnection instance
+        Details about the serial connection. `serial_connection.ser`
+        must be a `worker.WorkerSerial` instance.
+
+    Notes
+    -----
+    .. Parsed rows and raw bytes are taken from the shared rings of the
+       worker every `serial_connection.daq_delay` milliseconds. Data
+       arriving while the plotter or monitor are not streaming are
+       discarded, as in `daq_stream()`.
+    """
+    ser = serial_connection.ser
+    delimiter = plotter.delimiter
+    row_count = ser.rows.count
+
+    # Wall-clock time is monotonic time plus a fixed offset
+    wall_offset = time.time_ns() - time.monotonic_ns()
+
+    # The worker finds the delimiter itself; finding it here from the
+    # same bytes shows which it found
+    sniff_buffer = b""
+
+    while True:
+        # Delimiter may be changed from the dashboard
+        if plotter.delimiter != delimiter:
+            delimiter = plotter.delimiter
+            ser.set_delimiter(delimiter)
+
+        chunks = ser.read_chunks()
+        raw = b"".join(chunk for chunk, _ in chunks)
+
+        if delimiter == "auto":
+            sniff_buffer += raw
+            sniffed = parsers.sniff_delimiter(sniff_buffer)
+            if sniffed is not None:
+                plotter.delimiter = delimiter = parsers._delimiter_convert(sniffed)
+                sniff_buffer = b""
+        else:
+            sniff_buffer = b""
+
+        # Everything read is recorded, streaming or not, with the times
+        # the worker read it
+        for chunk, t_monotonic in chunks:
+            if serial_connection.raw_capture is not None:
+                serial_connection.raw_capture.append(chunk, t_monotonic)
+
+            serial_connection.latency_probe.received(chunk, t_monotonic)
+
+        serial_connection.write_queue.received(raw)
+
+        if monitor.streaming and len(raw) > 0:
+            monitor.data.append(raw, chunks[-1][1] + wall_offset)
+            _notify(serial_connection)
+
+        records, row_count, n_lost = ser.rows.read(row_count)
+        ser.n_lost += n_lost
+
+        rows = records["rows"]
+        if plotter.streaming and len(rows) > 0:
+            # plotter.data is a list or a CaptureFile; both append
+            if isinstance(plotter.data, list):
+                plotter.data += rows.tolist()
+                plotter.host_times += records["stamps"].tolist()
+            else:
+                plotter.data += rows
+                plotter.host_times += records["stamps"]
+
+            _notify(serial_connection, len(rows))
+
+        # Errors are accounted for only while streaming, as in daq_stream()
+        for report in ser.reports():
+            if report[0] == "errors" and plotter.streaming:
+                plotter.parse_errors.merge(*report[1:])
+            elif report[0] == "layout" and plotter.layout is not None:
+                plotter.layout.adopt(*report[1:])
+
+        await asyncio.sleep(serial_connection.daq_delay / 1000)
+
+
+def _notify(serial_connection, n_rows=0):
+    """Signal the update pump, if there is one, that data arrived."""
+    if serial_connection.update_pump is not None:
+        serial_connection.update_pump.notify(n_rows)
+
+
 async def port_search(serial_connection):
     """Search for ports and update dictionary of ports.
 
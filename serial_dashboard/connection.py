@@ -0,0 +1,395 @@
+import fnmatch
+import os
+import threading
+
+import serial
+import serial.tools.list_ports
+
+from . import comms
+from . import latency
+from . import replay
+from . import sending
+
+
+class SerialConnection(object):
+    """Class containing details about a serial connection.
+
+    Attributes
+    ----------
+    ser : serial.Serial instance
+        Serial connection to a device.
+    port : str
+        Name of the port of the connection. This is not the device name,
+        but a descriptive name.
+    baudrate : int
+        Baud rate of the connection
+    bytesize : int
+        Number of data bits. Possible values: serial.FIVEBITS,
+        serial.SIXBITS, serial.SEVENBITS, serial.EIGHTBITS
+    parity : int
+        Enable parity checking. Possible values: serial.PARITY_NONE,
+        serial.PARITY_EVEN, serial.PARITY_ODD, serial.PARITY_MARK,
+        serial.PARITY_SPACE.
+    stopbits : int
+        Number of stop bits. Possible values: serial.STOPBITS_ONE,
+        serial.STOPBITS_ONE_POINT_FIVE, serial.STOPBITS_TWO
+    ports : list
+        List of ports that are available. Each entry is a
+        serial.tools.list_ports_common.ListPortInfo instance.
+    available_ports : dict
+        A dictionary with the descriptive port names as keys and strings
+        with the name of the ports such that they can be opened with
+        `serial.Serial()` as values.
+    reverse_available_ports : dict
+        A dictionary with the descriptive port names as values and
+        strings with the name of the ports such that they can be opened
+        with `serial.Serial()` as keys.
+    port_status : str
+        The status of the port. Either "disconnected", "establishing",
+        "connected", or "failed".
+    daq_task : async task
+        Task for data acquisition.
+    daq_delay : float
+        Approximate time, in milliseconds, between data acquisitions.
+    port_search_task : async task
+        Task for checking for available ports.
+    port_search_delay : float
+        Approximate time, in milliseconds, between checks of available
+        ports.
+    port_search_callback : bokeh.server.callbacks.PeriodicCallback or None
+        Periodic callback of the dashboard checking for available ports,
+        added with `schedule_port_search()`.
+    kill_app : bool
+        If True, kill the connect/app.
+    update_pump : pump.UpdatePump instance or None
+        Scheduler of plot and monitor updates, signaled when data
+        arrive. If None, updates must be scheduled otherwise.
+    acquisition : str
+        Either "async", to read and parse data in the dashboard's event
+        loop, or "process", to read and parse them in a worker process.
+    replay : str or None
+        Stem of a raw capture offered as a port to replay, or None.
+    replay_speed : float
+        Factor by which a replay is faster than its recording, or 0 for
+        as fast as possible.
+    record_raw : bool
+        If True, the raw bytes read while connected to a device are
+        recorded to a new raw capture on each connection.
+    raw_capture : capture.RawCaptureFile instance or None
+        Raw capture being recorded, if any.
+    write_queue : sending.WriteQueue instance
+        Queue of data and scripted steps to send to the device without
+        blocking the event loop.
+    port_lock : threading.Lock instance
+        Held while reading from or writing to the port, which happen
+        in different threads.
+    latency_probe : latency.LatencyProbe instance
+        Probe of the round-trip latency of commands echoed by the
+        device.
+    port_match : list of str or None
+        Patterns with shell-style wildcards. The first port whose
+        device name or descriptive name matches one is connected to
+        automatically when it is found.
+    auto_connect : bool
+        True until an automatic connection to a port matching
+        `port_match` has been attempted.
+    """
+
+    def __init__(
+        self,
+        port=None,
+        baudrate=115200,
+        daq_delay=20,
+        port_search_delay=1000,
+        bytesize=8,
+        parity="N",
+        stopbits=1,
+        acquisition="async",
+        replay=None,
+        replay_speed=1.0,
+        record_raw=False,
+        port_match=None,
+    ):
+        """Create an instance storing information about a serial
+        connection.
+
+        Parameters
+        ----------
+        port : str, default None
+            If given, name of the port to connect to. If None, no device
+            is connected.
+        baudrate : int
+            Baud rate of the connection
+        daq_delay : float
+            Approximate time, in milliseconds, between data acquisitions.
+        port_search_delay : float
+            Approximate time, in milliseconds, between checks of
+            available ports.
+        bytesize : int
+            Number of data bits. Possible values: serial.FIVEBITS,
+            serial.SIXBITS, serial.SEVENBITS, serial.EIGHTBITS
+        parity : int
+            Enable parity checking. Possible values: serial.PARITY_NONE,
+            serial.PARITY_EVEN, serial.PARITY_ODD, serial.PARITY_MARK,
+            serial.PARITY_SPACE.
+        stopbits : int
+            Number of stop bits. Possible values: serial.STOPBITS_ONE,
+            serial.STOPBITS_ONE_POINT_FIVE, serial.STOPBITS_TWO
+        acquisition : str, default "async"
+            If "async", data are read and parsed in the dashboard's
+            event loop. If "process", they are read and parsed in a
+            worker process and handed to the dashboard through shared
+            memory.
+        replay : str or None, default None
+            If given, stem of a raw capture, as written by
+            `capture.RawCaptureFile`, to offer as a port. Connecting to
+            it replays the capture with a `replay.ReplaySerial`.
+        replay_speed : float, default 1.0
+            Factor by which a replay is faster than its recording, or 0
+            for as fast as possible.
+        record_raw : bool, default False
+            If True, the raw bytes read while connected to a device are
+            recorded to a new raw capture on each connection.
+        port_match : str, list of str, or None, default None
+            Pattern or patterns with shell-style wildcards, such as
+            "*usbmodem*". The first port whose device name or
+            descriptive name matches one, ignoring case, is connected to
+            automatically when it is found.
+        """
+        self.ser = None
+        self.baudrate = baudrate
+        self.bytesize = bytesize
+        self.parity = parity
+        self.stopbits = stopbits
+        self.ports = []
+        self.available_ports = dict()
+        self.reverse_available_ports = dict()
+        self.port_status = "disconnected"
+        self.daq_task = None
+        self.daq_delay = daq_delay
+        self.port_search_task = None
+        self.port_search_delay = port_search_delay
+        self.port_search_callback = None
+        self._port_search_doc = None
+        self.kill_app = False
+        self.update_pump = None
+        self.acquisition = acquisition
+        self.replay = replay
+        self.replay_speed = replay_speed
+        self.record_raw = record_raw
+        self.raw_capture = None
+        self.write_queue = sending.WriteQueue(self)
+        self.port_lock = threading.Lock()
+        self.latency_probe = latency.LatencyProbe()
+
+        if type(port_match) == str:
+            port_match = [port_match]
+        self.port_match = port_match
+        self.auto_connect = port_match is not None
+
+        # Attempt to connect to a port if provided
+        if port is None:
+            self.port = port
+        else:
+            self.connect(port)
+
+    def schedule_port_search(self, doc, callback):
+        """Add a periodic callback to a document that checks for ports
+        every `port_search_delay` milliseconds.
+
+        Parameters
+        ----------
+        doc : bokeh.document.Document instance
+            Document of the dashboard.
+        callback : function
+            Function with no arguments to call periodically.
+        """
+        self._port_search_doc = doc
+        self.port_search_callback = doc.add_periodic_callback(
+            callback, self.port_search_delay
+        )
+
+    def set_cadence(self, daq_delay=None, stream_delay=None, port_search_delay=None):
+        """Change how often data are acquired, the plotter and monitor
+        are updated, and ports are checked, while running.
+
+        Parameters
+        ----------
+        daq_delay : float or None, default None
+            If given, new approximate time, in milliseconds, between
+            data acquisitions. It takes effect after the next
+            acquisition.
+        stream_delay : float or None, default None
+            If given, new maximum time, in milliseconds, between the
+            arrival of data and updates of the plotter and monitor. It
+            takes effect immediately if there is an update pump.
+        port_search_delay : float or None, default None
+            If given, new approximate time, in milliseconds, between
+            checks of available ports. A periodic callback added with
+            `schedule_port_search()` is rescheduled immediately.
+        """
+        for name, value in (
+            ("daq_delay", daq_delay),
+            ("stream_delay", stream_delay),
+            ("port_search_delay", port_search_delay),
+        ):
+            if value is not None and value <= 0:
+                raise RuntimeError(
+                    f'Inputted {name} "{value}" is invalid. {name} must be positive.'
+                )
+
+        if daq_delay is not None:
+            self.daq_delay = daq_delay
+
+        if stream_delay is not None and self.update_pump is not None:
+            self.update_pump.set_cadence(stream_delay=stream_delay)
+
+        if port_search_delay is not None:
+            self.port_search_delay = port_search_delay
+
+            pc = self.port_search_callback
+            if pc is not None and pc.period != port_search_delay:
+                self._port_search_doc.remove_periodic_callback(pc)
+                self.schedule_port_search(self._port_search_doc, pc.callback)
+
+    def portsearch(self, on_change=True):
+        """Search for ports and update port information.
+
+        Parameters
+        ----------
+        on_change : bool, default True
+            If True, only update `ports`, `available_ports`, and
+            `reverse_available_ports` attributes if there was a change
+            in the available ports.
+        """
+        ports = serial.tools.list_ports.comports()
+
+        # A replay is offered even if no devices are attached
+        offer_replay = self.replay is not None and len(self.available_ports) == 0
+
+        if not on_change or ports != self.ports or offer_replay:
+            self.ports = [port for port in ports]
+
+            options = [comms.device_name(port_name) for port_name in ports]
+
+            # Dictionary of port names and name in port selector
+            self.available_ports = {
+                port_name.device: option_name
+                for port_name, option_name in zip(ports, options)
+            }
+
+            # Reverse lookup for value in port selector to port name
+            self.reverse_available_ports = {
+                option_name: port_name.device
+                for port_name, option_name in zip(ports, options)
+            }
+
+            if self.replay is not None:
+                port_name = replay.port_prefix + self.replay
+                option_name = f"replay of {os.path.basename(self.replay)}"
+                self.available_ports[port_name] = option_name
+                self.reverse_available_ports[option_name] = port_name
+
+    def matching_port(self):
+        """Descriptive name of the first available port matching
+        `port_match`, or None if there is none."""
+        if self.port_match is None:
+            return None
+
+        for port_name, option_name in self.available_ports.items():
+            for pattern in self.port_match:
+                pattern = pattern.lower()
+                if fnmatch.fnmatch(port_name.lower(), pattern) or fnmatch.fnmatch(
+                    option_name.strip().lower(), pattern
+                ):
+                    return option_name
+
+        return None
+
+    def connect(self, port, allow_disconnect=False, handshake=True):
+        """Connect to a port.
+
+        Parameters
+        ----------
+        port : str, int, or serial.tools.list_ports_common.ListPortInfo instance
+            Port to which to connect. If an int, connect to port given
+            by self.ports[port].
+        allow_disconnect : bool, default True
+            If already connected to a port, allow disconnection. If
+            False, raise an exception if already connected.
+        handshake : bool, default True
+            If True, "handshake" with the connected device by closing,
+            reopening connection waiting a second, and then clearing
+            the input buffer.
+        """
+        # Disconnect, if necessary
+        if self.ser is not None and self.ser.is_open:
+            if allow_disconnect:
+                try:
+                    self.ser.close()
+                    self.ser = None
+                except:
+                    pass
+
+                self.port_status = "disconnected"
+            elif raise_exceptions:
+                raise RuntimeError(f"Already connected to port {self.port}.")
+
+        # Match requested port with known port
+        if port in self.ports:
+            port = port.device
+        elif type(port) == int and port < len(self.ports):
+            port = self.ports[port].device
+        elif port in self.reverse_available_ports:
+            port = self.reverse_available_ports[port]
+        elif port not in self.available_ports:
+            # A port search hasn't been done that includes port being asked for
+            self.portsearch()
+
+        # Indentify the port we're trying to connect to
+        self.port = port
+
+        # A replay needs no handshake, which would skip its start
+        if isinstance(self.port, str) and self.port.startswith(replay.port_prefix):
+            try:
+                self.ser = replay.ReplaySerial(
+                    self.port[len(replay.port_prefix) :], speed=self.replay_speed
+                )
+                self.port_status = "connected"
+            except:
+                self.ser = None
+                self.port_status = "failed"
+
+                raise RuntimeError(f"Replay of {port} failed.")
+
+            return
+
+        # Make the connection
+        try:
+            self.ser = serial.Serial(
+                port=self.port,
+                baudrate=self.baudrate,
+                bytesize=self.bytesize,
+                parity=self.parity,
+                stopbits=self.stopbits,
+            )
+            self.port_status = "connected"
+        except:
+            self.ser = None
+            self.port_status = "failed"
+
+            raise RuntimeError(f"Connection to port {port} failed.")
+
+        # Handshake
+        if handshake:
+            comms.handshake_board(self.ser)
+
+    def disconnect(self):
+        """Disconnect port."""
+        try:
+            self.ser.close()
+        except:
+            pass
+
+        self.ser = None
+        self.port_status = "disconnected"
@@ -2,15 +2,12 @@ import asyncio
 import sys
 
 import numpy as np
-import pandas as pd
-
-import serial
-import serial.tools.list_ports
 
 import bokeh.plotting
 import bokeh.io
 import bokeh.layouts
 import bokeh.driving
+import bokeh.events
 
 from bokeh.server.server import Server
 from bokeh.application import Application
@@ -19,351 +16,58 @@ from bokeh.application.handlers.function import FunctionHandler
 from . import boards
 from . import callbacks
 from . import comms
+from . import derived
+from . import linestore
 from . import parsers
-
-# Allowed values of selector parameters
-allowed_baudrates = (
-    300,
-    1200,
-    2400,
-    4800,
-    9600,
-    19200,
-    38400,
-    57600,
-    74880,
-    115200,
-    230400,
-    250000,
-    500000,
-    1000000,
-    2000000,
-)
-
-allowed_time_columns = ("none", 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
-
-allowed_delimiters = (
-    "comma",
-    "space",
-    "tab",
-    "whitespace",
-    "vertical line",
-    "semicolon",
-    "asterisk",
-    "slash",
+from . import profiles
+from . import pump
+from . import stats
+from . import trigger
+
+from .connection import SerialConnection
+from .options import *
+from .options import (
+    _check_baudrate,
+    _check_maxcols,
+    _check_delimiter,
+    _check_timecolumn,
+    _check_timeunits,
+    _check_timecounterbits,
+    _check_rollover,
+    _check_capture,
+    _check_outputbackend,
+    _check_renderer,
+    _check_acquisition,
+    _check_derived,
+    _check_framerows,
+    _check_delay,
+    _check_replay,
+    _check_replayspeed,
+    _check_compression,
+    _check_inputtype,
+    _check_glyph,
+    _check_portmatch,
 )
 
-allowed_timeunits = ("none", "µs", "ms", "s", "min", "hr")
-
-allowed_glyphs = ("lines", "dots", "both")
-
-allowed_rollover = (100, 200, 400, 800, 1600, 3200)
-
-max_max_cols = 10
-
-
-def _check_baudrate(baudrate):
-    if baudrate not in allowed_baudrates:
-        err_str = "Inputted baudrate {baudrate} is not allowed. Allowed baudrates (in units of baud = bits per second) are: \n"
-
-        for br in allowed_baudrates:
-            err_str += f"  {br}\n"
-
-        raise RuntimeError(err_str)
-
-
-def _check_maxcols(maxcols):
-    if maxcols < 1 or maxcols > max_max_cols:
-        raise RuntimeError(
-            f"Inputted maxcols {maxcols} is invalid. maxcols must be between 1 and {max_max_cols}."
-        )
-
-
-def _check_delimiter(delimiter):
-    if delimiter not in allowed_delimiters:
-        err_str = f'Inputted delimiter "{delimiter}" is not allowed. Allowed delimiters are: \n'
-
-        for dl in allowed_delimiters:
-            err_str += f"  {dl}\n"
-
-        raise RuntimeError(err_str)
-
-
-def _check_timecolumn(timecolumn, maxcols):
-    if timecolumn == "none":
-        return None
-
-    try:
-        timecolumn = int(timecolumn)
-    except:
-        raise RuntimeError(
-            "Inputted timecolumn {timecolumn} is invalid. timecolumn must be an integer."
-        )
-
-    if timecolumn < 0 or timecolumn >= maxcols:
-        raise RuntimeError(
-            f"Inputted timecolumn {timecolumn} is invalid. Must have 0 ≤ timecolumn < maxcols. You have selected maxcols = {maxcols}."
-        )
-
-
-def _check_timeunits(timeunits):
-    if timeunits not in allowed_timeunits:
-        err_str = f'Inputted timeunits "{timeunits}" is not allowed. Allowed time units are: \n'
-
-        for tu in allowed_timeunits:
-            err_str += f"  {tu}\n"
-
-        raise RuntimeError(err_str)
-
-
-def _check_rollover(rollover):
-    if rollover not in allowed_rollover:
-        err_str = f'Inputted rollover "{rollover}" is not allowed. Allowed rollover values are: \n'
-
-        for ro in allowed_rollover:
-            err_str += f"  {ro}\n"
-
-        raise RuntimeError(err_str)
-
-
-def _check_inputtype(inputtype):
-    if inputtype not in ["ascii", "bytes"]:
-        raise RuntimeError(
-            'Inputted input type "{inputtype}" is not allowed. Must be either "ascii" or "bytes".'
-        )
-
-
-def _check_glyph(glyph):
-    if glyph not in allowed_glyphs:
-        err_str = (
-            f'  Inputted glyph "{glyph}" is not allowed. Allowed glyph choises are: \n'
-        )
-
-        for g in allowed_glyphs:
-            err_str += f"  {g}\n"
-
-        raise RuntimeError(err_str)
-
-
-class SerialConnection(object):
-    """Class containing details about a serial connection.
-
-    Attributes
-    ----------
-    ser : serial.Serial instance
-        Serial connection to a device.
-    port : str
-        Name of the port of the connection. This is not the device name,
-        but a descriptive name.
-    baudrate : int
-        Baud rate of the connection
-    bytesize : int
-        Number of data bits. Possible values: serial.FIVEBITS,
-        serial.SIXBITS, serial.SEVENBITS, serial.EIGHTBITS
-    parity : int
-        Enable parity checking. Possible values: serial.PARITY_NONE,
-        serial.PARITY_EVEN, serial.PARITY_ODD, serial.PARITY_MARK,
-        serial.PARITY_SPACE.
-    stopbits : int
-        Number of stop bits. Possible values: serial.STOPBITS_ONE,
-        serial.STOPBITS_ONE_POINT_FIVE, serial.STOPBITS_TWO
-    ports : list
-        List of ports that are available. Each entry is a
-        serial.tools.list_ports_common.ListPortInfo instance.
-    available_ports : dict
-        A dictionary with the descriptive port names as keys and strings
-        with the name of the ports such that they can be opened with
-        `serial.Serial()` as values.
-    reverse_available_ports : dict
-        A dictionary with the descriptive port names as values and
-        strings with the name of the ports such that they can be opened
-        with `serial.Serial()` as keys.
-    port_status : str
-        The status of the port. Either "disconnected", "establishing",
-        "connected", or "failed".
-    daq_task : async task
-        Task for data acquisition.
-    daq_delay : float
-        Approximate time, in milliseconds, between data acquisitions.
-    port_search_task : async task
-        Task for checking for available ports.
-    port_search_delay : float
-        Approximate time, in milliseconds, between checks of available
-        ports.
-    kill_app : bool
-        If True, kill the connect/app.
-    """
-
-    def __init__(
-        self,
-        port=None,
-        baudrate=115200,
-        daq_delay=20,
-        port_search_delay=1000,
-        bytesize=8,
-        parity="N",
-        stopbits=1,
-    ):
-        """Create an instance storing information about a serial
-        connection.
-
-        Parameters
-        ----------
-        port : str, default None
-            If given, name of the port to connect to. If None, no device
-            is connected.
-        baudrate : int
-            Baud rate of the connection
-        daq_delay : float
-            Approximate time, in milliseconds, between data acquisitions.
-        bytesize : int
-            Number of data bits. Possible values: serial.FIVEBITS,
-            serial.SIXBITS, serial.SEVENBITS, serial.EIGHTBITS
-        parity : int
-            Enable parity checking. Possible values: serial.PARITY_NONE,
-            serial.PARITY_EVEN, serial.PARITY_ODD, serial.PARITY_MARK,
-            serial.PARITY_SPACE.
-        stopbits : int
-            Number of stop bits. Possible values: serial.STOPBITS_ONE,
-            serial.STOPBITS_ONE_POINT_FIVE, serial.STOPBITS_TWO
-        """
-        self.ser = None
-        self.baudrate = baudrate
-        self.bytesize = bytesize
-        self.parity = parity
-        self.stopbits = stopbits
-        self.ports = []
-        self.available_ports = dict()
-        self.reverse_available_ports = dict()
-        self.port_status = "disconnected"
-        self.daq_task = None
-        self.daq_delay = daq_delay
-        self.port_search_task = None
-        self.port_search_delay = port_search_delay
-        self.kill_app = False
-
-        # Attempt to connect to a port if provided
-        if port is None:
-            self.port = port
-        else:
-            self.connect(port)
-
-    def portsearch(self, on_change=True):
-        """Search for ports and update port information.
-
-        Parameters
-        ----------
-        on_change : bool, default True
-            If True, only update `ports`, `available_ports`, and
-            `reverse_available_ports` attributes if there was a change
-            in the available ports.
-        """
-        ports = serial.tools.list_ports.comports()
-
-        if not on_change or ports != self.ports:
-            self.ports = [port for port in ports]
-
-            options = [comms.device_name(port_name) for port_name in ports]
-
-            # Dictionary of port names and name in port selector
-            self.available_ports = {
-                port_name.device: option_name
-                for port_name, option_name in zip(ports, options)
-            }
-
-            # Reverse lookup for value in port selector to port name
-            self.reverse_available_ports = {
-                option_name: port_name.device
-                for port_name, option_name in zip(ports, options)
-            }
-
-    def connect(self, port, allow_disconnect=False, handshake=True):
-        """Connect to a port.
-
-        Parameters
-        ----------
-        port : str, int, or serial.tools.list_ports_common.ListPortInfo instance
-            Port to which to connect. If an int, connect to port given
-            by self.ports[port].
-        allow_disconnect : bool, default True
-            If already connected to a port, allow disconnection. If
-            False, raise an exception if already connected.
-        handshake : bool, default True
-            If True, "handshake" with the connected device by closing,
-            reopening connection waiting a second, and then clearing
-            the input buffer.
-        """
-        # Disconnect, if necessary
-        if self.ser is not None and self.ser.is_open:
-            if allow_disconnect:
-                try:
-                    self.ser.close()
-                    self.ser = None
-                except:
-                    pass
-
-                self.port_status = "disconnected"
-            elif raise_exceptions:
-                raise RuntimeError(f"Already connected to port {self.port}.")
-
-        # Match requested port with known port
-        if port in self.ports:
-            port = port.device
-        elif type(port) == int and port < len(self.ports):
-            port = self.ports[port].device
-        elif port in self.reverse_available_ports:
-            port = self.reverse_available_ports[port]
-        elif port not in self.available_ports:
-            # A port search hasn't been done that includes port being asked for
-            self.portsearch()
-
-        # Indentify the port we're trying to connect to
-        self.port = port
-
-        # Make the connection
-        try:
-            self.ser = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                bytesize=self.bytesize,
-                parity=self.parity,
-                stopbits=self.stopbits,
-            )
-            self.port_status = "connected"
-        except:
-            self.ser = None
-            self.port_status = "failed"
-
-            raise RuntimeError(f"Connection to port {port} failed.")
-
-        # Handshake
-        if handshake:
-            comms.handshake_board(self.ser)
-
-    def disconnect(self):
-        """Disconnect port."""
-        try:
-            self.ser.close()
-        except:
-            pass
-
-        self.ser = None
-        self.port_status = "disconnected"
-
 
 class Controls(object):
     def __init__(
         self,
         baudrate=115200,
-        max_cols=max_max_cols,
+        max_cols=10,
         delimiter="comma",
         columnlabels="",
         timecolumn="none",
         timeunits="ms",
+        timecounterbits="none",
         rollover=400,
         glyph="lines",
         inputtype="ascii",
         fileprefix="_tmp",
+        derived_channels="",
+        daqdelay=20,
+        streamdelay=90,
+        portsearchdelay=1000,
     ):
         """Create all of the controls for the serial dashboard."""
         self.plot_stream = bokeh.models.Toggle(
@@ -374,6 +78,18 @@ class Controls(object):
             label="clear", button_type="warning", width=100
         )
 
+        self.plot_history = bokeh.models.Toggle(
+            label="history", button_type="primary", width=100
+        )
+
+        self.plot_stats = bokeh.models.Toggle(
+            label="statistics", button_type="primary", width=100
+        )
+
+        self.plot_errors = bokeh.models.Toggle(
+            label="parse errors", button_type="primary", width=100
+        )
+
         self.monitor_stream = bokeh.models.Toggle(
             label="stream", button_type="success", width=100
         )
@@ -418,6 +134,45 @@ class Controls(object):
             text='<p style="font-size: 8pt;">No data saved.</p>', width=100
         )
 
+        self.monitor_scroll = bokeh.models.Slider(
+            start=0,
+            end=1,
+            value=1,
+            step=1,
+            orientation="vertical",
+            show_value=False,
+            title="",
+            height=250,
+        )
+
+        self.monitor_search = bokeh.models.TextInput(
+            value="", placeholder="search (regular expression)", width=250
+        )
+
+        self.monitor_filter = bokeh.models.Toggle(
+            label="filter", button_type="primary", width=60
+        )
+
+        self.monitor_prev = bokeh.models.Button(
+            label="previous", button_type="primary", width=70
+        )
+
+        self.monitor_next = bokeh.models.Button(
+            label="next", button_type="primary", width=70
+        )
+
+        self.monitor_timestamps = bokeh.models.Toggle(
+            label="timestamps", button_type="primary", width=100
+        )
+
+        self.monitor_display = bokeh.models.RadioGroup(
+            labels=["text", "hex"], active=0, inline=True, width=100
+        )
+
+        self.monitor_search_status = bokeh.models.Div(
+            text='<p style="font-size: 8pt;"></p>', width=150
+        )
+
         self.delimiter = bokeh.models.Select(
             title="delimiter",
             value=delimiter,
@@ -425,10 +180,11 @@ class Controls(object):
             width=100,
         )
 
-        self.rollover = bokeh.models.Select(
+        self.rollover = bokeh.models.Spinner(
             title="plot rollover",
-            value=str(rollover),
-            options=[str(ro) for ro in allowed_rollover],
+            value=rollover,
+            low=1,
+            step=100,
             width=100,
         )
 
@@ -436,7 +192,6 @@ class Controls(object):
             title="maximum number of columns",
             value=max_cols,
             low=1,
-            high=max_max_cols,
             step=1,
             width=100,
         )
@@ -445,6 +200,13 @@ class Controls(object):
             title="column labels", value=columnlabels, width=200
         )
 
+        self.derived = bokeh.models.TextInput(
+            title="derived channels",
+            value=derived_channels,
+            placeholder="e.g., mean(1, 50), fft(1, 256)",
+            width=200,
+        )
+
         # Set up port selector
         self.port = bokeh.models.Select(title="port", options=[], value="", width=200)
 
@@ -468,10 +230,14 @@ class Controls(object):
             text="<p><b>port status:</b> disconnected</p>", width=200
         )
 
+        self.update_stats = bokeh.models.Div(
+            text='<p style="font-size: 8pt;">No updates yet.</p>', width=200
+        )
+
         self.time_column = bokeh.models.Select(
             title="time column",
-            value=timecolumn,
-            options=[str(tc) for tc in allowed_time_columns],
+            value=str(timecolumn),
+            options=["none", "host"] + [str(col) for col in range(max_cols)],
             width=100,
         )
 
@@ -482,6 +248,78 @@ class Controls(object):
             width=100,
         )
 
+        self.time_counter_bits = bokeh.models.Select(
+            title="time counter bits",
+            value=str(timecounterbits),
+            options=[str(tcb) for tcb in allowed_time_counter_bits],
+            width=100,
+        )
+
+        self.trigger_mode = bokeh.models.Select(
+            title="trigger",
+            value="off",
+            options=list(trigger.allowed_trigger_modes),
+            width=100,
+        )
+
+        self.trigger_column = bokeh.models.Select(
+            title="trigger column",
+            value="1" if str(timecolumn) == "0" else "0",
+            options=[str(col) for col in range(max_cols)],
+            width=100,
+        )
+
+        self.trigger_edge = bokeh.models.Select(
+            title="trigger edge",
+            value="rising",
+            options=list(trigger.allowed_trigger_edges),
+            width=100,
+        )
+
+        self.trigger_level = bokeh.models.Spinner(
+            title="trigger level", value=0, step=0.1, width=100
+        )
+
+        self.trigger_pre = bokeh.models.Spinner(
+            title="rows before trigger", value=100, low=0, step=10, width=100
+        )
+
+        self.trigger_post = bokeh.models.Spinner(
+            title="rows after trigger", value=300, low=1, step=10, width=100
+        )
+
+        self.daq_delay = bokeh.models.Spinner(
+            title="acquisition period (ms)", value=daqdelay, low=1, step=5, width=150
+        )
+
+        self.stream_delay = bokeh.models.Spinner(
+            title="update delay (ms)", value=streamdelay, low=1, step=10, width=150
+        )
+
+        self.port_search_delay = bokeh.models.Spinner(
+            title="port search period (ms)",
+            value=portsearchdelay,
+            low=100,
+            step=100,
+            width=150,
+        )
+
+        self.latency_command = bokeh.models.TextInput(
+            title="probe command", value="{tag}\\n", width=150
+        )
+
+        self.latency_probe = bokeh.models.Button(
+            label="probe latency", width=150, disabled=True
+        )
+
+        self.trigger_arm = bokeh.models.Button(
+            label="arm", button_type="success", width=100, disabled=True
+        )
+
+        self.trigger_status = bokeh.models.Div(
+            text='<p style="font-size: 8pt;">Trigger off.</p>', width=200
+        )
+
         self.input_window = bokeh.models.TextAreaInput(
             title="input", value="", width=150
         )
@@ -490,8 +328,17 @@ class Controls(object):
             label="send", button_type="primary", width=50, disabled=True
         )
 
+        self.input_stop = bokeh.models.Button(
+            label="stop", button_type="warning", width=50, disabled=True
+        )
+
+        self.input_status = bokeh.models.Div(
+            text='<p style="font-size: 8pt;">idle</p>', width=150
+        )
+
         self.ascii_bytes = bokeh.models.RadioGroup(
-            labels=["ascii", "bytes"], active=(0 if inputtype == "ascii" else 1)
+            labels=["ascii", "bytes", "script"],
+            active=["ascii", "bytes", "script"].index(inputtype),
         )
 
         self.shutdown = bokeh.models.Button(
@@ -518,19 +365,32 @@ class Controls(object):
 class SerialPlotter(object):
     def __init__(
         self,
-        max_cols=max_max_cols,
+        max_cols=10,
         delimiter="comma",
         columnlabels="",
         timecolumn="none",
         timeunits="ms",
+        timecounterbits="none",
         rollover=400,
         glyph="lines",
+        capture="memory",
+        fileprefix="_tmp",
+        output_backend="auto",
+        renderer="separate",
+        derived_channels="",
+        autocolumns=False,
     ):
         """Create a serial plotter."""
         self.prev_data_length = 0
         self.data = []
-        self.time_column = "none" if timecolumn == "none" else int(timecolumn)
+        self.host_times = []
+        self.time_column = (
+            timecolumn if timecolumn in ("none", "host") else int(timecolumn)
+        )
         self.time_units = timeunits
+        self.time_unwrapper = parsers.TimeUnwrapper(
+            None if timecounterbits == "none" else int(timecounterbits)
+        )
         self.max_cols = max_cols
         self.streaming = False
         self.sources = []
@@ -538,12 +398,42 @@ class SerialPlotter(object):
         self.col_labels = parsers._column_labels_str_to_list(
             columnlabels, self.delimiter, self.max_cols
         )
+        self.layout = parsers.ColumnLayout() if autocolumns else None
+        self.layout_shown = 0
         self.lines = None
         self.dots = None
         self.lines_visible = glyph in ("lines", "both")
         self.dots_visible = glyph in ("dots", "both")
         self.rollover = rollover
+        self.capture = capture
+        self.fileprefix = fileprefix
+        self.history = None
+        self.history_mode = False
+        self.history_rebuild = None
+        self.output_backend = output_backend
+        self.renderer = renderer
+        self.line_source = None
+        self.dot_source = None
+        self.batched_t = []
+        self.batched_y = []
+        self.batched_capacity = 0
+        self.batched_written = []
+        self.derived = (
+            derived.DerivedChannels(derived_channels) if derived_channels else None
+        )
+        self.derived_sources = []
+        self.derived_lines = []
+        self.spectrum_sources = []
+        self.spectrum_lines = []
         self.plot, self.legend, self.phantom_source = self.base_plot()
+        self.spectrum_plot, self.spectrum_legend = self.spectrum_base_plot()
+        self.stats = stats.StreamingStats(max_cols, window=rollover)
+        self.stats_source, self.stats_table = self.stats_base_table()
+        self.stats_shown = None
+        self.parse_errors = parsers.ParseErrors()
+        self.errors_div = bokeh.models.Div(width=700, visible=False)
+        self.trigger = None
+        self.trigger_frame = None
 
     def base_plot(self):
         """Build a plot of voltage vs time data"""
@@ -555,6 +445,9 @@ class SerialPlotter(object):
             y_axis_label=" ",
             toolbar_location="above",
             title="serial plotter",
+            output_backend=callbacks._output_backend(
+                self.rollover, self.max_cols, self.output_backend
+            ),
         )
 
         # No range padding on x: signal spans whole plot
@@ -584,6 +477,87 @@ class SerialPlotter(object):
 
         return p, legend, phantom_source
 
+    def stats_base_table(self):
+        """Build a table of statistics of each channel"""
+        source = bokeh.models.ColumnDataSource(
+            data={
+                key: []
+                for key in [
+                    "channel",
+                    "n",
+                    "nan",
+                    "rate",
+                    "mean",
+                    "std",
+                    "min",
+                    "max",
+                    "window_mean",
+                    "window_std",
+                    "window_min",
+                    "window_max",
+                ]
+            }
+        )
+
+        formatter = bokeh.models.NumberFormatter(format="0.[000]")
+        columns = [bokeh.models.TableColumn(field="channel", title="channel")]
+        columns += [
+            bokeh.models.TableColumn(field=field, title=title, formatter=formatter)
+            for field, title in [
+                ("n", "n"),
+                ("nan", "NaNs"),
+                ("rate", "rate (Hz)"),
+                ("mean", "mean"),
+                ("std", "std"),
+                ("min", "min"),
+                ("max", "max"),
+                ("window_mean", "win mean"),
+                ("window_std", "win std"),
+                ("window_min", "win min"),
+                ("window_max", "win max"),
+            ]
+        ]
+
+        table = bokeh.models.DataTable(
+            source=source,
+            columns=columns,
+            width=700,
+            height=150,
+            index_position=None,
+            visible=False,
+        )
+
+        return source, table
+
+    def spectrum_base_plot(self):
+        """Build a plot of spectra of derived FFT channels"""
+        p = bokeh.plotting.figure(
+            frame_width=600,
+            frame_height=150,
+            x_axis_label=derived._frequency_label(self.time_column, self.time_units),
+            y_axis_label="amplitude",
+            toolbar_location="above",
+            title="spectrum",
+            visible=self.derived is not None and len(self.derived.fft_labels) > 0,
+        )
+
+        p.x_range.range_padding = 0
+        p.border_fill_color = "whitesmoke"
+
+        legend = bokeh.models.Legend(
+            items=[],
+            location="center",
+            label_text_font_size="8pt",
+            spacing=1,
+            label_height=15,
+            glyph_height=15,
+            click_policy="hide",
+        )
+
+        p.add_layout(legend, "right")
+
+        return p, legend
+
 
 class SerialMonitor(object):
     def __init__(self, scroll_snap=True):
@@ -676,17 +650,36 @@ class SerialMonitor(object):
 
 <div class="monitorData"><div class="monitorInner"><pre></pre></div></div>"""
 
+        self.empty_text = self.base_text if scroll_snap else self.alternative_base_text
+
         self.monitor = bokeh.models.Div(
-            text=self.base_text if scroll_snap else self.alternative_base_text,
+            text=self.empty_text,
             background="whitesmoke",
             height=250,
             width=650,
             sizing_mode="fixed",
         )
         self.prev_data_length = 0
-        self.data = []
+        self.data = linestore.LineStore()
         self.streaming = False
 
+        # Only a window of lines is sent to the browser, ending at line
+        # view_end, or at the last line if view_end is None
+        self.window_lines = 200
+        self.view_end = None
+
+        # Search of the lines, as compiled from bytes and from str
+        self.regex = None
+        self.display_regex = None
+        self.matches = np.array([], dtype=np.int64)
+        self.n_searched = 0
+        self.match_index = None
+        self.filter = False
+
+        # Display of a hex dump instead of text, and of timestamps
+        self.hex = False
+        self.timestamps = False
+
 
 def _layout(plotter, monitor, controls):
     """Build layout of serial dashboard.
@@ -711,6 +704,12 @@ def _layout(plotter, monitor, controls):
         bokeh.models.Spacer(height=20),
         controls.plot_clear,
         bokeh.models.Spacer(height=20),
+        controls.plot_history,
+        bokeh.models.Spacer(height=20),
+        controls.plot_stats,
+        bokeh.models.Spacer(height=20),
+        controls.plot_errors,
+        bokeh.models.Spacer(height=20),
         controls.plot_save,
         bokeh.layouts.row(
             controls.plot_file_input,
@@ -720,7 +719,12 @@ def _layout(plotter, monitor, controls):
     )
     plotter_layout = bokeh.layouts.row(
         plotter_buttons,
-        plotter.plot,
+        bokeh.layouts.column(
+            plotter.plot,
+            plotter.spectrum_plot,
+            plotter.stats_table,
+            plotter.errors_div,
+        ),
         bokeh.layouts.column(bokeh.models.Spacer(height=85), controls.glyph),
         margin=(30, 0, 0, 0),
         background="whitesmoke",
@@ -728,9 +732,11 @@ def _layout(plotter, monitor, controls):
 
     input_layout = bokeh.layouts.row(
         bokeh.models.Spacer(width=10),
-        controls.input_window,
+        bokeh.layouts.column(controls.input_window, controls.input_status),
         bokeh.models.Spacer(width=20),
-        bokeh.layouts.column(bokeh.models.Spacer(height=20), controls.input_send),
+        bokeh.layouts.column(
+            bokeh.models.Spacer(height=20), controls.input_send, controls.input_stop
+        ),
         bokeh.models.Spacer(width=20),
         bokeh.layouts.column(bokeh.models.Spacer(height=17), controls.ascii_bytes),
         background="whitesmoke",
@@ -750,6 +756,7 @@ def _layout(plotter, monitor, controls):
         controls.port_connect,
         controls.port_disconnect,
         controls.port_status,
+        controls.update_stats,
         background="whitesmoke",
     )
 
@@ -764,7 +771,41 @@ def _layout(plotter, monitor, controls):
         bokeh.models.Spacer(height=10),
         controls.time_units,
         bokeh.models.Spacer(height=10),
+        controls.time_counter_bits,
+        bokeh.models.Spacer(height=10),
         controls.rollover,
+        bokeh.models.Spacer(height=10),
+        controls.derived,
+        background="whitesmoke",
+    )
+
+    trigger_controls = bokeh.layouts.column(
+        controls.trigger_mode,
+        bokeh.models.Spacer(height=10),
+        controls.trigger_column,
+        bokeh.models.Spacer(height=10),
+        controls.trigger_edge,
+        bokeh.models.Spacer(height=10),
+        controls.trigger_level,
+        bokeh.models.Spacer(height=10),
+        controls.trigger_pre,
+        bokeh.models.Spacer(height=10),
+        controls.trigger_post,
+        bokeh.models.Spacer(height=10),
+        controls.trigger_arm,
+        controls.trigger_status,
+        background="whitesmoke",
+    )
+
+    timing_controls = bokeh.layouts.column(
+        controls.daq_delay,
+        bokeh.models.Spacer(height=10),
+        controls.stream_delay,
+        bokeh.models.Spacer(height=10),
+        controls.port_search_delay,
+        bokeh.models.Spacer(height=10),
+        controls.latency_command,
+        controls.latency_probe,
         background="whitesmoke",
     )
 
@@ -782,19 +823,38 @@ def _layout(plotter, monitor, controls):
             ),
         ),
         controls.monitor_save_notice,
+        controls.monitor_timestamps,
+        controls.monitor_display,
+    )
+
+    monitor_search = bokeh.layouts.row(
+        controls.monitor_search,
+        controls.monitor_filter,
+        controls.monitor_prev,
+        controls.monitor_next,
+        controls.monitor_search_status,
     )
 
     monitor_layout = bokeh.layouts.row(
         monitor_buttons,
         bokeh.models.Spacer(width=15),
-        monitor.monitor,
+        bokeh.layouts.column(monitor.monitor, monitor_search),
+        controls.monitor_scroll,
         bokeh.models.Spacer(width=10),
         margin=(30, 0, 30, 0),
         background="whitesmoke",
     )
 
     return bokeh.layouts.row(
-        bokeh.layouts.column(port_controls, bokeh.models.Spacer(height=30), specs),
+        bokeh.layouts.column(
+            port_controls,
+            bokeh.models.Spacer(height=30),
+            specs,
+            bokeh.models.Spacer(height=30),
+            trigger_controls,
+            bokeh.models.Spacer(height=30),
+            timing_controls,
+        ),
         bokeh.models.Spacer(width=20),
         bokeh.layouts.column(
             bokeh.layouts.row(
@@ -806,20 +866,71 @@ def _layout(plotter, monitor, controls):
     )
 
 
-def app(
+# Defaults of the keyword arguments of `app()` and `launch()`, which
+# are taken from a profile when not given
+_app_defaults = dict(
     baudrate=115200,
     maxcols=10,
     delimiter="comma",
     columnlabels="",
     timecolumn=None,
     timeunits="ms",
+    timecounterbits=None,
     rollover=400,
     glyph="lines",
     inputtype="ascii",
     fileprefix="_tmp",
+    capture="memory",
+    outputbackend="auto",
+    renderer="separate",
+    derived="",
     daqdelay=20,
     streamdelay=90,
+    framerows=1000,
+    acquisition="async",
     portsearchdelay=1000,
+    replay=None,
+    replayspeed=1.0,
+    rawcapture=False,
+    autocolumns=False,
+    portmatch=None,
+)
+
+_launch_defaults = dict(
+    port=5006,
+    browser=None,
+    **_app_defaults,
+    compression=1,
+)
+
+
+def app(
+    baudrate=profiles._unset,
+    maxcols=profiles._unset,
+    delimiter=profiles._unset,
+    columnlabels=profiles._unset,
+    timecolumn=profiles._unset,
+    timeunits=profiles._unset,
+    timecounterbits=profiles._unset,
+    rollover=profiles._unset,
+    glyph=profiles._unset,
+    inputtype=profiles._unset,
+    fileprefix=profiles._unset,
+    capture=profiles._unset,
+    outputbackend=profiles._unset,
+    renderer=profiles._unset,
+    derived=profiles._unset,
+    daqdelay=profiles._unset,
+    streamdelay=profiles._unset,
+    framerows=profiles._unset,
+    acquisition=profiles._unset,
+    portsearchdelay=profiles._unset,
+    replay=profiles._unset,
+    replayspeed=profiles._unset,
+    rawcapture=profiles._unset,
+    autocolumns=profiles._unset,
+    portmatch=profiles._unset,
+    profile=None,
 ):
     """Returns a function that can be used as a Bokeh app.
 
@@ -870,44 +981,139 @@ def app(
         2400, 4800, 9600, 19200, 38400, 57600, 74880, 115200, 230400,
         250000, 500000, 1000000, 2000000.
     maxcols : int, default 10
-        Maximum number of columns of data coming off of the board.
+        Maximum number of columns of data coming off of the board. Any
+        positive integer is allowed. Beyond ten columns, a color
+        palette is generated for the additional columns.
     delimiter : str, default "comma"
         Delimiter of data coming off of the board. Allowed values are
         "comma", "space", "tab", "whitespace", "vertical line",
-        "semicolon", "asterisk", "slash"
+        "semicolon", "asterisk", "slash", and "auto", which finds the
+        delimiter from the first lines received after connecting.
     columnlabels : str, default ""
         Labels for columnbs using the delimiter specified with
         `delimiter` keyword argument.
-    timecolumn : int, default None
-        Column (zero-indexed) of incoming data that specifies time
+    timecolumn : int or str, default None
+        Column (zero-indexed) of incoming data that specifies time. If
+        "host", the time each line arrived at the host computer is
+        used.
     timeunits : str, default "ms"
         Units of incoming time data. Allowed values are "none", "µs",
         "ms", "s", "min", "hr".
+    timecounterbits : int, default None
+        Width in bits of the hardware counter generating the time
+        column, e.g., 32 for Arduino's `micros()` and `millis()`. If
+        given, wraps of the counter are removed so that the time axis
+        is monotonic. Allowed values are None, 8, 16, 24, 32.
     rollover : int, default 400
         Number of data points to be shown on a plot for each column.
-        Allowed values are 100, 200, 400, 800, 1600, 3200.
+        Any positive integer is allowed. When `rollover` times
+        `maxcols` is large, the plot is rendered with WebGL, unless
+        otherwise specified with `outputbackend`.
     glyph : str, default "lines"
         Which glyphs to display in the plotter. Allowed values are
         "lines", "dots", "both".
     inputtype : str, default "ascii"
-        Whether input sent to the board is ASCII or bytes. Allowed
-        values are "ascii", "bytes".
+        Whether input sent to the board is ASCII, bytes, or a script
+        of commands. Allowed values are "ascii", "bytes", "script".
     fileprefix : str, default "_tmp"
         Prefix for output files
+    capture : str, default "memory"
+        Where the history of parsed data is held. If "memory", it is
+        held in RAM. If "disk", it is written to memory-mapped .npy
+        files named with `fileprefix` and a timestamp, which may be
+        loaded with `np.load()`, so that the length of a capture is
+        limited by disk space rather than RAM. Allowed values are
+        "memory", "disk".
+    outputbackend : str, default "auto"
+        Backend used to render the plot. If "auto", the plot is
+        rendered with WebGL when `rollover` times `maxcols` is large
+        and with HTML5 canvas otherwise. Allowed values are "auto",
+        "canvas", "webgl".
+    renderer : str, default "separate"
+        How the plotted columns are drawn. If "separate", each column
+        has its own line and dot glyphs. If "batched", all columns are
+        drawn with one multi-line glyph and one scatter glyph, which
+        reduces the number of glyphs the browser draws and updates
+        when there are many columns. Allowed values are "separate",
+        "batched".
+    derived : str, default ""
+        Channels computed from the incoming data as they arrive,
+        separated by commas, each of the form `kind(column)` or
+        `kind(column, parameter)`, where `column` is a zero-indexed
+        column of incoming data. Allowed kinds are "mean" and "rms"
+        (rolling mean and root-mean-square over `parameter` samples,
+        default 10), "diff" (difference between consecutive samples),
+        "ema" (exponential moving average with smoothing factor
+        `parameter`, default 0.1), and "fft" (amplitude spectrum of the
+        last `parameter` samples, default 256, shown in a separate
+        plot). For example, "mean(1, 50), fft(1, 512)".
     daqdelay : float, default 20.0
         Roughly the delay in data acquisition from the board in
         milliseconds. The true delay is a bit above 80% of this value.
     streamdelay : int, default 90
-        Delay between updates of the plotter and monitor in
-        milliseconds.
+        Maximum delay in milliseconds between the arrival of data and
+        the update of the plotter and monitor. Updates happen only when
+        data arrive, so nothing is sent to the browser when idle.
+    framerows : int, default 1000
+        Number of newly arrived rows of data that trigger an update of
+        the plotter without waiting for `streamdelay` to elapse.
+        Updates are still at least 30 ms apart and are held if the
+        browser falls behind.
+    acquisition : str, default "async"
+        Where data from the board are read and parsed. If "async", they
+        are read and parsed in the same process as the dashboard. If
+        "process", they are read and parsed in a separate worker
+        process and handed to the dashboard through shared memory,
+        which keeps the dashboard responsive at very high line rates.
+        Allowed values are "async", "process".
     portsearchdelay : int, default 1000
         Delay between checks of connected serial devices in
         milliseconds.
+    replay : str or None, default None
+        Stem of a raw capture, as written by `capture.RawCaptureFile`,
+        that is offered as a port. Connecting to it replays the capture
+        through the dashboard as if it were arriving from a device.
+    replayspeed : float, default 1.0
+        Factor by which a replay is faster than its recording, or 0 to
+        replay as fast as possible.
+    rawcapture : bool, default False
+        If True, all bytes read from a device are recorded, exactly as
+        read and whether or not the plotter and monitor are streaming,
+        to `{fileprefix}_{timestamp}_raw.bin`, with an index of when
+        each chunk was read in `{fileprefix}_{timestamp}_raw_index.npy`.
+        A new recording is started on each connection.
+    autocolumns : bool, default False
+        If True, column labels are taken from a header line or from
+        `key:value` or `key=value` pairs in the data, and the number of
+        columns grows as more appear in the data, unless the capture is
+        on disk or parsed in a worker process, in which case only the
+        labels are taken from the data.
+    portmatch : str, list of str, or None, default None
+        Pattern or patterns with shell-style wildcards, such as
+        "*usbmodem*" or "*Arduino*". The first port whose device name
+        or descriptive name matches one, ignoring case, is connected to
+        as soon as it is found, and the plotter starts streaming. This
+        is done once per browser session.
+    profile : str, dict, or None, default None
+        TOML or YAML file of settings named as the keyword arguments of
+        this function, or the name, without extension, of such a file
+        in `~/.serial_dashboard/profiles`, or settings returned by
+        `load_profile()`. Arguments not given are taken from the
+        profile. The profile is read and checked once, and its settings
+        apply to every browser session.
     """
+    # Arguments not given are taken from a profile or their defaults
+    if profiles._unset in locals().values():
+        return app(**profiles.apply_profile(profile, _app_defaults, locals()))
+
     # Time column is expected to be a string or an integer
     if timecolumn is None:
         timecolumn = "none"
 
+    # Time counter bits are "none" or an integer
+    if timecounterbits is None:
+        timecounterbits = "none"
+
     # We can be a bit flexible on delimiters
     delimiter_conversion = {
         ",": "comma",
@@ -928,14 +1134,34 @@ def app(
     _check_delimiter(delimiter),
     _check_timecolumn(timecolumn, maxcols),
     _check_timeunits(timeunits),
+    _check_timecounterbits(timecounterbits),
     _check_rollover(rollover),
     _check_glyph(glyph),
+    _check_capture(capture),
+    _check_outputbackend(outputbackend),
+    _check_renderer(renderer),
+    _check_framerows(framerows),
+    _check_acquisition(acquisition),
+    _check_derived(derived),
     _check_inputtype(inputtype),
+    _check_delay("daqdelay", daqdelay),
+    _check_delay("streamdelay", streamdelay),
+    _check_delay("portsearchdelay", portsearchdelay),
+    _check_replay(replay),
+    _check_replayspeed(replayspeed),
+    _check_portmatch(portmatch),
 
     def _app(doc):
         # "Global" variables
         serial_connection = SerialConnection(
-            baudrate=baudrate, daq_delay=daqdelay, port_search_delay=portsearchdelay
+            baudrate=baudrate,
+            daq_delay=daqdelay,
+            port_search_delay=portsearchdelay,
+            acquisition=acquisition,
+            replay=replay,
+            replay_speed=replayspeed,
+            record_raw=rawcapture,
+            port_match=portmatch,
         )
         controls = Controls(
             baudrate=baudrate,
@@ -944,10 +1170,15 @@ def app(
             columnlabels=columnlabels,
             timecolumn=timecolumn,
             timeunits=timeunits,
+            timecounterbits=timecounterbits,
             rollover=rollover,
             glyph=glyph,
             inputtype=inputtype,
             fileprefix=fileprefix,
+            derived_channels=derived,
+            daqdelay=daqdelay,
+            streamdelay=streamdelay,
+            portsearchdelay=portsearchdelay,
         )
         plotter = SerialPlotter(
             max_cols=maxcols,
@@ -955,8 +1186,15 @@ def app(
             columnlabels=columnlabels,
             timecolumn=timecolumn,
             timeunits=timeunits,
+            timecounterbits=timecounterbits,
             rollover=rollover,
             glyph=glyph,
+            capture=capture,
+            fileprefix=fileprefix,
+            output_backend=outputbackend,
+            renderer=renderer,
+            derived_channels=derived,
+            autocolumns=autocolumns,
         )
         monitor = SerialMonitor()
 
@@ -987,6 +1225,18 @@ def app(
 
         controls.input_send.on_click(_input_send_callback)
 
+        def _input_stop_callback(event=None):
+            callbacks.input_stop_callback(plotter, monitor, controls, serial_connection)
+
+        controls.input_stop.on_click(_input_stop_callback)
+
+        def _latency_probe_callback(event=None):
+            callbacks.latency_probe_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.latency_probe.on_click(_latency_probe_callback)
+
         def _monitor_stream_callback(event=None):
             callbacks.monitor_stream_callback(
                 plotter, monitor, controls, serial_connection
@@ -1015,6 +1265,34 @@ def app(
 
         controls.monitor_write.on_click(_monitor_write_callback)
 
+        def _monitor_filter_callback(event=None):
+            callbacks.monitor_filter_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.monitor_filter.on_click(_monitor_filter_callback)
+
+        def _monitor_timestamps_callback(event=None):
+            callbacks.monitor_timestamps_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.monitor_timestamps.on_click(_monitor_timestamps_callback)
+
+        def _monitor_prev_callback(event=None):
+            callbacks.monitor_prev_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.monitor_prev.on_click(_monitor_prev_callback)
+
+        def _monitor_next_callback(event=None):
+            callbacks.monitor_next_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.monitor_next.on_click(_monitor_next_callback)
+
         def _plot_stream_callback(event=None):
             callbacks.plot_stream_callback(
                 plotter, monitor, controls, serial_connection
@@ -1027,6 +1305,32 @@ def app(
 
         controls.plot_clear.on_click(_plot_clear_callback)
 
+        def _plot_history_callback(event=None):
+            callbacks.plot_history_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.plot_history.on_click(_plot_history_callback)
+
+        def _plot_stats_callback(event=None):
+            callbacks.plot_stats_callback(plotter, monitor, controls, serial_connection)
+
+        controls.plot_stats.on_click(_plot_stats_callback)
+
+        def _plot_errors_callback(event=None):
+            callbacks.plot_errors_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.plot_errors.on_click(_plot_errors_callback)
+
+        def _history_range_callback(event=None):
+            callbacks.history_range_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        plotter.plot.on_event(bokeh.events.RangesUpdate, _history_range_callback)
+
         def _plot_save_callback(event=None):
             callbacks.plot_save_callback(plotter, monitor, controls, serial_connection)
 
@@ -1088,6 +1392,13 @@ def app(
 
         controls.time_units.on_change("value", _time_units_callback)
 
+        def _time_counter_bits_callback(attr, old, new):
+            callbacks.time_counter_bits_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.time_counter_bits.on_change("value", _time_counter_bits_callback)
+
         def _max_cols_callback(attr, old, new):
             callbacks.max_cols_callback(plotter, monitor, controls, serial_connection)
 
@@ -1098,6 +1409,11 @@ def app(
 
         controls.col_labels.on_change("value", _col_labels_callback)
 
+        def _derived_callback(attr, old, new):
+            callbacks.derived_callback(plotter, monitor, controls, serial_connection)
+
+        controls.derived.on_change("value", _derived_callback)
+
         def _rollover_callback(attr, old, new):
             callbacks.rollover_callback(plotter, monitor, controls, serial_connection)
 
@@ -1108,11 +1424,68 @@ def app(
 
         controls.glyph.on_change("active", _glyph_callback)
 
-        # Define periodic callbacks
-        @bokeh.driving.linear()
-        def _stream_update(step):
+        def _monitor_search_callback(attr, old, new):
+            callbacks.monitor_search_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.monitor_search.on_change("value", _monitor_search_callback)
+
+        def _monitor_display_callback(attr, old, new):
+            callbacks.monitor_display_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.monitor_display.on_change("active", _monitor_display_callback)
+
+        def _monitor_scroll_callback(attr, old, new):
+            callbacks.monitor_scroll_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.monitor_scroll.on_change("value_throttled", _monitor_scroll_callback)
+
+        def _trigger_callback(attr, old, new):
+            callbacks.trigger_callback(plotter, monitor, controls, serial_connection)
+
+        for widget in (
+            controls.trigger_mode,
+            controls.trigger_column,
+            controls.trigger_edge,
+            controls.trigger_level,
+            controls.trigger_pre,
+            controls.trigger_post,
+        ):
+            widget.on_change("value", _trigger_callback)
+
+        def _trigger_arm_callback(event=None):
+            callbacks.trigger_arm_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+        controls.trigger_arm.on_click(_trigger_arm_callback)
+
+        def _cadence_callback(attr, old, new):
+            callbacks.cadence_callback(plotter, monitor, controls, serial_connection)
+
+        for widget in (
+            controls.daq_delay,
+            controls.stream_delay,
+            controls.port_search_delay,
+        ):
+            widget.on_change("value", _cadence_callback)
+
+        # Updates of the plotter and monitor are driven by arriving data
+        def _stream_update():
             callbacks.stream_update(plotter, monitor, controls, serial_connection)
 
+        serial_connection.update_pump = pump.UpdatePump(
+            doc, _stream_update, frame_rows=framerows, stream_delay=streamdelay
+        )
+
+        # Latency probes are shown once the browser acknowledges them
+        serial_connection.update_pump.on_ack = serial_connection.latency_probe.displayed
+
         # Have the app killer in here as well
         @bokeh.driving.linear()
         def _port_search_update(step):
@@ -1123,32 +1496,70 @@ def app(
                 plotter, monitor, controls, serial_connection
             )
 
+            callbacks.update_stats_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+            callbacks.stats_table_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+            callbacks.parse_errors_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+            callbacks.delimiter_status_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+            callbacks.input_status_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
+            callbacks.monitor_scroll_range_callback(
+                plotter, monitor, controls, serial_connection
+            )
+
         # Add the layout to the app
         doc.add_root(app_layout)
+        doc.add_root(serial_connection.update_pump.marker)
 
-        # Add periodic callbacks to doc
-        pc = doc.add_periodic_callback(_stream_update, streamdelay)
-        pc_port = doc.add_periodic_callback(_port_search_update, portsearchdelay)
+        # Add periodic callbacks to doc, which may be rescheduled
+        serial_connection.schedule_port_search(doc, _port_search_update)
 
     return _app
 
 
 def launch(
-    port=5006,
-    browser=None,
-    baudrate=115200,
-    maxcols=10,
-    delimiter="comma",
-    columnlabels="",
-    timecolumn=None,
-    timeunits="ms",
-    rollover=400,
-    glyph="lines",
-    inputtype="ascii",
-    fileprefix="_tmp",
-    daqdelay=20,
-    streamdelay=90,
-    portsearchdelay=1000,
+    port=profiles._unset,
+    browser=profiles._unset,
+    baudrate=profiles._unset,
+    maxcols=profiles._unset,
+    delimiter=profiles._unset,
+    columnlabels=profiles._unset,
+    timecolumn=profiles._unset,
+    timeunits=profiles._unset,
+    timecounterbits=profiles._unset,
+    rollover=profiles._unset,
+    glyph=profiles._unset,
+    inputtype=profiles._unset,
+    fileprefix=profiles._unset,
+    capture=profiles._unset,
+    outputbackend=profiles._unset,
+    renderer=profiles._unset,
+    derived=profiles._unset,
+    daqdelay=profiles._unset,
+    streamdelay=profiles._unset,
+    framerows=profiles._unset,
+    acquisition=profiles._unset,
+    portsearchdelay=profiles._unset,
+    replay=profiles._unset,
+    replayspeed=profiles._unset,
+    rawcapture=profiles._unset,
+    autocolumns=profiles._unset,
+    compression=profiles._unset,
+    portmatch=profiles._unset,
+    profile=None,
 ):
     """Launch a serial dashboard.
 
@@ -1163,40 +1574,137 @@ def launch(
         2400, 4800, 9600, 19200, 38400, 57600, 74880, 115200, 230400,
         250000, 500000, 1000000, 2000000.
     maxcols : int, default 10
-        Maximum number of columns of data coming off of the board.
+        Maximum number of columns of data coming off of the board. Any
+        positive integer is allowed. Beyond ten columns, a color
+        palette is generated for the additional columns.
     delimiter : str, default "comma"
         Delimiter of data coming off of the board. Allowed values are
         "comma", "space", "tab", "whitespace", "vertical line",
-        "semicolon", "asterisk", "slash"
+        "semicolon", "asterisk", "slash", and "auto", which finds the
+        delimiter from the first lines received after connecting.
     columnlabels : str, default ""
         Labels for columnbs using the delimiter specified with
         `delimiter` keyword argument.
-    timecolumn : int, default None
-        Column (zero-indexed) of incoming data that specifies time
+    timecolumn : int or str, default None
+        Column (zero-indexed) of incoming data that specifies time. If
+        "host", the time each line arrived at the host computer is
+        used.
     timeunits : str, default "ms"
         Units of incoming time data. Allowed values are "none", "µs",
         "ms", "s", "min", "hr".
+    timecounterbits : int, default None
+        Width in bits of the hardware counter generating the time
+        column, e.g., 32 for Arduino's `micros()` and `millis()`. If
+        given, wraps of the counter are removed so that the time axis
+        is monotonic. Allowed values are None, 8, 16, 24, 32.
     rollover : int, default 400
         Number of data points to be shown on a plot for each column.
-        Allowed values are 100, 200, 400, 800, 1600, 3200.
+        Any positive integer is allowed. When `rollover` times
+        `maxcols` is large, the plot is rendered with WebGL, unless
+        otherwise specified with `outputbackend`.
     glyph : str, default "lines"
         Which glyphs to display in the plotter. Allowed values are
         "lines", "dots", "both".
     inputtype : str, default "ascii"
-        Whether input sent to the board is ASCII or bytes. Allowed
-        values are "ascii", "bytes".
+        Whether input sent to the board is ASCII, bytes, or a script
+        of commands. Allowed values are "ascii", "bytes", "script".
     fileprefix : str, default "_tmp"
         Prefix for output files
+    capture : str, default "memory"
+        Where the history of parsed data is held. If "memory", it is
+        held in RAM. If "disk", it is written to memory-mapped .npy
+        files named with `fileprefix` and a timestamp, which may be
+        loaded with `np.load()`, so that the length of a capture is
+        limited by disk space rather than RAM. Allowed values are
+        "memory", "disk".
+    outputbackend : str, default "auto"
+        Backend used to render the plot. If "auto", the plot is
+        rendered with WebGL when `rollover` times `maxcols` is large
+        and with HTML5 canvas otherwise. Allowed values are "auto",
+        "canvas", "webgl".
+    renderer : str, default "separate"
+        How the plotted columns are drawn. If "separate", each column
+        has its own line and dot glyphs. If "batched", all columns are
+        drawn with one multi-line glyph and one scatter glyph, which
+        reduces the number of glyphs the browser draws and updates
+        when there are many columns. Allowed values are "separate",
+        "batched".
+    derived : str, default ""
+        Channels computed from the incoming data as they arrive,
+        separated by commas, each of the form `kind(column)` or
+        `kind(column, parameter)`, where `column` is a zero-indexed
+        column of incoming data. Allowed kinds are "mean" and "rms"
+        (rolling mean and root-mean-square over `parameter` samples,
+        default 10), "diff" (difference between consecutive samples),
+        "ema" (exponential moving average with smoothing factor
+        `parameter`, default 0.1), and "fft" (amplitude spectrum of the
+        last `parameter` samples, default 256, shown in a separate
+        plot). For example, "mean(1, 50), fft(1, 512)".
     daqdelay : float, default 20.0
         Roughly the delay in data acquisition from the board in
         milliseconds. The true delay is a bit above 80% of this value.
     streamdelay : int, default 90
-        Delay between updates of the plotter and monitor in
-        milliseconds.
+        Maximum delay in milliseconds between the arrival of data and
+        the update of the plotter and monitor. Updates happen only when
+        data arrive, so nothing is sent to the browser when idle.
+    framerows : int, default 1000
+        Number of newly arrived rows of data that trigger an update of
+        the plotter without waiting for `streamdelay` to elapse.
+        Updates are still at least 30 ms apart and are held if the
+        browser falls behind.
+    acquisition : str, default "async"
+        Where data from the board are read and parsed. If "async", they
+        are read and parsed in the same process as the dashboard. If
+        "process", they are read and parsed in a separate worker
+        process and handed to the dashboard through shared memory,
+        which keeps the dashboard responsive at very high line rates.
+        Allowed values are "async", "process".
     portsearchdelay : int, default 1000
         Delay between checks of connected serial devices in
         milliseconds.
+    replay : str or None, default None
+        Stem of a raw capture, as written by `capture.RawCaptureFile`,
+        that is offered as a port. Connecting to it replays the capture
+        through the dashboard as if it were arriving from a device.
+    replayspeed : float, default 1.0
+        Factor by which a replay is faster than its recording, or 0 to
+        replay as fast as possible.
+    rawcapture : bool, default False
+        If True, all bytes read from a device are recorded, exactly as
+        read and whether or not the plotter and monitor are streaming,
+        to `{fileprefix}_{timestamp}_raw.bin`, with an index of when
+        each chunk was read in `{fileprefix}_{timestamp}_raw_index.npy`.
+        A new recording is started on each connection.
+    autocolumns : bool, default False
+        If True, column labels are taken from a header line or from
+        `key:value` or `key=value` pairs in the data, and the number of
+        columns grows as more appear in the data, unless the capture is
+        on disk or parsed in a worker process, in which case only the
+        labels are taken from the data.
+    compression : int, default 1
+        Level, from 1 (fastest) to 9 (smallest), of permessage-deflate
+        compression of the websocket messages between the dashboard
+        and the browser. If 0, messages are not compressed.
+    portmatch : str, list of str, or None, default None
+        Pattern or patterns with shell-style wildcards, such as
+        "*usbmodem*" or "*Arduino*". The first port whose device name
+        or descriptive name matches one, ignoring case, is connected to
+        as soon as it is found, and the plotter starts streaming. This
+        is done once per browser session.
+    profile : str, dict, or None, default None
+        TOML or YAML file of settings named as the keyword arguments of
+        this function, or the name, without extension, of such a file
+        in `~/.serial_dashboard/profiles`, or settings returned by
+        `load_profile()`. Arguments not given are taken from the
+        profile. The profile is read and checked once, and its settings
+        apply to every browser session.
     """
+    # Arguments not given are taken from a profile or their defaults
+    if profiles._unset in locals().values():
+        return launch(**profiles.apply_profile(profile, _launch_defaults, locals()))
+
+    _check_compression(compression)
+
     # Build app
     dashboard_app = app(
         baudrate=baudrate,
@@ -1205,15 +1713,37 @@ def launch(
         columnlabels=columnlabels,
         timecolumn=timecolumn,
         timeunits=timeunits,
+        timecounterbits=timecounterbits,
         rollover=rollover,
         glyph=glyph,
         inputtype=inputtype,
         fileprefix=fileprefix,
+        capture=capture,
+        outputbackend=outputbackend,
+        renderer=renderer,
+        derived=derived,
+        daqdelay=daqdelay,
         streamdelay=streamdelay,
+        framerows=framerows,
+        acquisition=acquisition,
         portsearchdelay=portsearchdelay,
+        replay=replay,
+        replayspeed=replayspeed,
+        rawcapture=rawcapture,
+        autocolumns=autocolumns,
+        portmatch=portmatch,
     )
 
     app_dict = {"/serial-dashboard": Application(FunctionHandler(dashboard_app))}
-    server = Server(app_dict, port=port)
+    if compression > 0:
+        server = Server(
+            app_dict,
+            port=port,
+            websocket_compression_level=compression,
+            websocket_compression_mem_level=8,
+        )
+    else:
+        server = Server(app_dict, port=port)
+
     server.show("/serial-dashboard", browser=browser)
     server.run_until_shutdown()
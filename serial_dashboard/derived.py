@@ -0,0 +1,323 @@
+import re
+
+import numpy as np
+
+# Default parameter of each kind of derived channel
+_default_params = dict(mean=10, rms=10, diff=None, ema=0.1, fft=256)
+
+allowed_derived_kinds = tuple(_default_params.keys())
+
+_spec_re = re.compile(r"\s*(\w+)\s*\(\s*(\d+)\s*(?:,\s*([0-9.eE+-]+)\s*)?\)\s*")
+
+
+def parse_spec(spec):
+    """Parse a specification of derived channels.
+
+    Parameters
+    ----------
+    spec : str
+        Comma-separated derived channels, each of the form
+        `kind(column)` or `kind(column, parameter)`, e.g.,
+        `"mean(1, 50), rms(1, 50), diff(2), ema(1, 0.05), fft(1, 512)"`.
+        `column` is the zero-indexed column of the incoming data. The
+        allowed kinds are
+
+        - `mean`: rolling mean over a window of `parameter` samples
+          (default 10).
+        - `rms`: rolling root-mean-square over a window of `parameter`
+          samples (default 10).
+        - `diff`: difference between consecutive samples.
+        - `ema`: exponential moving average with smoothing factor
+          `parameter` between 0 and 1 (default 0.1).
+        - `fft`: amplitude spectrum of the last `parameter` samples
+          (default 256).
+
+    Returns
+    -------
+    output : list of tuples
+        `(kind, column, parameter)` for each derived channel.
+    """
+    channels = []
+
+    # Split on commas outside of parentheses
+    for item in re.findall(r"[^,(]+\([^)]*\)", spec):
+        match = _spec_re.fullmatch(item)
+        if match is None:
+            raise RuntimeError(f'Derived channel "{item.strip()}" is invalid.')
+
+        kind, column, param = match.groups()
+        if kind not in _default_params:
+            raise RuntimeError(
+                f'Derived channel kind "{kind}" is not allowed. Allowed kinds are: '
+                + ", ".join(allowed_derived_kinds)
+            )
+
+        if param is None:
+            param = _default_params[kind]
+        elif kind == "ema":
+            param = float(param)
+            if not 0 < param <= 1:
+                raise RuntimeError(
+                    f"Smoothing factor of ema must be between 0 and 1, not {param}."
+                )
+        elif kind == "diff":
+            raise RuntimeError("diff takes no parameter.")
+        else:
+            param = int(float(param))
+            if param < 2:
+                raise RuntimeError(f"Window of {kind} must be at least 2.")
+
+        channels.append((kind, int(column), param))
+
+    # Anything not matched is an error
+    if re.sub(r"[^,(]+\([^)]*\)|[\s,]", "", spec) != "":
+        raise RuntimeError(f'Derived channel specification "{spec}" is invalid.')
+
+    return channels
+
+
+class _Rolling(object):
+    """Rolling mean or mean square over a window of samples."""
+
+    def __init__(self, window, square=False):
+        self.window = window
+        self.square = square
+        self.tail = np.array([])
+
+    def __call__(self, x):
+        x = x**2 if self.square else x
+        n_tail = len(self.tail)
+        values = np.concatenate((self.tail, x))
+
+        # Windows ending at each new sample, ignoring NaNs
+        valid = ~np.isnan(values)
+        sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+        counts = np.concatenate(([0], np.cumsum(valid)))
+
+        ends = np.arange(n_tail + 1, len(values) + 1)
+        starts = np.maximum(ends - self.window, 0)
+        n = counts[ends] - counts[starts]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = (sums[ends] - sums[starts]) / n
+        out[n == 0] = np.nan
+
+        self.tail = values[-(self.window - 1) :]
+
+        return np.sqrt(out) if self.square else out
+
+
+class _Difference(object):
+    """Difference between consecutive samples."""
+
+    def __init__(self):
+        self.prev = np.nan
+
+    def __call__(self, x):
+        out = np.diff(x, prepend=self.prev)
+        if len(x) > 0:
+            self.prev = x[-1]
+
+        return out
+
+
+class _EMA(object):
+    """Exponential moving average, skipping NaNs."""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.value = np.nan
+
+    def __call__(self, x):
+        out = np.empty(len(x))
+        value = self.value
+        for i, xi in enumerate(x.tolist()):
+            if xi == xi:
+                value = xi if value != value else value + self.alpha * (xi - value)
+            out[i] = value
+
+        self.value = value
+
+        return out
+
+
+class _Window(object):
+    """The last `window` samples and their times."""
+
+    def __init__(self, window):
+        self.window = window
+        self.t = np.array([])
+        self.x = np.array([])
+
+    def __call__(self, t, x):
+        self.t = np.concatenate((self.t, t))[-self.window :]
+        self.x = np.concatenate((self.x, x))[-self.window :]
+
+
+# Seconds per unit of the time axis; times in µs and ms are converted
+# to seconds by parsers.data_to_arrays()
+_seconds_per_unit = {"µs": 1, "ms": 1, "s": 1, "min": 60, "hr": 3600}
+
+
+class DerivedChannels(object):
+    """Channels computed incrementally from the plotted data.
+
+    Each block of new rows is passed through `process()`, which updates
+    the state of each derived channel with only the new samples, so the
+    cost of a block does not depend on how much data came before it.
+
+    Attributes
+    ----------
+    spec : str
+        Specification of the channels, as for `parse_spec()`.
+    channels : list of tuples
+        `(kind, column, parameter)` of each channel.
+    labels : list of str
+        Labels of the time-domain channels, e.g., "mean(1, 50)".
+    fft_labels : list of str
+        Labels of the spectra.
+    """
+
+    def __init__(self, spec):
+        """Set up derived channels from a specification.
+
+        Parameters
+        ----------
+        spec : str
+            Specification of the channels, as for `parse_spec()`.
+        """
+        self.spec = spec
+        self.channels = parse_spec(spec)
+        self.labels = []
+        self.fft_labels = []
+
+        for kind, column, param in self.channels:
+            label = f"{kind}({column})" if param is None else f"{kind}({column}, {param})"
+            if kind == "fft":
+                self.fft_labels.append(label)
+            else:
+                self.labels.append(label)
+
+        self.reset()
+
+    def reset(self):
+        """Forget all previous samples."""
+        self._ops = []
+        for kind, column, param in self.channels:
+            if kind == "mean":
+                self._ops.append(_Rolling(param))
+            elif kind == "rms":
+                self._ops.append(_Rolling(param, square=True))
+            elif kind == "diff":
+                self._ops.append(_Difference())
+            elif kind == "ema":
+                self._ops.append(_EMA(param))
+            else:
+                self._ops.append(_Window(param))
+
+    @staticmethod
+    def _plot_column(column, time_column):
+        """Index in the plotted data of a column of incoming data, or
+        None if it is the time column."""
+        if time_column in ("none", "host") or column < time_column:
+            return column
+        elif column == time_column:
+            return None
+
+        return column - 1
+
+    def process(self, t, y, time_column):
+        """Update the channels with new rows.
+
+        Parameters
+        ----------
+        t : Numpy array
+            Time of each new row.
+        y : 2D Numpy array
+            Plotted data of the new rows, as returned by
+            `parsers.data_to_arrays()`.
+        time_column : int or str
+            Column of the incoming data holding time, or "none" or
+            "host".
+
+        Returns
+        -------
+        output : list of Numpy arrays
+            Value of each time-domain channel at each time in `t`. A
+            channel whose column is not present is all NaN.
+        """
+        out = []
+        for (kind, column, _), op in zip(self.channels, self._ops):
+            j = self._plot_column(column, time_column)
+            if j is None or j >= y.shape[1]:
+                x = np.full(len(t), np.nan)
+            else:
+                x = y[:, j].astype(float)
+
+            if kind == "fft":
+                op(t, x)
+            else:
+                out.append(op(x))
+
+        return out
+
+    def spectra(self, time_column, time_units):
+        """Amplitude spectra of the last windows of the FFT channels.
+
+        A Hann window is applied and the mean removed before the FFT.
+        Spectra are computed only when asked for, so their cost is per
+        update of the plot, not per sample.
+
+        Parameters
+        ----------
+        time_column : int or str
+            Column of the incoming data holding time, or "none" or
+            "host".
+        time_units : str
+            Units of the time column.
+
+        Returns
+        -------
+        output : list of tuples
+            `(frequency, amplitude)` of each FFT channel, as Numpy
+            arrays. They are empty until the window has filled.
+        """
+        out = []
+        for (kind, _, _), op in zip(self.channels, self._ops):
+            if kind != "fft":
+                continue
+
+            if len(op.x) < op.window or np.isnan(op.x).any():
+                out.append((np.array([]), np.array([])))
+                continue
+
+            # Sample spacing in seconds, or in samples without time
+            if time_column == "none" or (
+                time_column != "host" and time_units not in _seconds_per_unit
+            ):
+                dt = 1.0
+            else:
+                dt = np.median(np.diff(op.t))
+                if time_column != "host":
+                    dt *= _seconds_per_unit[time_units]
+
+            if not dt > 0:
+                out.append((np.array([]), np.array([])))
+                continue
+
+            window = np.hanning(op.window)
+            x = (op.x - op.x.mean()) * window
+            amplitude = 2 * np.abs(np.fft.rfft(x)) / window.sum()
+
+            out.append((np.fft.rfftfreq(op.window, dt), amplitude))
+
+        return out
+
+
+def _frequency_label(time_column, time_units):
+    if time_column == "none" or (
+        time_column != "host" and time_units not in _seconds_per_unit
+    ):
+        return "frequency (1/sample)"
+
+    return "frequency (Hz)"
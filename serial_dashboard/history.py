@@ -0,0 +1,313 @@
+import numpy as np
+
+from . import capture
+
+
+def _memory_store(ncols, level):
+    return capture.MemoryStore(ncols)
+
+
+class History(object):
+    """Multi-resolution min/max pyramid of the full plot history.
+
+    Level 0 holds the time and the value of each channel for every row
+    received. Each level above it summarizes blocks of `factor` rows of
+    the level below by the times of the first and last rows and the
+    minimum and maximum of each channel. Levels are extended
+    incrementally as rows are appended, so the cost of an append is
+    proportional to the number of new rows.
+
+    A query for a time window picks the finest level that has no more
+    rows in the window than the requested number of points, so the
+    amount of data returned is set by the screen resolution and not the
+    length of the history.
+
+    Rows whose time is NaN are not stored. Queries find the window by
+    bisection while times are nondecreasing; once a time goes backward,
+    as after a reset of the board's counter, they find it by comparing
+    every time of a level, starting from the coarsest.
+
+    If the data are already held elsewhere, such as in the plotter,
+    level 0 may hold only the time of each row and its position there,
+    with the values fetched by a `values` function when needed, so that
+    the data are not held twice.
+
+    Attributes
+    ----------
+    n_channels : int
+        Number of channels stored.
+    factor : int
+        Number of rows of a level summarized by each row of the level
+        above it.
+    levels : list
+        Stores for each level. Rows of level 0 are
+        `[t, y_0, ..., y_{n-1}]`, or `[t, index]` if there is a `values`
+        function, and rows of higher levels are
+        `[t_first, t_last, min_0, ..., min_{n-1}, max_0, ..., max_{n-1}]`.
+    monotonic : bool
+        True while the times stored are nondecreasing.
+    """
+
+    def __init__(self, n_channels, factor=8, store_factory=None, values=None):
+        """Create an empty history.
+
+        Parameters
+        ----------
+        n_channels : int
+            Number of channels stored. Rows with fewer channels are
+            padded with NaNs and rows with more are truncated.
+        factor : int, default 8
+            Number of rows of a level summarized by each row of the
+            level above it.
+        store_factory : function or None, default None
+            Function with call signature `store_factory(ncols, level)`
+            returning an empty store, such as a `capture.MemoryStore`
+            or `capture.CaptureFile`, for the given level. If None,
+            levels are held in memory.
+        values : function or None, default None
+            If given, function with call signature `values(indices)`
+            returning a 2D Numpy array of the data of the rows at
+            `indices`, an integer Numpy array of the positions given to
+            `append()`, and level 0 holds only times and positions.
+        """
+        self.n_channels = n_channels
+        self.factor = factor
+        self._store_factory = (
+            _memory_store if store_factory is None else store_factory
+        )
+        self._values = values
+        level_0_cols = 2 if values is not None else 1 + n_channels
+        self.levels = [self._store_factory(level_0_cols, 0)]
+        self._reset_state()
+
+    def _reset_state(self):
+        # Number of rows of each level already summarized in the next;
+        # rows of level 0 not yet summarized are kept whole here
+        self._n_summarized = [0]
+        self._unsummarized = np.empty((0, 1 + self.n_channels))
+
+        self.monotonic = True
+        self._t_min = np.inf
+        self._t_max = -np.inf
+        self._t_last = -np.inf
+        self._n_appended = 0
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def _pad(self, y):
+        """Data with exactly `n_channels` columns."""
+        padded = np.full((len(y), self.n_channels), np.nan)
+        n_cols = min(y.shape[1], self.n_channels)
+        padded[:, :n_cols] = y[:, :n_cols]
+
+        return padded
+
+    def append(self, t, y, start=None):
+        """Append rows to the history.
+
+        Parameters
+        ----------
+        t : Numpy array
+            Time of each row. Rows whose time is NaN are dropped.
+        y : 2D Numpy array
+            Data for each channel, one column per channel.
+        start : int or None, default None
+            Position of the first row, passed to the `values` function
+            to fetch the data of the rows. If None, rows are numbered
+            consecutively from 0 across calls.
+        """
+        if start is None:
+            start = self._n_appended
+        self._n_appended = start + len(t)
+
+        keep = ~np.isnan(t)
+        t = t[keep]
+        if len(t) == 0:
+            return
+
+        rows = np.empty((len(t), 1 + self.n_channels))
+        rows[:, 0] = t
+        rows[:, 1:] = self._pad(y[keep])
+
+        if self.monotonic and (t[0] < self._t_last or np.any(np.diff(t) < 0)):
+            self.monotonic = False
+
+        self._t_last = t[-1]
+        self._t_min = min(self._t_min, t.min())
+        self._t_max = max(self._t_max, t.max())
+
+        if self._values is None:
+            self.levels[0].append(rows)
+        else:
+            indices = start + np.flatnonzero(keep)
+            self.levels[0].append(np.column_stack((t, indices)))
+
+        # Level 0 is summarized from whole rows, which it may not hold
+        rows = np.concatenate((self._unsummarized, rows))
+        stop = len(rows) // self.factor * self.factor
+        self._unsummarized = rows[stop:]
+        if stop > 0:
+            self._add_summary(1, self._summarize(0, rows[:stop]))
+
+        # Summarize complete blocks up the pyramid
+        level = 1
+        while (
+            level < len(self.levels)
+            and len(self.levels[level]) - self._n_summarized[level] >= self.factor
+        ):
+            start = self._n_summarized[level]
+            n_blocks = (len(self.levels[level]) - start) // self.factor
+            stop = start + n_blocks * self.factor
+
+            self._add_summary(
+                level + 1, self._summarize(level, self.levels[level][start:stop])
+            )
+            self._n_summarized[level] = stop
+            level += 1
+
+    def _add_summary(self, level, summary):
+        """Append summarized rows to a level, creating it if need be."""
+        if level == len(self.levels):
+            self.levels.append(self._store_factory(2 + 2 * self.n_channels, level))
+            self._n_summarized.append(0)
+
+        self.levels[level].append(summary)
+
+    def _summarize(self, level, rows):
+        """Summarize blocks of `factor` rows of a level."""
+        n = self.n_channels
+        blocks = rows.reshape(-1, self.factor, rows.shape[1])
+
+        summary = np.empty((len(blocks), 2 + 2 * n))
+        summary[:, 0] = blocks[:, 0, 0]
+
+        # fmin and fmax ignore NaNs, giving NaN only if all are NaN
+        if level == 0:
+            summary[:, 1] = blocks[:, -1, 0]
+            summary[:, 2 : 2 + n] = np.fmin.reduce(blocks[:, :, 1:], axis=1)
+            summary[:, 2 + n :] = np.fmax.reduce(blocks[:, :, 1:], axis=1)
+        else:
+            summary[:, 1] = blocks[:, -1, 1]
+            summary[:, 2 : 2 + n] = np.fmin.reduce(blocks[:, :, 2 : 2 + n], axis=1)
+            summary[:, 2 + n :] = np.fmax.reduce(blocks[:, :, 2 + n :], axis=1)
+
+        return summary
+
+    def extent(self):
+        """Earliest and latest times, or None if empty."""
+        if len(self) == 0:
+            return None
+
+        return self._t_min, self._t_max
+
+    def _level_0(self, rows):
+        """Times and data of rows of level 0."""
+        if self._values is None:
+            return np.array(rows[:, 0]), np.array(rows[:, 1:])
+
+        return np.array(rows[:, 0]), self._pad(self._values(rows[:, 1].astype(int)))
+
+    def tail(self, n_rows):
+        """Last `n_rows` rows of the history at full resolution.
+
+        Returns
+        -------
+        t : Numpy array
+            Time of each row.
+        y : 2D Numpy array
+            Data for each channel, one column per channel.
+        """
+        return self._level_0(self.levels[0][max(len(self) - n_rows, 0) :])
+
+    def query(self, t_start, t_end, n_points):
+        """Decimated view of the history between two times.
+
+        Parameters
+        ----------
+        t_start : float
+            Start of the time window.
+        t_end : float
+            End of the time window.
+        n_points : int
+            Approximate maximum number of rows to return, usually the
+            width of the plot in pixels.
+
+        Returns
+        -------
+        t : Numpy array
+            Time of each returned point.
+        y : 2D Numpy array
+            Data for each channel, one column per channel. At
+            resolutions coarser than the raw data, each summarized
+            block gives two points, the minimum at the time of its
+            first row and the maximum at the time of its last, so that
+            the envelope of the signal is preserved.
+
+        Notes
+        -----
+        .. Rows not yet summarized into the chosen level, at most
+           about one block's worth at the end of the history, are not
+           included.
+        """
+        if self.monotonic:
+            level, rows = self._query_sorted(t_start, t_end, n_points)
+        else:
+            level, rows = self._query_unsorted(t_start, t_end, n_points)
+
+        if level == 0:
+            return self._level_0(rows)
+
+        n = self.n_channels
+        t = rows[:, :2].ravel()
+        y = np.stack((rows[:, 2 : 2 + n], rows[:, 2 + n :]), axis=1).reshape(-1, n)
+
+        return t, y
+
+    def _query_sorted(self, t_start, t_end, n_points):
+        """Finest level and its rows in a window, found by bisection."""
+        for level, store in enumerate(self.levels):
+            times = store[:, 0]
+
+            # Include one row beyond each edge so lines reach the edges
+            i_start = max(np.searchsorted(times, t_start, side="left") - 1, 0)
+            i_end = min(np.searchsorted(times, t_end, side="right") + 1, len(store))
+
+            if i_end - i_start <= n_points or level == len(self.levels) - 1:
+                break
+
+        return level, store[i_start:i_end]
+
+    def _query_unsorted(self, t_start, t_end, n_points):
+        """Finest level and its rows in a window, found by comparing
+        the times of each level from the coarsest down, stopping at the
+        first level with too many rows."""
+        level = len(self.levels) - 1
+        rows = None
+        while level >= 0:
+            store = self.levels[level]
+            t_first = store[:, 0]
+            t_last = t_first if level == 0 else store[:, 1]
+            in_window = (t_last >= t_start) & (t_first <= t_end)
+
+            if rows is not None and in_window.sum() > n_points:
+                return level + 1, rows
+
+            rows = store[in_window]
+            level -= 1
+
+        return 0, rows
+
+    def clear(self):
+        """Discard the history."""
+        for store in self.levels[1:]:
+            store.close()
+
+        self.levels[0].clear()
+        self.levels = self.levels[:1]
+        self._reset_state()
+
+    def close(self):
+        """Close the stores of all levels."""
+        for store in self.levels:
+            store.close()
@@ -0,0 +1,216 @@
+import collections
+import itertools
+
+import numpy as np
+
+from . import sending
+
+# Edges in milliseconds of the bins of latency histograms
+default_bin_edges = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class LatencyProbe(object):
+    """Round-trip latency of commands sent to a device that echoes
+    them.
+
+    Each probe is a command with a unique tag, such as `lp00000001`,
+    sent through the write queue of the connection. The device is
+    expected to send the tag back. Two latencies are measured from the
+    time the command starts to be written: until the tag is read from
+    the port ("read"), and until the browser acknowledges an update of
+    the dashboard made after the tag was read ("shown"). The first
+    includes the time the device takes to answer and the acquisition
+    period, and the second also the update delay and the time the
+    browser takes to draw.
+
+    Besides the most recent latencies, from which percentiles are
+    computed, counts of all latencies since the last `reset()` are kept
+    in fixed bins.
+
+    Attributes
+    ----------
+    command : str
+        Command sent, with `{tag}` where the tag goes.
+    timeout : float
+        Time in seconds after which a probe whose tag has not come back
+        is counted as lost.
+    read_latencies : collections.deque
+        Most recent read latencies in nanoseconds.
+    shown_latencies : collections.deque
+        Most recent shown latencies in nanoseconds.
+    bin_edges : Numpy array
+        Edges in milliseconds of the bins of the histograms. The last
+        bin also counts latencies beyond its upper edge.
+    read_counts : Numpy array
+        Number of read latencies in each bin.
+    shown_counts : Numpy array
+        Number of shown latencies in each bin.
+    n_sent : int
+        Number of probes sent since the last `reset()`.
+    n_lost : int
+        Number of probes that timed out since the last `reset()`.
+    """
+
+    def __init__(self, command="{tag}\n", timeout=5.0, capacity=10000, bin_edges=None):
+        """Create a probe with no measurements.
+
+        Parameters
+        ----------
+        command : str, default "{tag}\\n"
+            Command sent, with `{tag}` where the tag goes.
+        timeout : float, default 5.0
+            Time in seconds after which a probe is counted as lost.
+        capacity : int, default 10000
+            Number of most recent latencies kept of each kind.
+        bin_edges : array_like or None, default None
+            Increasing edges in milliseconds of the bins of the
+            histograms. If None, `default_bin_edges` is used.
+        """
+        self.command = command
+        self.timeout = timeout
+        self.capacity = capacity
+        self.bin_edges = np.array(
+            default_bin_edges if bin_edges is None else bin_edges, dtype=float
+        )
+        self._tags = itertools.count(1)
+        self.reset()
+
+    def reset(self):
+        """Forget all probes and measurements."""
+        self.read_latencies = collections.deque(maxlen=self.capacity)
+        self.shown_latencies = collections.deque(maxlen=self.capacity)
+        self.read_counts = np.zeros(len(self.bin_edges) - 1, dtype=int)
+        self.shown_counts = np.zeros(len(self.bin_edges) - 1, dtype=int)
+        self.n_sent = 0
+        self.n_lost = 0
+
+        # Probes sent and awaiting their tag, and read awaiting display
+        self._sent = {}
+        self._read = []
+        self._tail = b""
+
+    def steps(self, n_probes=100, interval=50):
+        """Steps for a `sending.WriteQueue` sending probes.
+
+        Parameters
+        ----------
+        n_probes : int, default 100
+            Number of probes.
+        interval : float, default 50
+            Time in milliseconds between the starts of probes.
+
+        Returns
+        -------
+        output : list of sending.Step
+            Steps, as for `sending.WriteQueue.put()`.
+        """
+        if "{tag}" not in self.command:
+            raise RuntimeError('The probe command must contain "{tag}".')
+
+        steps = []
+        for _ in range(n_probes):
+            tag = f"lp{next(self._tags):08d}".encode()
+            data = self.command.replace("{tag}", tag.decode()).encode("latin-1")
+            steps.append(sending.Step("write", data, on_start=self._on_sent(tag)))
+            steps.append(sending.Step("wait", interval / 1000))
+
+        return steps
+
+    def _on_sent(self, tag):
+        def on_sent(t):
+            self._sent[tag] = t
+            self.n_sent += 1
+
+        return on_sent
+
+    def received(self, raw, t):
+        """Look for tags in bytes read from the device.
+
+        Parameters
+        ----------
+        raw : bytes
+            Bytes read.
+        t : int
+            Monotonic time in nanoseconds at which they were read.
+        """
+        if len(self._sent) == 0:
+            return
+
+        # A tag may be split between reads
+        buffer = self._tail + raw
+        self._tail = buffer[-9:]
+
+        for tag in [tag for tag in self._sent if tag in buffer]:
+            t_sent = self._sent.pop(tag)
+            self.read_latencies.append(t - t_sent)
+            self._count(self.read_counts, [t - t_sent])
+            self._read.append((t, t_sent))
+
+        # Probes that never came back
+        t_lost = t - 1e9 * self.timeout
+        for tag in [tag for tag, t_sent in self._sent.items() if t_sent < t_lost]:
+            del self._sent[tag]
+            self.n_lost += 1
+
+    def displayed(self, t_frame, t_ack):
+        """Record that an update started at `t_frame` was acknowledged
+        by the browser at `t_ack`, both monotonic times in nanoseconds.
+        """
+        if len(self._read) == 0:
+            return
+
+        shown = [t_sent for t_read, t_sent in self._read if t_read <= t_frame]
+        self._read = [(t_r, t_s) for t_r, t_s in self._read if t_r > t_frame]
+        self.shown_latencies.extend(t_ack - t_sent for t_sent in shown)
+        self._count(self.shown_counts, [t_ack - t_sent for t_sent in shown])
+
+    def _count(self, counts, latencies):
+        """Add latencies in nanoseconds to the counts of their bins."""
+        if len(latencies) == 0:
+            return
+
+        bins = np.searchsorted(self.bin_edges, np.array(latencies) / 1e6, side="right")
+        np.add.at(counts, np.clip(bins - 1, 0, len(counts) - 1), 1)
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """Percentiles of the latencies in milliseconds.
+
+        Returns
+        -------
+        output : dict
+            Keys "read" and "shown" with arrays of the percentiles, or
+            None if there are no measurements of that kind, and "n" and
+            "lost" with the numbers of probes that came back and that
+            were lost.
+        """
+        summary = {"n": len(self.read_latencies), "lost": self.n_lost}
+        for name, latencies in (
+            ("read", self.read_latencies),
+            ("shown", self.shown_latencies),
+        ):
+            if len(latencies) == 0:
+                summary[name] = None
+            else:
+                summary[name] = np.percentile(np.array(latencies) / 1e6, percentiles)
+
+        return summary
+
+    def histogram(self):
+        """Histograms of the latencies since the last `reset()`.
+
+        Returns
+        -------
+        output : dict
+            Key "edges" with the edges of the bins in milliseconds, and
+            keys "read" and "shown" with the number of latencies in
+            each bin.
+        """
+        return {
+            "edges": self.bin_edges.copy(),
+            "read": self.read_counts.copy(),
+            "shown": self.shown_counts.copy(),
+        }
+
+    def pending(self):
+        """Number of probes sent whose tag has not come back."""
+        return len(self._sent)
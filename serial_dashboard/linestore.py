@@ -0,0 +1,188 @@
+import numpy as np
+
+
+class LineStore(object):
+    """Bytes received by the serial monitor, indexed by line.
+
+    All bytes are kept in a single growing byte buffer, and the offset
+    of the start of each line is kept in a Numpy array, so that any
+    range of lines is found without scanning the buffer and a regular
+    expression is searched over the whole buffer by the `re` module
+    without building a string of it. Bytes are not decoded until they
+    are displayed, so bytes that are not valid UTF-8 are stored as they
+    are. Each line is stamped with the host time at which its first
+    byte arrived.
+
+    Attributes
+    ----------
+    n_bytes : int
+        Number of bytes stored.
+    n_complete : int
+        Number of lines that are terminated by a newline.
+    """
+
+    def __init__(self):
+        """Create an empty store."""
+        self.clear()
+
+    def clear(self):
+        """Forget all bytes."""
+        self._buffer = bytearray()
+        self._starts = np.zeros(1024, dtype=np.int64)
+        self._times = np.zeros(1024, dtype=np.int64)
+        self._n_starts = 1
+
+        # Number of lines whose first byte has arrived and been stamped
+        self._n_stamped = 0
+
+    @property
+    def n_bytes(self):
+        return len(self._buffer)
+
+    @property
+    def n_complete(self):
+        return self._n_starts - 1
+
+    def __len__(self):
+        """Number of lines, including a last line without a newline."""
+        if self._starts[self._n_starts - 1] < len(self._buffer):
+            return self._n_starts
+
+        return self._n_starts - 1
+
+    def append(self, raw, t=0):
+        """Add bytes to the store.
+
+        Parameters
+        ----------
+        raw : bytes
+            Bytes received, which need not end with a newline.
+        t : int, default 0
+            Host time at which the bytes arrived in nanoseconds since
+            the epoch.
+        """
+        if len(raw) == 0:
+            return
+
+        offset = len(self._buffer)
+        self._buffer += raw
+
+        # Each newline starts a line
+        new_starts = np.flatnonzero(np.frombuffer(raw, dtype=np.uint8) == 10)
+        n_new = len(new_starts)
+
+        if self._n_starts + n_new > len(self._starts):
+            size = 2 * (self._n_starts + n_new)
+            for name in ("_starts", "_times"):
+                array = np.zeros(size, dtype=np.int64)
+                array[: self._n_starts] = getattr(self, name)[: self._n_starts]
+                setattr(self, name, array)
+
+        self._starts[self._n_starts : self._n_starts + n_new] = (
+            new_starts + offset + 1
+        )
+        self._n_starts += n_new
+
+        # A newline at the very end starts a line with no bytes yet
+        n_stamped = len(self)
+        self._times[self._n_stamped : n_stamped] = t
+        self._n_stamped = n_stamped
+
+    def _span(self, start, stop):
+        """Byte offsets of the start of line `start` and of the end of
+        line `stop - 1`."""
+        end = self._starts[stop] if stop < self._n_starts else len(self._buffer)
+
+        return int(self._starts[start]), int(end)
+
+    def line_start(self, i):
+        """Byte offset of the start of line `i`."""
+        return int(self._starts[i])
+
+    def times(self, indices):
+        """Host times in nanoseconds since the epoch at which lines
+        started to arrive."""
+        return self._times[np.asarray(indices, dtype=np.int64)]
+
+    def byte_range(self, start, stop):
+        """Bytes from offset `start` up to offset `stop`."""
+        return bytes(self._buffer[start:stop])
+
+    def tobytes(self, start=0, stop=None):
+        """Bytes of a range of lines, by default all of them."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return b""
+
+        i, j = self._span(start, stop)
+
+        return bytes(self._buffer[i:j])
+
+    def lines(self, indices, max_bytes=None):
+        """Lines as bytes without their line endings.
+
+        Parameters
+        ----------
+        indices : range or array_like of ints
+            Indices of the lines.
+        max_bytes : int or None, default None
+            If given, only the first `max_bytes` bytes of longer lines
+            are returned.
+
+        Returns
+        -------
+        output : list of bytes
+        """
+        out = []
+        for i in indices:
+            start, end = self._span(i, i + 1)
+            if max_bytes is not None:
+                end = min(end, start + max_bytes)
+
+            out.append(bytes(self._buffer[start:end]).rstrip(b"\r\n"))
+
+        return out
+
+    def search(self, regex, start=0):
+        """Lines matching a regular expression.
+
+        Parameters
+        ----------
+        regex : compiled regular expression
+            Pattern compiled from bytes, e.g., with
+            `re.compile(pattern.encode(), re.MULTILINE)`.
+        start : int, default 0
+            Index of the first line to search.
+
+        Returns
+        -------
+        output : Numpy array
+            Indices of the lines with a match, in increasing order.
+        """
+        matches = []
+        n_lines = len(self)
+        starts = self._starts[: self._n_starts]
+        if start < n_lines:
+            pos = int(starts[start])
+
+        # Search the buffer from one line on, skipping the rest of a
+        # line once it has a match
+        while start < n_lines:
+            match = regex.search(self._buffer, pos)
+            if match is None:
+                break
+
+            line = int(np.searchsorted(starts, match.start(), "right")) - 1
+
+            # An empty match at the end of the buffer is past the last line
+            if line >= n_lines:
+                break
+
+            matches.append(line)
+            start = line + 1
+            if start >= self._n_starts:
+                break
+
+            pos = int(starts[start])
+
+        return np.array(matches, dtype=np.int64)
@@ -0,0 +1,253 @@
+import os
+
+__all__ = [
+    "allowed_baudrates",
+    "allowed_delimiters",
+    "allowed_timeunits",
+    "allowed_time_counter_bits",
+    "allowed_glyphs",
+    "allowed_captures",
+    "allowed_output_backends",
+    "allowed_renderers",
+    "allowed_acquisitions",
+]
+
+# Allowed values of selector parameters
+allowed_baudrates = (
+    300,
+    1200,
+    2400,
+    4800,
+    9600,
+    19200,
+    38400,
+    57600,
+    74880,
+    115200,
+    230400,
+    250000,
+    500000,
+    1000000,
+    2000000,
+)
+
+allowed_delimiters = (
+    "comma",
+    "space",
+    "tab",
+    "whitespace",
+    "vertical line",
+    "semicolon",
+    "asterisk",
+    "slash",
+    "auto",
+)
+
+allowed_timeunits = ("none", "µs", "ms", "s", "min", "hr")
+
+allowed_time_counter_bits = ("none", 8, 16, 24, 32)
+
+allowed_glyphs = ("lines", "dots", "both")
+
+allowed_captures = ("memory", "disk")
+
+allowed_output_backends = ("auto", "canvas", "webgl")
+
+allowed_renderers = ("separate", "batched")
+
+allowed_acquisitions = ("async", "process")
+
+
+def _check_baudrate(baudrate):
+    if baudrate not in allowed_baudrates:
+        err_str = "Inputted baudrate {baudrate} is not allowed. Allowed baudrates (in units of baud = bits per second) are: \n"
+
+        for br in allowed_baudrates:
+            err_str += f"  {br}\n"
+
+        raise RuntimeError(err_str)
+
+
+def _check_maxcols(maxcols):
+    if type(maxcols) != int or maxcols < 1:
+        raise RuntimeError(
+            f"Inputted maxcols {maxcols} is invalid. maxcols must be a positive integer."
+        )
+
+
+def _check_delimiter(delimiter):
+    if delimiter not in allowed_delimiters:
+        err_str = f'Inputted delimiter "{delimiter}" is not allowed. Allowed delimiters are: \n'
+
+        for dl in allowed_delimiters:
+            err_str += f"  {dl}\n"
+
+        raise RuntimeError(err_str)
+
+
+def _check_timecolumn(timecolumn, maxcols):
+    if timecolumn in ("none", "host"):
+        return None
+
+    try:
+        timecolumn = int(timecolumn)
+    except:
+        raise RuntimeError(
+            "Inputted timecolumn {timecolumn} is invalid. timecolumn must be an integer."
+        )
+
+    if timecolumn < 0 or timecolumn >= maxcols:
+        raise RuntimeError(
+            f"Inputted timecolumn {timecolumn} is invalid. Must have 0 ≤ timecolumn < maxcols. You have selected maxcols = {maxcols}."
+        )
+
+
+def _check_timeunits(timeunits):
+    if timeunits not in allowed_timeunits:
+        err_str = f'Inputted timeunits "{timeunits}" is not allowed. Allowed time units are: \n'
+
+        for tu in allowed_timeunits:
+            err_str += f"  {tu}\n"
+
+        raise RuntimeError(err_str)
+
+
+def _check_timecounterbits(timecounterbits):
+    if timecounterbits not in allowed_time_counter_bits:
+        err_str = f'Inputted timecounterbits "{timecounterbits}" is not allowed. Allowed time counter widths are: \n'
+
+        for tcb in allowed_time_counter_bits:
+            err_str += f"  {tcb}\n"
+
+        raise RuntimeError(err_str)
+
+
+def _check_rollover(rollover):
+    if type(rollover) != int or rollover < 1:
+        raise RuntimeError(
+            f'Inputted rollover "{rollover}" is invalid. rollover must be a positive integer.'
+        )
+
+
+def _check_capture(capture):
+    if capture not in allowed_captures:
+        raise RuntimeError(
+            f'Inputted capture "{capture}" is not allowed. Must be either "memory" or "disk".'
+        )
+
+
+def _check_outputbackend(outputbackend):
+    if outputbackend not in allowed_output_backends:
+        raise RuntimeError(
+            f'Inputted output backend "{outputbackend}" is not allowed. Must be either "auto", "canvas", or "webgl".'
+        )
+
+
+def _check_renderer(renderer):
+    if renderer not in allowed_renderers:
+        raise RuntimeError(
+            f'Inputted renderer "{renderer}" is not allowed. Must be either "separate" or "batched".'
+        )
+
+
+def _check_acquisition(acquisition):
+    if acquisition not in allowed_acquisitions:
+        raise RuntimeError(
+            f'Inputted acquisition "{acquisition}" is not allowed. Must be either "async" or "process".'
+        )
+
+
+def _check_derived(derived_channels):
+    # Imported here so that importing the package does not import Numpy
+    from . import derived
+
+    # Raises a RuntimeError describing the problem if invalid
+    derived.parse_spec(derived_channels)
+
+
+def _check_framerows(framerows):
+    if type(framerows) != int or framerows < 1:
+        raise RuntimeError(
+            f'Inputted framerows "{framerows}" is invalid. framerows must be a positive integer.'
+        )
+
+
+def _check_delay(name, delay):
+    if type(delay) not in (int, float) or delay <= 0:
+        raise RuntimeError(
+            f'Inputted {name} "{delay}" is invalid. {name} must be a positive number.'
+        )
+
+
+def _check_replay(replay):
+    if replay is not None and not os.path.isfile(f"{replay}_raw.bin"):
+        raise RuntimeError(
+            f'Inputted replay "{replay}" is invalid. There is no raw capture file {replay}_raw.bin.'
+        )
+
+
+def _check_replayspeed(replayspeed):
+    if type(replayspeed) not in (int, float) or replayspeed < 0:
+        raise RuntimeError(
+            f'Inputted replayspeed "{replayspeed}" is invalid. replayspeed must be a nonnegative number.'
+        )
+
+
+def _check_compression(compression):
+    if type(compression) != int or not 0 <= compression <= 9:
+        raise RuntimeError(
+            f'Inputted compression "{compression}" is invalid. compression must be an integer from 0 to 9.'
+        )
+
+
+def _check_inputtype(inputtype):
+    if inputtype not in ["ascii", "bytes", "script"]:
+        raise RuntimeError(
+            'Inputted input type "{inputtype}" is not allowed. Must be "ascii", "bytes", or "script".'
+        )
+
+
+def _check_glyph(glyph):
+    if glyph not in allowed_glyphs:
+        err_str = (
+            f'  Inputted glyph "{glyph}" is not allowed. Allowed glyph choises are: \n'
+        )
+
+        for g in allowed_glyphs:
+            err_str += f"  {g}\n"
+
+        raise RuntimeError(err_str)
+
+
+def _check_portmatch(portmatch):
+    if portmatch is None:
+        return
+
+    if type(portmatch) == str:
+        portmatch = [portmatch]
+
+    if type(portmatch) != list or not all(type(p) == str for p in portmatch):
+        raise RuntimeError(
+            f'Inputted portmatch "{portmatch}" is invalid. portmatch must be a string or a list of strings.'
+        )
+
+
+def _check_serverport(port):
+    if type(port) != int or not 0 < port < 65536:
+        raise RuntimeError(
+            f'Inputted port "{port}" is invalid. port must be an integer from 1 to 65535.'
+        )
+
+
+def _check_flag(name, flag):
+    if type(flag) != bool:
+        raise RuntimeError(
+            f'Inputted {name} "{flag}" is invalid. {name} must be true or false.'
+        )
+
+
+def _check_string(name, value):
+    if type(value) != str:
+        raise RuntimeError(
+            f'Inputted {name} "{value}" is invalid. {name} must be a string.'
+        )
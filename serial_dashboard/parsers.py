@@ -1,8 +1,17 @@
+import collections
 import copy
+import operator
+import re
+
 import numpy as np
 
+# Plotted values are sent to the browser in single precision, which is
+# more than a plot can resolve and halves the bytes per value. Times
+# stay in double precision, since long acquisitions need more digits.
+_plot_dtype = np.float32
+
 
-def parse_read(read, sep=",", n_reads=0):
+def parse_read(read, sep=",", n_reads=0, errors=None, layout=None):
     """Parse a read with incoming delimited data.
 
     Parameters
@@ -14,6 +23,12 @@ def parse_read(read, sep=",", n_reads=0):
         Delimiting character separating columns of written data.
     n_reads : int, default 0
         The number of reads that have previously been read in.
+    errors : ParseErrors instance or None, default None
+        If given, lines that could not be parsed cleanly are counted
+        and quarantined in it.
+    layout : ColumnLayout instance or None, default None
+        If given, header lines and `key:value` or `key=value` lines are
+        detected, and the columns they name are recorded in it.
 
     Returns
     -------
@@ -23,38 +38,409 @@ def parse_read(read, sep=",", n_reads=0):
         Updated number of records read.
     remaining_bytes : byte string
         Remaining, unparsed bytes.
+
+    Notes
+    -----
+    .. Each line is parsed on its own, so a bad line never costs the
+       other lines of the read. Bytes that are not valid UTF-8 are
+       decoded as replacement characters, and fields that are not
+       numbers are parsed as NaN.
     """
     data = []
 
-    # Read in lines of raw data
-    raw_list = read.decode().split("\n")
+    # Split into lines before decoding, so that a character split
+    # between reads stays whole in the remaining bytes, and bytes that
+    # are not valid UTF-8 spoil only their own field
+    raw_list = read.split(b"\n")
+    split = _splitter(sep)
 
     for raw in raw_list[:-1]:
+        # A line recorded as undecodable is not recorded again for the
+        # fields its replacement characters spoil
+        recorded = False
         try:
-            if sep == "whitespace":
-                read_data = raw.split()
+            try:
+                line = raw.decode()
+            except UnicodeDecodeError:
+                line = raw.decode(errors="replace")
+                if errors is not None:
+                    errors.record("decode", raw)
+                    recorded = True
+
+            if layout is not None:
+                new_data, bad_value = layout.parse(line, sep)
+
+                # Header lines are not data
+                if new_data is None:
+                    continue
             else:
-                read_data = raw.split(sep)
-
-            new_data = []
-            for datum in read_data:
-                datum = datum.strip()
-                if datum.isdecimal():
-                    new_data.append(int(datum))
-                else:
-                    try:
-                        new_data.append(float(datum))
-                    except:
-                        new_data.append(np.nan)
+                new_data, bad_value = _parse_fields(split(line))
+
             data.append(new_data)
             n_reads += 1
-        except:
-            pass
 
-    if len(raw_list[-1]) == 0:
-        return data, n_reads, b""
-    else:
-        return data, n_reads, raw_list[-1].encode()
+            if bad_value and errors is not None and not recorded:
+                errors.record("value", raw)
+        except Exception:
+            if errors is not None and not recorded:
+                errors.record("line", raw)
+
+    return data, n_reads, raw_list[-1]
+
+
+def _splitter(sep):
+    """Function splitting a decoded line into its fields, chosen once
+    for a delimiter so that splitting a line does not branch on it."""
+    if sep == "whitespace":
+        return str.split
+
+    return operator.methodcaller("split", sep)
+
+
+def _parse_fields(fields):
+    """Numbers in fields, with NaN for fields that are not numbers, and
+    whether any nonempty field was not a number."""
+    values = []
+    bad_value = False
+    for datum in fields:
+        datum = datum.strip()
+        if datum.isdecimal():
+            values.append(int(datum))
+        else:
+            try:
+                values.append(float(datum))
+            except:
+                values.append(np.nan)
+                bad_value = bad_value or datum != ""
+
+    return values, bad_value
+
+
+def _is_number(field):
+    try:
+        float(field)
+    except:
+        return False
+
+    return True
+
+
+def _split_pair(field):
+    """Split a `key:value` or `key=value` field at the first colon or
+    equals sign. The key is None if the field has neither."""
+    i = min(
+        (j for j in (field.find(":"), field.find("=")) if j >= 0),
+        default=-1,
+    )
+
+    if i < 0:
+        return None, field
+
+    return field[:i].strip(), field[i + 1 :]
+
+
+class ColumnLayout(object):
+    """Columns of incoming data, detected from the data themselves.
+
+    The first line of data sets the format. A line whose nonempty
+    fields include `key:value` or `key=value` pairs with numerical
+    values, as printed for the Arduino IDE's serial plotter, starts
+    "keyvalue" format; each key gets a column the first time it is
+    seen, and unlabeled values are labeled by their position in the
+    line, as `value 1`, `value 2`, and so on. A line with no numerical
+    fields starts "header" format; its fields are the column labels,
+    and it and repeats of it are not parsed as data. Any other line
+    starts "plain" format. In all formats, the number of columns grows
+    with the longest line seen.
+
+    Lines in "keyvalue" format are parsed with a regular expression
+    compiled for the keys of the last line that had different keys, so
+    that lines with the same keys, which is nearly all of them, are
+    parsed without splitting and looking up each pair.
+
+    Attributes
+    ----------
+    format : str or None
+        One of "plain", "header", or "keyvalue", or None if no line has
+        been seen.
+    labels : list of str
+        Labels of the leading columns that have them.
+    n_cols : int
+        Number of columns seen.
+    n_changes : int
+        Number of times `labels` or `n_cols` changed, for consumers to
+        check whether they need to catch up.
+    max_cols : int
+        Most columns recorded. Further keys are parsed as NaN values.
+    """
+
+    def __init__(self, max_cols=256):
+        """Create a layout with no lines seen.
+
+        Parameters
+        ----------
+        max_cols : int, default 256
+            Most columns recorded.
+        """
+        self.max_cols = max_cols
+        self.reset()
+
+    def reset(self):
+        """Forget all lines seen, e.g., for a new device."""
+        self.format = None
+        self.labels = []
+        self.n_cols = 0
+        self.n_changes = 0
+        self._header = None
+        self._columns = {}
+        self._pattern = None
+        self._pattern_sep = None
+        self._split_sep = None
+        self._split = None
+        self._positions = None
+        self._in_order = False
+
+    def adopt(self, format, labels, n_cols):
+        """Take up columns detected by another layout, such as one in a
+        worker process, as a change.
+
+        Parameters
+        ----------
+        format : str or None
+            `format` of the other layout.
+        labels : list of str
+            `labels` of the other layout.
+        n_cols : int
+            `n_cols` of the other layout.
+        """
+        self.format = format
+        self.labels = list(labels)
+        self.n_cols = n_cols
+        self.n_changes += 1
+
+    def parse(self, line, sep):
+        """Parse a decoded line.
+
+        Parameters
+        ----------
+        line : str
+            Line without its newline.
+        sep : str
+            Delimiter, as for `parse_read()`.
+
+        Returns
+        -------
+        values : list or None
+            Value of each column, or None if the line is a header.
+        bad_value : bool
+            True if a nonempty field was not a number.
+        """
+        if sep != self._split_sep:
+            self._split = _splitter(sep)
+            self._split_sep = sep
+
+        if self.format == "keyvalue":
+            return self._parse_keyvalue(line, sep)
+
+        if self.format is None:
+            fields = [f.strip() for f in self._split(line)]
+            fields = [f for f in fields if f != ""]
+
+            # Blank lines do not tell us anything
+            if len(fields) == 0:
+                return _parse_fields(self._split(line))
+
+            if any(
+                key is not None and _is_number(value)
+                for key, value in map(_split_pair, fields)
+            ):
+                self.format = "keyvalue"
+                return self._parse_keyvalue(line, sep)
+
+            if not any(_is_number(f) for f in fields):
+                self.format = "header"
+                self._header = line.strip()
+                self.labels = fields[: self.max_cols]
+                self._grow(len(self.labels))
+
+                return None, False
+
+            self.format = "plain"
+
+        # Devices that restart print their header again
+        if self._header is not None and line.strip() == self._header:
+            return None, False
+
+        values, bad_value = _parse_fields(self._split(line))
+        if len(values) > self.n_cols:
+            self._grow(len(values))
+
+        return values, bad_value
+
+    def _grow(self, n_cols):
+        n_cols = min(n_cols, self.max_cols)
+        if n_cols > self.n_cols:
+            self.n_cols = n_cols
+            self.n_changes += 1
+
+    def _parse_keyvalue(self, line, sep):
+        """Parse a line of `key:value` or `key=value` pairs."""
+        # Fast path for a line with the same keys as the last
+        if self._pattern is not None and self._pattern_sep == sep:
+            match = self._pattern.fullmatch(line)
+            if match is not None:
+                values, bad_value = _parse_fields(match.groups())
+                return self._place(values), bad_value
+
+        fields = [f for f in self._split(line) if f.strip() != ""]
+        keys = []
+        values = []
+        for i, field in enumerate(fields):
+            key, value = _split_pair(field)
+            keys.append(key)
+            values.append(value)
+
+        # Columns of the keys, with new ones added
+        positions = []
+        for i, key in enumerate(keys):
+            label = f"value {i + 1}" if key is None else key
+            if label not in self._columns and len(self._columns) < self.max_cols:
+                self._columns[label] = len(self._columns)
+                self.labels.append(label)
+                self._grow(len(self._columns))
+            positions.append(self._columns.get(label))
+
+        values, bad_value = _parse_fields(values)
+
+        # Keys beyond the most columns recorded are dropped
+        if None in positions:
+            bad_value = True
+            values = [v for v, pos in zip(values, positions) if pos is not None]
+            keys = [k for k, pos in zip(keys, positions) if pos is not None]
+            positions = [pos for pos in positions if pos is not None]
+
+        self._compile(keys, sep)
+        self._positions = positions
+        self._in_order = positions == list(range(len(positions)))
+
+        return self._place(values), bad_value
+
+    def _compile(self, keys, sep):
+        """Compile a pattern matching a line with the given keys."""
+        if sep == "whitespace":
+            sep_pattern = r"\s+"
+            value_pattern = r"(\S*)"
+        else:
+            sep_pattern = r"\s*" + re.escape(sep) + r"\s*"
+            value_pattern = "([^" + re.escape(sep) + "]*?)"
+
+        fields = [
+            value_pattern
+            if key is None
+            else re.escape(key) + r"\s*[:=]" + value_pattern
+            for key in keys
+        ]
+
+        self._pattern = re.compile(
+            r"\s*" + sep_pattern.join(fields) + r"(?:" + sep_pattern + r")?\s*"
+        )
+        self._pattern_sep = sep
+
+    def _place(self, values):
+        """Put values in their columns."""
+        if self._in_order:
+            return values + [np.nan] * (self.n_cols - len(values))
+
+        row = [np.nan] * self.n_cols
+        for pos, value in zip(self._positions, values):
+            row[pos] = value
+
+        return row
+
+
+class ParseErrors(object):
+    """Accounting of data that could not be parsed cleanly.
+
+    Errors are counted by kind, and the offending raw bytes of the most
+    recent ones are kept in a bounded quarantine, so that the cost of
+    the accounting does not grow with the number of errors. The kinds
+    are:
+
+    - "decode": a line with bytes that are not valid UTF-8, which is
+      parsed with the bytes replaced.
+    - "value": a line with a nonempty field that is not a number, which
+      is parsed as NaN.
+    - "line": a line that raised an unexpected error and was dropped.
+    - "chunk": a read that raised an unexpected error after parsing and
+      was dropped.
+
+    Attributes
+    ----------
+    capacity : int
+        Number of most recent errors kept in the quarantine.
+    max_bytes : int
+        Most bytes of each quarantined line kept.
+    counts : dict
+        Number of errors of each kind.
+    quarantine : collections.deque
+        `(kind, raw)` for each of the most recent errors, oldest first.
+    """
+
+    kinds = ("decode", "value", "line", "chunk")
+
+    def __init__(self, capacity=100, max_bytes=200):
+        """Create empty accounting.
+
+        Parameters
+        ----------
+        capacity : int, default 100
+            Number of most recent errors kept in the quarantine.
+        max_bytes : int, default 200
+            Most bytes of each quarantined line kept.
+        """
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.reset()
+
+    def reset(self):
+        """Forget all errors."""
+        self.counts = dict.fromkeys(self.kinds, 0)
+        self.quarantine = collections.deque(maxlen=self.capacity)
+
+    @property
+    def n_errors(self):
+        """Total number of errors."""
+        return sum(self.counts.values())
+
+    def record(self, kind, raw):
+        """Count an error and quarantine its raw bytes.
+
+        Parameters
+        ----------
+        kind : str
+            One of `ParseErrors.kinds`.
+        raw : bytes
+            Offending bytes.
+        """
+        self.counts[kind] += 1
+        self.quarantine.append((kind, bytes(raw[: self.max_bytes])))
+
+    def merge(self, counts, quarantine):
+        """Add errors accounted for elsewhere, such as in a worker
+        process.
+
+        Parameters
+        ----------
+        counts : dict
+            Number of errors of each kind.
+        quarantine : list of tuples
+            `(kind, raw)` for each of the most recent errors, oldest
+            first.
+        """
+        for kind, n in counts.items():
+            self.counts[kind] += n
+
+        self.quarantine.extend(quarantine)
 
 
 def fill_nans(x, ncols):
@@ -128,27 +514,241 @@ def backfill_nans(x, ncols):
     return np.concatenate((x, nan_array), axis=1)
 
 
-def data_to_dicts(data, max_cols, time_col, time_units, starting_time_ind):
+class TimeUnwrapper(object):
+    """Unwrap the time column produced by a wrapping hardware counter,
+    such as Arduino's `micros()` or `millis()`.
+
+    The unwrapper carries its state across calls, so it can be applied
+    chunk by chunk to an incoming stream to produce a monotonic time
+    axis.
+
+    Attributes
+    ----------
+    counter_bits : int or None
+        Width of the counter in bits. If None, no unwrapping is done.
+    modulus : float
+        Value at which the counter wraps, `2**counter_bits`.
+    n_wraps : int
+        Number of wraps detected so far.
+    prev_raw : float
+        Last non-NaN raw counter value seen.
+    """
+
+    def __init__(self, counter_bits=None):
+        """Create a time unwrapper.
+
+        Parameters
+        ----------
+        counter_bits : int or None, default None
+            Width of the counter in bits. If None, the unwrapper passes
+            time values through unchanged.
+        """
+        self.counter_bits = counter_bits
+        self.modulus = np.nan if counter_bits is None else float(2 ** counter_bits)
+        self.reset()
+
+    def reset(self):
+        """Forget all wraps seen so far."""
+        self.n_wraps = 0
+        self.prev_raw = np.nan
+
+    def __call__(self, t):
+        """Unwrap a chunk of raw counter values.
+
+        Parameters
+        ----------
+        t : array_like
+            Raw counter values, possibly containing NaNs.
+
+        Returns
+        -------
+        output : Numpy array of float64
+            Unwrapped time values. NaNs are preserved.
+        """
+        t = np.array(t, dtype=float)
+
+        if self.counter_bits is None:
+            return t
+
+        valid = ~np.isnan(t)
+        t_valid = t[valid]
+
+        if len(t_valid) == 0:
+            return t
+
+        # A wrap is a drop of more than half the counter range
+        prev = t_valid[0] if np.isnan(self.prev_raw) else self.prev_raw
+        drops = np.diff(t_valid, prepend=prev) < -self.modulus / 2
+        wraps = self.n_wraps + np.cumsum(drops)
+
+        t[valid] = t_valid + wraps * self.modulus
+
+        self.n_wraps = int(wraps[-1])
+        self.prev_raw = t_valid[-1]
+
+        return t
+
+
+def data_to_arrays(
+    data,
+    max_cols,
+    time_col,
+    time_units,
+    starting_time_ind,
+    time_unwrapper=None,
+    host_times=None,
+):
+    """Take in data as a list of lists and convert to a time array and
+    a 2D array of the columns to be plotted against it.
+
+    Parameters
+    ----------
+    data : list of lists or 2D Numpy array
+        Data to be converted. A Numpy array, such as a slice of a
+        `CaptureFile`, is used as is without copying.
+    max_cols : int
+        Maximum number of columns present in data set. This is usually
+        the maximum length of a one of the lists in `data`. If any of
+        the lists are longer than `max_cols`, the data in the list is
+        truncated.
+    time_col : int, "none", or "host"
+        Which column contains time data. If "host", the host timestamps
+        given by `host_times` are used.
+    time_units : str
+        Units of time. If "µs", the time column is divided by a million.
+        If "ms", the time column is divided by a thousand.
+    starting_time_ind : int
+        Only active if `time_col == "none"`. The time column is indices
+        in this case, and they start with `starting_time_ind`.
+    time_unwrapper : TimeUnwrapper instance or None, default None
+        If given, applied to the raw time column before unit conversion
+        to remove wraps of a hardware counter. Its state is updated, so
+        the same instance should be used for successive chunks.
+    host_times : array_like or None, default None
+        Only active if `time_col == "host"`. Host timestamps in seconds
+        of each row of `data`.
+
+    Returns
+    -------
+    t : Numpy array
+        Time of each row.
+    y : 2D Numpy array
+        Columns of data other than the time column, one per plotted
+        channel, with a row for each entry in `t`. Missing values are
+        NaN.
+    """
+    if len(data) == 0:
+        return np.array([]), np.empty((0, 0))
+
+    if isinstance(data, np.ndarray):
+        ncols = data.shape[1]
+    else:
+        data, ncols = fill_nans(copy.copy(data), 0)
+
+    if ncols == 0:
+        return np.array([]), np.empty((0, 0))
+
+    cols = min(data.shape[1], max_cols)
+
+    if time_col in ("none", "host"):
+        if time_col == "none":
+            t = starting_time_ind + np.arange(len(data))
+        elif host_times is None or len(host_times) != len(data):
+            return np.array([]), np.empty((0, ncols))
+        else:
+            t = np.asarray(host_times, dtype=float)
+
+        return t, data[:, :cols]
+
+    if time_col >= ncols:
+        return np.array([]), np.empty((0, ncols))
+
+    t = data[:, time_col]
+
+    # Return nothing if all nans
+    if np.isnan(t).all():
+        return np.array([]), np.empty((0, ncols))
+
+    if time_unwrapper is not None:
+        t = time_unwrapper(t)
+
+    if time_units == "µs":
+        t = t / 1e6
+    elif time_units == "ms":
+        t = t / 1000
+
+    return t, data[:, [j for j in range(cols) if j != time_col]]
+
+
+def arrays_to_dicts(t, y):
+    """Convert output of `data_to_arrays()` into a list of dictionaries
+    that can be used to stream into the ColumnDataSources. Values are
+    Numpy arrays, which Bokeh sends to the browser as binary buffers
+    rather than as JSON.
+
+    Parameters
+    ----------
+    t : Numpy array
+        Time of each row.
+    y : 2D Numpy array
+        Data for each channel, one column per channel.
+
+    Returns
+    -------
+    output : list of dicts
+        A list of dicts, one per column of `y`, each with keys "t" and
+        "y" whose values are Numpy arrays of double precision times and
+        single precision data. Points where either the time or the data
+        are NaN are omitted.
+    """
+    t_ok = ~np.isnan(t)
+
+    out = []
+    for j in range(y.shape[1]):
+        inds = t_ok & ~np.isnan(y[:, j])
+        out.append(dict(t=t[inds], y=y[inds, j].astype(_plot_dtype)))
+
+    return out
+
+
+def data_to_dicts(
+    data,
+    max_cols,
+    time_col,
+    time_units,
+    starting_time_ind,
+    time_unwrapper=None,
+    host_times=None,
+):
     """Take in data as a list of lists and converts to a list of
     dictionaries that can be used to stream into the ColumnDataSources.
 
     Parameters
     ----------
-    data : list of lists
-        Data to be converted into a dictionary.
+    data : list of lists or 2D Numpy array
+        Data to be converted into a dictionary. A Numpy array, such as
+        a slice of a `CaptureFile`, is used as is without copying.
     max_cols : int
         Maximum number of columns present in data set. This is usually
         the maximum length of a one of the lists in `data`. If any of
         the lists are longer than `max_cols`, the data in the list is
         truncated.
-    time_col : int or "none"
-        Which column contains time data.
+    time_col : int, "none", or "host"
+        Which column contains time data. If "host", the host timestamps
+        given by `host_times` are used.
     time_units : str
         Units of time. If "µs", the time column is divided by a million.
         If "ms", the time column is divided by a thousand.
     starting_time_ind : int
         Only active if `time_col == "none"`. The time column is indices
         in this case, and they start with `starting_time_ind`.
+    time_unwrapper : TimeUnwrapper instance or None, default None
+        If given, applied to the raw time column before unit conversion
+        to remove wraps of a hardware counter. Its state is updated, so
+        the same instance should be used for successive chunks.
+    host_times : array_like or None, default None
+        Only active if `time_col == "host"`. Host timestamps in seconds
+        of each row of `data`.
 
     Returns
     -------
@@ -156,75 +756,124 @@ def data_to_dicts(data, max_cols, time_col, time_units, starting_time_ind):
         A list of dicts, each with keys "t" and "y", representing the
         time and y-data to be updated in a plot.
     """
-    data, ncols = fill_nans(copy.copy(data), 0)
-    if len(data) == 0 or ncols == 0:
-        return [dict(t=[], y=[]) for _ in range(ncols)]
-
-    ts = []
-    ys = []
-    if time_col == "none":
-        t = starting_time_ind + np.arange(len(data))
-        for j in range(min(data.shape[1], max_cols)):
-            new_t = []
-            new_y = []
-            for i, row in enumerate(data):
-                if not np.isnan(row[j]):
-                    new_t.append(t[i])
-                    new_y.append(row[j])
-            ts.append(new_t)
-            ys.append(new_y)
-    elif time_col > ncols:
-        return [dict(t=[], y=[]) for _ in range(ncols)]
-    else:
-        t = data[:, time_col]
+    return arrays_to_dicts(
+        *data_to_arrays(
+            data,
+            max_cols,
+            time_col,
+            time_units,
+            starting_time_ind,
+            time_unwrapper=time_unwrapper,
+            host_times=host_times,
+        )
+    )
+
+
+_delimiters = {
+    "comma": ",",
+    "space": " ",
+    "tab": "\t",
+    "whitespace": "whitespace",
+    "vertical line": "|",
+    "semicolon": ";",
+    "asterisk": "*",
+    "slash": "/",
+    "auto": "auto",
+}
+
+# Delimiters tried when sniffing, in order of preference for ties
+_sniffed_delimiters = (
+    "comma",
+    "semicolon",
+    "tab",
+    "vertical line",
+    "whitespace",
+    "asterisk",
+    "slash",
+)
 
-        # Return nothing if all nans
-        if np.isnan(t).all():
-            return [dict(t=[], y=[]) for _ in range(ncols)]
 
-        if time_units == "µs":
-            t = t / 1e6
-        elif time_units == "ms":
-            t = t / 1000
+def _delimiter_convert(delimiter):
+    return _delimiters.get(delimiter)
 
-        for j in range(min(data.shape[1], max_cols)):
-            if j != time_col:
-                new_t = []
-                new_y = []
-                for i, row in enumerate(data):
-                    if not np.isnan(row[j]) and not np.isnan(t[i]):
-                        new_t.append(t[i])
-                        new_y.append(row[j])
-                ts.append(new_t)
-                ys.append(new_y)
 
-    return [dict(t=t, y=y) for t, y in zip(ts, ys)]
+def _delimiter_name(sep):
+    for name, value in _delimiters.items():
+        if value == sep:
+            return name
 
 
-def _delimiter_convert(delimiter):
-    if delimiter == "comma":
-        return ","
-    elif delimiter == "space":
-        return " "
-    elif delimiter == "tab":
-        return "\t"
-    elif delimiter == "whitespace":
-        return "whitespace"
-    elif delimiter == "vertical line":
-        return "|"
-    elif delimiter == "semicolon":
-        return ";"
-    elif delimiter == "asterisk":
-        return "*"
-    elif delimiter == "slash":
-        return "/"
+def sniff_delimiter(read, n_lines=5, max_bytes=65536):
+    """Choose the delimiter of delimited data from their first lines.
+
+    Parameters
+    ----------
+    read : byte string
+        Data received so far.
+    n_lines : int, default 5
+        Number of complete lines needed to choose.
+    max_bytes : int, default 65536
+        Once this many bytes are received, a choice is made even with
+        fewer than `n_lines` lines.
+
+    Returns
+    -------
+    output : str or None
+        Name of the delimiter, as for the `delimiter` option of the
+        dashboard, or None if more data are needed to choose.
+
+    Notes
+    -----
+    .. Each candidate is scored by the fewest numerical fields, or
+       `key:value` pairs with numerical values, it splits a line into,
+       so that the delimiter chosen splits every line into numbers.
+       Lines with no digits, such as headers, are not scored. Ties go
+       to the delimiter listed first among comma, semicolon, tab,
+       vertical line, whitespace, asterisk, and slash, and comma is
+       chosen if no delimiter finds any numbers.
+    """
+    lines = [
+        raw.decode(errors="replace").strip() for raw in read.split(b"\n")[:-1]
+    ]
+    lines = [line for line in lines if line != ""]
+
+    if len(lines) < n_lines and len(read) < max_bytes:
+        return None
+
+    scored = [line for line in lines if any(c.isdigit() for c in line)][:100]
+    if len(scored) == 0:
+        return "comma"
+
+    def _n_numbers(fields):
+        n = 0
+        for field in fields:
+            key, value = _split_pair(field)
+            if _is_number(field) or (key is not None and _is_number(value)):
+                n += 1
+
+        return n
+
+    best, best_score = "comma", (0, 0)
+    for name in _sniffed_delimiters:
+        split = _splitter(_delimiters[name])
+        counts = [_n_numbers(split(line)) for line in scored]
+        widths = set(len(split(line)) for line in scored)
+        score = (min(counts), -len(widths))
+
+        if score[0] > 0 and score > best_score:
+            best, best_score = name, score
+
+    return best
 
 
 def _column_labels_str_to_list(col_labels, delimiter, max_cols):
     if len(col_labels) == 0:
         return [str(col) for col in range(max_cols)]
 
-    if delimiter == "whitespace":
+    # Labels are separated by commas until the delimiter is found
+    if delimiter == "auto":
+        col_labels = col_labels.split(",")
+    elif delimiter == "whitespace":
         col_labels = col_labels.split()
     else:
         col_labels = col_labels.split(delimiter)
@@ -240,6 +889,8 @@ def _column_labels_str_to_list(col_labels, delimiter, max_cols):
 def _xaxis_label(time_column, time_units):
     if time_column == "none":
         label = "sample number"
+    elif time_column == "host":
+        label = "host time (s)"
     elif time_units in ("µs", "ms", "s"):
         label = "time (s)"
     elif time_units == "none":
@@ -0,0 +1,232 @@
+import os
+
+from .options import (
+    _check_baudrate,
+    _check_maxcols,
+    _check_delimiter,
+    _check_timecolumn,
+    _check_timeunits,
+    _check_timecounterbits,
+    _check_rollover,
+    _check_capture,
+    _check_outputbackend,
+    _check_renderer,
+    _check_acquisition,
+    _check_derived,
+    _check_framerows,
+    _check_delay,
+    _check_replay,
+    _check_replayspeed,
+    _check_compression,
+    _check_inputtype,
+    _check_glyph,
+    _check_portmatch,
+    _check_serverport,
+    _check_flag,
+    _check_string,
+)
+
+# Directory searched for profiles given by name
+profile_dir = os.path.join(os.path.expanduser("~"), ".serial_dashboard", "profiles")
+
+profile_extensions = (".toml", ".yaml", ".yml")
+
+# Settings a profile may hold, each with its check
+_checks = {
+    "port": _check_serverport,
+    "browser": lambda browser: _check_string("browser", browser),
+    "portmatch": _check_portmatch,
+    "baudrate": _check_baudrate,
+    "maxcols": _check_maxcols,
+    "delimiter": _check_delimiter,
+    "columnlabels": lambda columnlabels: _check_string("columnlabels", columnlabels),
+    "timecolumn": None,
+    "timeunits": _check_timeunits,
+    "timecounterbits": lambda bits: _check_timecounterbits(
+        "none" if bits is None else bits
+    ),
+    "rollover": _check_rollover,
+    "glyph": _check_glyph,
+    "inputtype": _check_inputtype,
+    "fileprefix": lambda fileprefix: _check_string("fileprefix", fileprefix),
+    "capture": _check_capture,
+    "outputbackend": _check_outputbackend,
+    "renderer": _check_renderer,
+    "derived": _check_derived,
+    "daqdelay": lambda delay: _check_delay("daqdelay", delay),
+    "streamdelay": lambda delay: _check_delay("streamdelay", delay),
+    "framerows": _check_framerows,
+    "acquisition": _check_acquisition,
+    "portsearchdelay": lambda delay: _check_delay("portsearchdelay", delay),
+    "replay": _check_replay,
+    "replayspeed": _check_replayspeed,
+    "rawcapture": lambda flag: _check_flag("rawcapture", flag),
+    "autocolumns": lambda flag: _check_flag("autocolumns", flag),
+    "compression": _check_compression,
+}
+
+allowed_profile_keys = tuple(_checks)
+
+
+class _Unset(object):
+    """Default of the keyword arguments of `launch()` and `app()`,
+    which are taken from a profile when not given."""
+
+    def __repr__(self):
+        return "<unset>"
+
+
+_unset = _Unset()
+
+
+def _find_profile(profile):
+    """Path of a profile given as a path or as a name in `profile_dir`."""
+    if os.path.isfile(profile):
+        return profile
+
+    for ext in profile_extensions:
+        path = os.path.join(profile_dir, profile + ext)
+        if os.path.isfile(path):
+            return path
+
+    raise RuntimeError(
+        f'Inputted profile "{profile}" is invalid. It is neither a file nor the name of a profile in {profile_dir}.'
+    )
+
+
+def _read_toml(path):
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise RuntimeError(
+                "Reading TOML profiles requires Python 3.11 or the tomli package."
+            )
+
+    with open(path, "rb") as f:
+        try:
+            return tomllib.load(f)
+        except tomllib.TOMLDecodeError as e:
+            raise RuntimeError(f"Profile {path} is not valid TOML: {e}")
+
+
+def _read_yaml(path):
+    try:
+        import yaml
+    except ImportError:
+        raise RuntimeError("Reading YAML profiles requires the PyYAML package.")
+
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            settings = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise RuntimeError(f"Profile {path} is not valid YAML: {e}")
+
+    # An empty file is an empty profile
+    return {} if settings is None else settings
+
+
+def load_profile(profile):
+    """Read and check a profile of dashboard settings.
+
+    A profile is a TOML or YAML file of settings named as the keyword
+    arguments of `launch()`, such as `baudrate`, `delimiter`,
+    `rollover`, or `daqdelay`, along with `portmatch`, a pattern or
+    list of patterns with shell-style wildcards. A port whose device
+    name or description matches a pattern is connected to as soon as
+    it is found, and the plotter starts streaming.
+
+    Parameters
+    ----------
+    profile : str
+        Path of the profile, or the name of a profile in `profile_dir`
+        without its extension, ".toml", ".yaml", or ".yml".
+
+    Returns
+    -------
+    output : dict
+        The settings of the profile.
+    """
+    path = _find_profile(profile)
+
+    if path.lower().endswith((".yaml", ".yml")):
+        settings = _read_yaml(path)
+    else:
+        settings = _read_toml(path)
+
+    _check_settings(settings, f"profile {path}")
+
+    return settings
+
+
+def _check_settings(settings, source):
+    """Raise a RuntimeError if settings of a profile are not allowed.
+
+    Parameters
+    ----------
+    settings : dict
+        Settings of the profile.
+    source : str
+        Description of where the settings came from, used in errors.
+    """
+    if type(settings) != dict:
+        raise RuntimeError(f"The {source} must hold settings as key-value pairs.")
+
+    for key, value in settings.items():
+        if key not in _checks:
+            err_str = f'Setting "{key}" in the {source} is not allowed. Allowed settings are: \n'
+
+            for k in allowed_profile_keys:
+                err_str += f"  {k}\n"
+
+            raise RuntimeError(err_str)
+
+        if key == "timecolumn":
+            # Checked against maxcols when maxcols is in the profile
+            _check_timecolumn(
+                "none" if value is None else value,
+                settings.get("maxcols", float("inf")),
+            )
+        else:
+            _checks[key](value)
+
+
+def apply_profile(profile, defaults, kwargs):
+    """Keyword arguments of a function, such as `launch()`, with those
+    not given taken from a profile, or else set to their defaults.
+
+    Parameters
+    ----------
+    profile : str, dict, or None
+        Profile, as for `load_profile()`, or settings of a profile,
+        which are checked as those of a profile file are. If None,
+        arguments not given are set to their defaults.
+    defaults : dict
+        Defaults of the keyword arguments of the function.
+    kwargs : dict
+        Keyword arguments with which the function was called, including
+        `profile`, with those not given set to `_unset`.
+
+    Returns
+    -------
+    output : dict
+        Keyword arguments with which to call the function, with
+        `profile` set to None. Settings the function does not take are
+        left out.
+    """
+    if profile is None:
+        settings = {}
+    elif type(profile) == dict:
+        _check_settings(profile, "profile")
+        settings = profile
+    else:
+        settings = load_profile(profile)
+
+    kwargs = dict(kwargs, profile=None)
+    for key, value in kwargs.items():
+        if value is _unset:
+            kwargs[key] = settings.get(key, defaults[key])
+
+    return kwargs
@@ -0,0 +1,249 @@
+import collections
+import time
+
+import bokeh.models
+
+
+class UpdatePump(object):
+    """Event-driven scheduler of updates of the plotter and monitor.
+
+    The acquisition side calls `notify()` when new data arrive. An
+    update (a "frame") is then scheduled when `frame_rows` rows are
+    pending or `stream_delay` milliseconds after the first pending data
+    arrived, whichever comes first. All notifications that arrive
+    before the frame runs are coalesced into it, and frames are never
+    closer together than `frame_interval` milliseconds. When no data
+    arrive, no frames run and nothing is sent to the browser.
+
+    Each frame ends by sending a frame number to the browser, which
+    echoes it back once it has applied the frame. If the browser falls
+    more than `max_frames_in_flight` frames behind, further frames are
+    held until it catches up, or until `ack_timeout` milliseconds have
+    passed, so that a slow browser is not flooded with updates.
+
+    Attributes
+    ----------
+    marker : bokeh.models.ColumnDataSource instance
+        Data source carrying frame numbers to and from the browser. It
+        must be added to the document.
+    n_frames : int
+        Number of frames run.
+    n_acked : int
+        Number of the last frame acknowledged by the browser.
+    n_notifications : int
+        Number of calls to `notify()`.
+    n_rows_drawn : int
+        Total number of rows handed to frames.
+    n_held : int
+        Number of times a frame was delayed because the browser was
+        behind.
+    on_ack : function or None
+        If not None, called with the monotonic start time of a frame
+        and the time it was acknowledged, both in nanoseconds, when the
+        browser acknowledges it.
+    """
+
+    def __init__(
+        self,
+        doc,
+        update,
+        frame_rows=1000,
+        stream_delay=90,
+        frame_interval=30,
+        max_frames_in_flight=2,
+        ack_timeout=1000,
+    ):
+        """Create an update pump.
+
+        Parameters
+        ----------
+        doc : bokeh.document.Document instance
+            Document of the dashboard. Frames are run as callbacks of
+            the document.
+        update : function
+            Function with no arguments that updates the plotter and
+            monitor.
+        frame_rows : int, default 1000
+            Number of pending rows that trigger a frame without waiting
+            for `stream_delay` to elapse.
+        stream_delay : float, default 90
+            Maximum time, in milliseconds, that data wait before a
+            frame is run.
+        frame_interval : float, default 30
+            Minimum time, in milliseconds, between frames.
+        max_frames_in_flight : int, default 2
+            Maximum number of frames sent but not yet acknowledged by
+            the browser.
+        ack_timeout : float, default 1000
+            Time in milliseconds after which a frame is run even if the
+            browser has not acknowledged previous frames, e.g., because
+            no browser is connected.
+        """
+        self.doc = doc
+        self.update = update
+        self.frame_rows = frame_rows
+        self.stream_delay = stream_delay
+        self.frame_interval = frame_interval
+        self.max_frames_in_flight = max_frames_in_flight
+        self.ack_timeout = ack_timeout
+
+        self.n_frames = 0
+        self.n_acked = 0
+        self.n_notifications = 0
+        self.n_rows_drawn = 0
+        self.n_held = 0
+        self.on_ack = None
+
+        self.pending_rows = 0
+        self._first_pending = None
+        self._last_frame = -float("inf")
+        self._scheduled = None
+        self._scheduled_due = None
+
+        # Start times of the frames not yet acknowledged
+        self._frame_starts = collections.deque(maxlen=64)
+
+        # The browser echoes the frame number into the tags
+        self.marker = bokeh.models.ColumnDataSource(data=dict(frame=[0]))
+        self.marker.js_on_change(
+            "data",
+            bokeh.models.CustomJS(
+                args=dict(marker=self.marker),
+                code="marker.tags = [marker.data.frame[0]];",
+            ),
+        )
+        self.marker.on_change("tags", self._ack)
+
+    def notify(self, n_rows=0):
+        """Signal that new data arrived.
+
+        Parameters
+        ----------
+        n_rows : int, default 0
+            Number of new parsed rows. Data for the monitor alone are
+            signaled with `n_rows=0`.
+        """
+        if self._first_pending is None:
+            self._first_pending = time.monotonic()
+
+        self.pending_rows += n_rows
+        self.n_notifications += 1
+        self._schedule()
+
+    def _schedule(self):
+        """Schedule a frame for pending data, if not already scheduled
+        early enough."""
+        if self._first_pending is None:
+            return
+
+        now = time.monotonic()
+
+        if self.pending_rows >= self.frame_rows:
+            due = now
+        else:
+            due = self._first_pending + self.stream_delay / 1000
+
+        due = max(due, self._last_frame + self.frame_interval / 1000)
+
+        # Backpressure: wait for the browser to catch up
+        if self.n_frames - self.n_acked >= self.max_frames_in_flight:
+            ack_due = self._last_frame + self.ack_timeout / 1000
+            if ack_due > due:
+                due = ack_due
+                self.n_held += 1
+
+        # Coalesce with a frame that is already coming soon enough
+        if self._scheduled is not None:
+            if self._scheduled_due <= due:
+                return
+
+            try:
+                self.doc.remove_timeout_callback(self._scheduled)
+            except ValueError:
+                pass
+
+        self._scheduled_due = due
+        self._scheduled = self.doc.add_timeout_callback(
+            self._frame, max(0.0, 1000 * (due - now))
+        )
+
+    def _frame(self):
+        """Run a frame, handing it all pending data."""
+        self._scheduled = None
+        self._scheduled_due = None
+
+        self.n_rows_drawn += self.pending_rows
+        self.pending_rows = 0
+        self._first_pending = None
+        self._last_frame = time.monotonic()
+        self._frame_starts.append((self.n_frames + 1, time.monotonic_ns()))
+
+        self.update()
+
+        self.n_frames += 1
+        self.marker.data = dict(frame=[self.n_frames])
+
+    def _ack(self, attr, old, new):
+        """Record a frame acknowledged by the browser."""
+        if len(new) > 0:
+            self.n_acked = max(self.n_acked, int(new[0]))
+
+            # Acknowledging a frame acknowledges those before it
+            t_frame = None
+            starts = self._frame_starts
+            while len(starts) > 0 and starts[0][0] <= self.n_acked:
+                t_frame = starts.popleft()[1]
+
+            if self.on_ack is not None and t_frame is not None:
+                self.on_ack(t_frame, time.monotonic_ns())
+
+            # Data may have been held waiting for this acknowledgement
+            self._schedule()
+
+    def set_cadence(self, frame_rows=None, stream_delay=None):
+        """Change when frames are run, rescheduling a frame that is
+        already scheduled.
+
+        Parameters
+        ----------
+        frame_rows : int or None, default None
+            If given, new number of pending rows that trigger a frame.
+        stream_delay : float or None, default None
+            If given, new maximum time, in milliseconds, that data wait
+            before a frame is run.
+        """
+        if frame_rows is not None:
+            self.frame_rows = frame_rows
+
+        if stream_delay is not None:
+            self.stream_delay = stream_delay
+
+        # A scheduled frame may now be due earlier or later
+        if self._scheduled is not None:
+            try:
+                self.doc.remove_timeout_callback(self._scheduled)
+            except ValueError:
+                pass
+
+            self._scheduled = None
+            self._scheduled_due = None
+            self._schedule()
+
+    def stats(self):
+        """Summary of the pump's activity.
+
+        Returns
+        -------
+        output : dict
+            Number of frames run, frames the browser has yet to
+            acknowledge, mean number of rows per frame, mean number of
+            notifications coalesced into each frame, and number of
+            times frames were held for the browser.
+        """
+        return dict(
+            frames=self.n_frames,
+            in_flight=self.n_frames - self.n_acked,
+            rows_per_frame=self.n_rows_drawn / max(self.n_frames, 1),
+            notifications_per_frame=self.n_notifications / max(self.n_frames, 1),
+            held=self.n_held,
+        )
@@ -0,0 +1,173 @@
+import time
+
+import numpy as np
+
+from . import capture
+
+# Ports with names starting with this prefix are replays of the raw
+# capture whose stem follows it
+port_prefix = "replay:"
+
+
+class ReplaySerial(object):
+    """Stand-in for a serial.Serial instance that plays back a raw
+    capture.
+
+    Bytes become available to read as they did when they were recorded,
+    each chunk at its recorded time after the replay was opened, scaled
+    by `speed`. With a speed of zero, bytes are available as fast as
+    they are read, `chunk_bytes` at a time, which makes a replay a
+    deterministic source of load. Data sent to the device are
+    discarded.
+
+    Attributes
+    ----------
+    port : str
+        Name of the port, `port_prefix` followed by the stem.
+    stem : str
+        Stem of the raw capture, as for `capture.load_raw_capture()`.
+    speed : float
+        Factor by which the replay is faster than the recording, or 0
+        for as fast as possible.
+    chunk_bytes : int
+        Most bytes made available at once when `speed` is 0.
+    timeout : float or None
+        Longest time in seconds `read()` waits for bytes. If None, it
+        waits until all requested bytes are available or the replay
+        is done.
+    is_open : bool
+        True unless `close()` has been called.
+    n_bytes : int
+        Number of bytes in the capture.
+    position : int
+        Number of bytes read.
+    """
+
+    def __init__(self, stem, speed=1.0, chunk_bytes=65536, timeout=None):
+        """Open a replay of a raw capture.
+
+        Parameters
+        ----------
+        stem : str
+            Stem of the raw capture.
+        speed : float, default 1.0
+            Factor by which the replay is faster than the recording, or
+            0 for as fast as possible.
+        chunk_bytes : int, default 65536
+            Most bytes made available at once when `speed` is 0.
+        timeout : float or None, default None
+            Longest time in seconds `read()` waits for bytes.
+        """
+        if speed < 0:
+            raise RuntimeError(
+                f'Inputted speed "{speed}" is invalid. speed must be nonnegative.'
+            )
+
+        self.stem = stem
+        self.port = port_prefix + stem
+        self.speed = speed
+        self.chunk_bytes = chunk_bytes
+        self.timeout = timeout
+
+        self._raw, index = capture.load_raw_capture(stem)
+        self.n_bytes = len(self._raw)
+
+        # Offset of each chunk and time since the first at which it was read
+        self._offsets = index[:, 0]
+        if len(index) > 0:
+            self._times = index[:, 1] - index[0, 1]
+        else:
+            self._times = index[:, 1]
+
+        self.open()
+
+    def open(self):
+        """Start the replay from the beginning."""
+        self.position = 0
+        self.is_open = True
+        self._start = time.monotonic_ns()
+
+    def close(self):
+        """Stop the replay."""
+        self.is_open = False
+
+    @property
+    def done(self):
+        """True once all bytes have been read."""
+        return self.position >= self.n_bytes
+
+    def _available(self):
+        """Offset of the end of the bytes available now."""
+        if self.speed == 0:
+            return min(self.position + self.chunk_bytes, self.n_bytes)
+
+        elapsed = (time.monotonic_ns() - self._start) * self.speed
+        n_chunks = np.searchsorted(self._times, elapsed, side="right")
+        if n_chunks < len(self._offsets):
+            return int(self._offsets[n_chunks])
+
+        return self.n_bytes
+
+    def _wait(self):
+        """Time in seconds until more bytes are available."""
+        elapsed = (time.monotonic_ns() - self._start) * self.speed
+        i = np.searchsorted(self._times, elapsed, side="right")
+        if i >= len(self._times):
+            return 0.0
+
+        return max(0.0, (self._times[i] - elapsed) / self.speed / 1e9)
+
+    @property
+    def in_waiting(self):
+        return self._available() - self.position
+
+    def read(self, size=1):
+        """Read up to `size` bytes, waiting for at most `timeout`
+        seconds for them to become available."""
+        if size == 0:
+            return b""
+
+        # Wait for bytes, unless replaying as fast as possible
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        end = min(self.position + size, self.n_bytes)
+        while self.speed > 0 and self._available() < end:
+            wait = self._wait()
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    break
+
+            time.sleep(wait)
+
+        end = min(self._available(), self.position + size)
+        out = self._raw[self.position : end].tobytes()
+        self.position = end
+
+        return out
+
+    def read_all(self):
+        """Read all bytes available now."""
+        return self.read(self.in_waiting)
+
+    def read_until(self, expected=b"\n", size=None):
+        """Read bytes available now up to and including `expected`."""
+        end = self._available()
+        if size is not None:
+            end = min(end, self.position + size)
+
+        available = self._raw[self.position : end].tobytes()
+        i = available.find(expected)
+        if i >= 0:
+            available = available[: i + len(expected)]
+
+        self.position += len(available)
+
+        return available
+
+    def reset_input_buffer(self):
+        """Discard bytes available now."""
+        self.position = self._available()
+
+    def write(self, data):
+        """Discard data sent to the device, which is a recording."""
+        return len(data)
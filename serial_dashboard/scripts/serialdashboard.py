@@ -1,5 +1,9 @@
+import os
+
 import click
 import serial_dashboard
+import serial_dashboard.derived
+import serial_dashboard.profiles
 
 
 def _check_baudrate_cli(baudrate):
@@ -21,10 +25,10 @@ def _check_baudrate_cli(baudrate):
 
 
 def _check_maxcols_cli(maxcols):
-    if maxcols < 1 or maxcols > serial_dashboard.max_max_cols:
+    if maxcols < 1:
         click.echo("  ERROR", err=True)
         click.echo(
-            f"  Inputted maxcols {maxcols} is invalid. maxcols must be between 1 and {serial_dashboard.max_max_cols}.",
+            f"  Inputted maxcols {maxcols} is invalid. maxcols must be a positive integer.",
             err=True,
         )
         click.echo("")
@@ -53,7 +57,7 @@ def _check_delimiter_cli(delimiter):
 
 
 def _check_timecolumn_cli(timecolumn, maxcols):
-    if timecolumn == "none":
+    if timecolumn in ("none", "host"):
         return True
 
     try:
@@ -99,16 +103,123 @@ def _check_timeunits_cli(timeunits):
         return True
 
 
+def _check_timecounterbits_cli(timecounterbits):
+    if timecounterbits not in [
+        str(tcb) for tcb in serial_dashboard.allowed_time_counter_bits
+    ]:
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted timecounterbits "{timecounterbits}" is not allowed. Allowed time counter widths are: ',
+            err=True,
+        )
+
+        for tcb in serial_dashboard.allowed_time_counter_bits:
+            click.echo(f"    {tcb}", err=True)
+
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
 def _check_rollover_cli(rollover):
-    if rollover not in serial_dashboard.allowed_rollover:
+    if rollover < 1:
         click.echo("  ERROR", err=True)
         click.echo(
-            f'  Inputted rollover "{rollover}" is not allowed. Allowed rollover values are: ',
+            f'  Inputted rollover "{rollover}" is invalid. rollover must be a positive integer.',
             err=True,
         )
 
-        for ro in serial_dashboard.allowed_rollover:
-            click.echo(f"    {ro}", err=True)
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
+def _check_framerows_cli(framerows):
+    if framerows < 1:
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted framerows "{framerows}" is invalid. framerows must be a positive integer.',
+            err=True,
+        )
+
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
+def _check_acquisition_cli(acquisition):
+    if acquisition not in serial_dashboard.allowed_acquisitions:
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted acquisition "{acquisition}" is not allowed. Must be either "async" or "process".',
+            err=True,
+        )
+
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
+def _check_delay_cli(name, delay):
+    if delay < 1:
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted {name} "{delay}" is invalid. {name} must be a positive integer.',
+            err=True,
+        )
+
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
+def _check_replay_cli(replay):
+    if replay != "" and not os.path.isfile(f"{replay}_raw.bin"):
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted replay "{replay}" is invalid. There is no raw capture file {replay}_raw.bin.',
+            err=True,
+        )
+
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
+def _check_replayspeed_cli(replayspeed):
+    if replayspeed < 0:
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted replayspeed "{replayspeed}" is invalid. replayspeed must be a nonnegative number.',
+            err=True,
+        )
+
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
+def _check_compression_cli(compression):
+    if not 0 <= compression <= 9:
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted compression "{compression}" is invalid. compression must be an integer from 0 to 9.',
+            err=True,
+        )
 
         click.echo("")
 
@@ -118,10 +229,10 @@ def _check_rollover_cli(rollover):
 
 
 def _check_inputtype_cli(inputtype):
-    if inputtype not in ["ascii", "bytes"]:
+    if inputtype not in ["ascii", "bytes", "script"]:
         click.echo("  ERROR", err=True)
         click.echo(
-            f'  Inputted input type "{inputtype}" is not allowed. Must be either "ascii" or "bytes".',
+            f'  Inputted input type "{inputtype}" is not allowed. Must be "ascii", "bytes", or "script".',
             err=True,
         )
 
@@ -150,8 +261,120 @@ def _check_glyph_cli(glyph):
         return True
 
 
+def _check_capture_cli(capture):
+    if capture not in serial_dashboard.allowed_captures:
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted capture "{capture}" is not allowed. Must be either "memory" or "disk".',
+            err=True,
+        )
+
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
+def _check_outputbackend_cli(outputbackend):
+    if outputbackend not in serial_dashboard.allowed_output_backends:
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted output backend "{outputbackend}" is not allowed. Must be either "auto", "canvas", or "webgl".',
+            err=True,
+        )
+
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
+def _check_renderer_cli(renderer):
+    if renderer not in serial_dashboard.allowed_renderers:
+        click.echo("  ERROR", err=True)
+        click.echo(
+            f'  Inputted renderer "{renderer}" is not allowed. Must be either "separate" or "batched".',
+            err=True,
+        )
+
+        click.echo("")
+
+        return False
+    else:
+        return True
+
+
+def _check_derived_cli(derived):
+    try:
+        serial_dashboard.derived.parse_spec(derived)
+    except RuntimeError as e:
+        click.echo("  ERROR", err=True)
+        click.echo(f"  {e}", err=True)
+
+        click.echo("")
+
+        return False
+
+    return True
+
+
+def _load_profile_cli(profile):
+    try:
+        return serial_dashboard.profiles.load_profile(profile)
+    except RuntimeError as e:
+        click.echo("  ERROR", err=True)
+        click.echo(f"  {e}", err=True)
+
+        click.echo("")
+
+        return None
+
+
+def _apply_profile_cli(settings, params):
+    """Parameters left at their defaults on the command line taken from
+    the settings of a profile."""
+    ctx = click.get_current_context()
+
+    for key, value in settings.items():
+        if (
+            key in params
+            and ctx.get_parameter_source(key) == click.core.ParameterSource.DEFAULT
+        ):
+            # Convert to what would be given on the command line
+            if key in ("timecolumn", "timecounterbits"):
+                value = "none" if value is None else str(value)
+            elif key == "replay" and value is None:
+                value = ""
+
+            params[key] = value
+
+    return params
+
+
 def _check_inputs_cli(
-    baudrate, maxcols, delimiter, timecolumn, timeunits, rollover, glyph, inputtype,
+    baudrate,
+    maxcols,
+    delimiter,
+    timecolumn,
+    timeunits,
+    timecounterbits,
+    rollover,
+    glyph,
+    inputtype,
+    capture,
+    outputbackend,
+    renderer,
+    framerows,
+    acquisition,
+    derived,
+    compression,
+    daqdelay,
+    streamdelay,
+    portsearchdelay,
+    replay,
+    replayspeed,
 ):
     inputtype = inputtype.lower()
 
@@ -161,9 +384,22 @@ def _check_inputs_cli(
         _check_delimiter_cli(delimiter),
         _check_timecolumn_cli(timecolumn, maxcols),
         _check_timeunits_cli(timeunits),
+        _check_timecounterbits_cli(timecounterbits),
         _check_rollover_cli(rollover),
         _check_glyph_cli(glyph),
         _check_inputtype_cli(inputtype),
+        _check_capture_cli(capture),
+        _check_outputbackend_cli(outputbackend),
+        _check_renderer_cli(renderer),
+        _check_framerows_cli(framerows),
+        _check_acquisition_cli(acquisition),
+        _check_derived_cli(derived),
+        _check_compression_cli(compression),
+        _check_delay_cli("daqdelay", daqdelay),
+        _check_delay_cli("streamdelay", streamdelay),
+        _check_delay_cli("portsearchdelay", portsearchdelay),
+        _check_replay_cli(replay),
+        _check_replayspeed_cli(replayspeed),
     ]
 
     for res in results:
@@ -200,7 +436,7 @@ def _check_inputs_cli(
 @click.option(
     "--delimiter",
     default="comma",
-    help="delimiter of data coming off of the board (default comma)",
+    help="delimiter of data coming off of the board, or auto to find it from the data (default comma)",
 )
 @click.option(
     "--columnlabels",
@@ -210,11 +446,16 @@ def _check_inputs_cli(
 @click.option(
     "--timecolumn",
     default="none",
-    help="column (zero-indexed) of incoming data that specifies time (default none)",
+    help="column (zero-indexed) of incoming data that specifies time, or host to use the time each line arrived at the computer (default none)",
 )
 @click.option(
     "--timeunits", default="ms", help="units of incoming time data (default ms)"
 )
+@click.option(
+    "--timecounterbits",
+    default="none",
+    help="width in bits of the board's time counter, e.g. 32 for millis() or micros(), used to remove counter wraps (default none)",
+)
 @click.option(
     "--rollover",
     default=400,
@@ -229,12 +470,32 @@ def _check_inputs_cli(
 @click.option(
     "--inputtype",
     default="ascii",
-    help="whether input is ascii or bytes (default ascii)",
+    help="whether input is ascii, bytes, or a script of commands (default ascii)",
 )
 @click.option("--fileprefix", default="_tmp", help="prefix of output files")
+@click.option(
+    "--capture",
+    default="memory",
+    help="whether to hold the history of plotted data in memory or in memory-mapped .npy files on disk (default memory)",
+)
+@click.option(
+    "--outputbackend",
+    default="auto",
+    help="backend for rendering the plot; either auto, canvas, or webgl (default auto)",
+)
+@click.option(
+    "--renderer",
+    default="separate",
+    help="whether to draw each column with its own glyphs (separate) or all columns with one multi-line and one scatter glyph (batched) (default separate)",
+)
+@click.option(
+    "--derived",
+    default="",
+    help='channels computed from incoming data, e.g. "mean(1, 50), rms(1, 50), diff(2), ema(1, 0.1), fft(1, 256)" (default is none)',
+)
 @click.option(
     "--daqdelay",
-    default=90,
+    default=20,
     type=int,
     help="approximate delay in milliseconds for data acquisition from the board (default 20)",
 )
@@ -242,7 +503,18 @@ def _check_inputs_cli(
     "--streamdelay",
     default=90,
     type=int,
-    help="delay in milliseconds between updates of the plotter and monitor (default 90)",
+    help="maximum delay in milliseconds between arrival of data and updates of the plotter and monitor (default 90)",
+)
+@click.option(
+    "--framerows",
+    default=1000,
+    type=int,
+    help="number of newly arrived rows that trigger an update of the plotter without waiting for --streamdelay (default 1000)",
+)
+@click.option(
+    "--acquisition",
+    default="async",
+    help="whether to read and parse data in the dashboard process (async) or in a separate worker process (process) (default async)",
 )
 @click.option(
     "--portsearchdelay",
@@ -250,6 +522,43 @@ def _check_inputs_cli(
     type=int,
     help="delay in milliseconds for checks of serial devices (default 1000)",
 )
+@click.option(
+    "--replay",
+    default="",
+    help="stem of a raw capture to offer as a port for replay, as with <stem>_raw.bin (default is none)",
+)
+@click.option(
+    "--replayspeed",
+    default=1.0,
+    type=float,
+    help="factor by which replays are faster than their recordings, or 0 for as fast as possible (default 1)",
+)
+@click.option(
+    "--rawcapture",
+    is_flag=True,
+    help="record all bytes read from the board, with when they were read, to <fileprefix>_<timestamp>_raw.bin and <fileprefix>_<timestamp>_raw_index.npy",
+)
+@click.option(
+    "--autocolumns",
+    is_flag=True,
+    help="take column labels from a header line or from key:value or key=value pairs in the data, and add columns as more appear",
+)
+@click.option(
+    "--compression",
+    default=1,
+    type=int,
+    help="level from 1 to 9 of compression of messages sent to the browser, or 0 for none (default 1)",
+)
+@click.option(
+    "--portmatch",
+    default="",
+    help='pattern with shell-style wildcards, e.g. "*usbmodem*", of the device name or description of a port to connect to and start plotting as soon as it is found (default is none)',
+)
+@click.option(
+    "--profile",
+    default="",
+    help="TOML or YAML file of settings, or the name of one in ~/.serial_dashboard/profiles, used for options not given on the command line (default is none)",
+)
 def cli(
     port,
     browser,
@@ -259,18 +568,63 @@ def cli(
     columnlabels,
     timecolumn,
     timeunits,
+    timecounterbits,
     rollover,
     glyph,
     inputtype,
     fileprefix,
+    capture,
+    outputbackend,
+    renderer,
+    derived,
     daqdelay,
     streamdelay,
+    framerows,
+    acquisition,
     portsearchdelay,
+    replay,
+    replayspeed,
+    rawcapture,
+    autocolumns,
+    compression,
+    portmatch,
+    profile,
 ):
     """Launch a serial dashboard from the command line."""
 
+    # Settings from a profile fill in options not given
+    if profile != "":
+        settings = _load_profile_cli(profile)
+        if settings is None:
+            return
+
+        params = _apply_profile_cli(settings, dict(locals(), profile=""))
+        del params["settings"]
+
+        return cli.callback(**params)
+
     if _check_inputs_cli(
-        baudrate, maxcols, delimiter, timecolumn, timeunits, rollover, glyph, inputtype,
+        baudrate,
+        maxcols,
+        delimiter,
+        timecolumn,
+        timeunits,
+        timecounterbits,
+        rollover,
+        glyph,
+        inputtype,
+        capture,
+        outputbackend,
+        renderer,
+        framerows,
+        acquisition,
+        derived,
+        compression,
+        daqdelay,
+        streamdelay,
+        portsearchdelay,
+        replay,
+        replayspeed,
     ):
         serial_dashboard.launch(
             port=port,
@@ -281,11 +635,26 @@ def cli(
             columnlabels=columnlabels,
             timecolumn=timecolumn,
             timeunits=timeunits,
+            timecounterbits=(
+                None if timecounterbits == "none" else int(timecounterbits)
+            ),
             rollover=rollover,
             glyph=glyph,
             inputtype=inputtype,
             fileprefix=fileprefix,
+            capture=capture,
+            outputbackend=outputbackend,
+            renderer=renderer,
+            derived=derived,
             daqdelay=daqdelay,
             streamdelay=streamdelay,
+            framerows=framerows,
+            acquisition=acquisition,
             portsearchdelay=portsearchdelay,
+            replay=None if replay == "" else replay,
+            replayspeed=replayspeed,
+            rawcapture=rawcapture,
+            autocolumns=autocolumns,
+            compression=compression,
+            portmatch=None if portmatch == "" else portmatch,
         )
@@ -0,0 +1,322 @@
+import asyncio
+import codecs
+import collections
+import re
+import time
+
+from . import comms
+
+# A step taken by a `WriteQueue`. `kind` is "write", "wait", or
+# "expect", and `value` is the bytes to send or expect, or the seconds
+# to wait.
+Step = collections.namedtuple(
+    "Step", ["kind", "value", "timeout", "on_start"], defaults=[None, None]
+)
+
+
+def parse_bytes(text):
+    """Convert a description of bytes to bytes.
+
+    Parameters
+    ----------
+    text : str
+        Bytes separated by whitespace or commas, each a decimal integer
+        from 0 to 255 or a hexadecimal number with a "0x" prefix. A
+        hexadecimal number with more than two digits is several bytes,
+        most significant first, so "0x0d0a" is the same as "13 10".
+        Brackets are ignored, so a Python list of integers is allowed.
+
+    Returns
+    -------
+    output : bytes
+        The bytes.
+    """
+    tokens = [token for token in re.split(r"[\s,\[\]]+", text) if token]
+
+    if len(tokens) == 0:
+        raise RuntimeError("No bytes given.")
+
+    message = bytearray()
+    for token in tokens:
+        if token.lower().startswith("0x"):
+            digits = token[2:]
+            if len(digits) % 2 == 1:
+                digits = "0" + digits
+
+            try:
+                message += bytes.fromhex(digits)
+            except ValueError:
+                raise RuntimeError(f'"{token}" is not a hexadecimal number.')
+        else:
+            try:
+                value = int(token)
+            except ValueError:
+                raise RuntimeError(f'"{token}" is not an integer.')
+
+            if not 0 <= value <= 255:
+                raise RuntimeError(f'"{token}" is not from 0 to 255.')
+
+            message.append(value)
+
+    return bytes(message)
+
+
+def _parse_text(text):
+    """ASCII text with backslash escapes, such as \\n, converted."""
+    try:
+        return codecs.decode(text, "unicode_escape").encode("latin-1")
+    except (UnicodeDecodeError, UnicodeEncodeError):
+        raise RuntimeError(f'Cannot encode "{text}" as bytes.')
+
+
+def parse_script(text):
+    """Convert a script of commands to steps for a `WriteQueue`.
+
+    Each line of the script is one command:
+
+    - ``send <text>``: send ASCII text, with backslash escapes such as
+      ``\\n`` for a newline.
+    - ``bytes <bytes>``: send bytes, as for `parse_bytes()`.
+    - ``wait <ms>``: wait a number of milliseconds.
+    - ``expect <text>``: wait until the device sends text, with
+      backslash escapes, or abandon the rest of the script if it does
+      not arrive in time.
+    - ``timeout <ms>``: time to wait for the text of subsequent
+      ``expect`` commands, 1000 ms unless set.
+
+    Blank lines and lines starting with ``#`` are ignored.
+
+    Parameters
+    ----------
+    text : str
+        The script.
+
+    Returns
+    -------
+    output : list of Step
+        Steps, as for `WriteQueue.put()`.
+    """
+    steps = []
+    timeout = 1.0
+    for i, line in enumerate(text.splitlines()):
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            continue
+
+        command, _, arg = line.partition(" ")
+        command = command.lower()
+
+        try:
+            if command == "send":
+                steps.append(Step("write", _parse_text(arg)))
+            elif command == "bytes":
+                steps.append(Step("write", parse_bytes(arg)))
+            elif command in ("wait", "timeout"):
+                try:
+                    ms = float(arg)
+                except ValueError:
+                    raise RuntimeError(f'"{arg}" is not a number of milliseconds.')
+
+                if ms < 0:
+                    raise RuntimeError(f'"{arg}" is negative.')
+
+                if command == "wait":
+                    steps.append(Step("wait", ms / 1000))
+                else:
+                    timeout = ms / 1000
+            elif command == "expect":
+                if arg == "":
+                    raise RuntimeError("No text to expect.")
+
+                steps.append(Step("expect", _parse_text(arg), timeout=timeout))
+            else:
+                raise RuntimeError(f'Unknown command "{command}".')
+        except RuntimeError as e:
+            raise RuntimeError(f"Line {i + 1}: {e}")
+
+    return steps
+
+
+class WriteQueue(object):
+    """Queue of data to send to a device, sent without blocking the
+    event loop.
+
+    Steps are taken in order by a task running in the event loop. Data
+    are written in chunks of `chunk_bytes` in a separate thread, and
+    after each chunk the queue waits for as long as the chunk takes to
+    go over the wire at the baud rate of the connection, so that a
+    device whose receive buffer is about `chunk_bytes` long is not
+    overrun and data acquisition continues meanwhile. A step waiting
+    for a response watches the bytes passed to `received()`, starting
+    from the step before it, so that a quick response is not missed.
+
+    Reads of the port change its timeout, so writes hold the
+    `port_lock` of the connection, as do reads, to keep them from
+    running at the same time in different threads.
+
+    Attributes
+    ----------
+    serial_connection : SerialConnection instance
+        Connection whose device the data are sent to.
+    chunk_bytes : int
+        Most bytes written at once.
+    status : str
+        Description of what the queue is doing, or of why it stopped
+        a script.
+    n_bytes_sent : int
+        Number of bytes written.
+    """
+
+    def __init__(self, serial_connection, chunk_bytes=64):
+        """Create an empty queue.
+
+        Parameters
+        ----------
+        serial_connection : SerialConnection instance
+            Connection whose device the data are sent to.
+        chunk_bytes : int, default 64
+            Most bytes written at once. The default is the size of the
+            receive buffer of many Arduino boards.
+        """
+        self.serial_connection = serial_connection
+        self.chunk_bytes = chunk_bytes
+        self.status = "idle"
+        self.n_bytes_sent = 0
+        self._steps = collections.deque()
+        self._task = None
+        self._wakeup = None
+        self._capture = None
+        self._arrived = None
+
+    def __len__(self):
+        """Number of steps waiting to be taken."""
+        return len(self._steps)
+
+    def start(self):
+        """Start taking steps. Must be called from the event loop."""
+        self.stop()
+        self._wakeup = asyncio.Event()
+        self._arrived = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Stop taking steps and discard those waiting."""
+        self.clear()
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self.status = "idle"
+
+    def clear(self):
+        """Discard steps waiting to be taken."""
+        self._steps.clear()
+
+    def put(self, steps):
+        """Add steps to the queue.
+
+        Parameters
+        ----------
+        steps : list of Step or tuples
+            Each step is `Step("write", data, on_start=on_start)` to
+            send bytes, where `on_start` is None or a function called
+            with the monotonic time in nanoseconds when the write
+            starts, `Step("wait", seconds)` to pause, or
+            `Step("expect", data, timeout=timeout)` to wait at most
+            `timeout` seconds for the device to send bytes `data`,
+            abandoning the remaining steps if it does not. Tuples are
+            taken as the fields of a `Step` in order.
+        """
+        self._steps.extend(Step(*step) for step in steps)
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def send(self, data):
+        """Add bytes to send to the queue."""
+        self.put([Step("write", data)])
+
+    def received(self, raw):
+        """Pass bytes received from the device to steps waiting for
+        them."""
+        if self._capture is not None and len(raw) > 0:
+            self._capture += raw
+            self._arrived.set()
+
+    async def _run(self):
+        while True:
+            if len(self._steps) == 0:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            step = self._steps.popleft()
+
+            # Watch for a response from before the step that prompts it
+            if len(self._steps) > 0 and self._steps[0].kind == "expect":
+                self._capture = bytearray()
+
+            if step.kind == "write":
+                self.status = f"sending {len(step.value)} bytes"
+
+                if step.on_start is not None:
+                    step.on_start(time.monotonic_ns())
+
+                await self._write(step.value)
+            elif step.kind == "wait":
+                self.status = f"waiting {1000 * step.value:g} ms"
+                await asyncio.sleep(step.value)
+            elif step.kind == "expect":
+                self.status = f"waiting for {step.value!r}"
+                if not await self._expect(step.value, step.timeout):
+                    self.status = f"timed out waiting for {step.value!r}"
+                    self.clear()
+                    continue
+
+            if len(self._steps) == 0:
+                self.status = "idle"
+
+    async def _write(self, data):
+        ser = self.serial_connection.ser
+        loop = asyncio.get_running_loop()
+        byte_time = (
+            comms.bits_per_byte(self.serial_connection)
+            / self.serial_connection.baudrate
+        )
+
+        for i in range(0, len(data), self.chunk_bytes):
+            chunk = data[i : i + self.chunk_bytes]
+            await loop.run_in_executor(None, self._write_chunk, ser, chunk)
+            self.n_bytes_sent += len(chunk)
+
+            # Let the chunk drain before sending the next
+            await asyncio.sleep(len(chunk) * byte_time)
+
+    def _write_chunk(self, ser, chunk):
+        with self.serial_connection.port_lock:
+            ser.write(chunk)
+
+    async def _expect(self, data, timeout):
+        if self._capture is None:
+            self._capture = bytearray()
+
+        deadline = time.monotonic() + timeout
+        try:
+            while data not in self._capture:
+                # Only the end of the capture can hold the start of a match
+                del self._capture[: max(0, len(self._capture) - 65536)]
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+            return True
+        finally:
+            self._capture = None
@@ -0,0 +1,183 @@
+import numpy as np
+
+
+class StreamingStats(object):
+    """Single-pass statistics of each channel.
+
+    Overall statistics are accumulated block by block, merging the
+    count, mean, and sum of squared deviations of each new block into
+    the running ones (Chan et al.'s parallel form of Welford's
+    algorithm), so the cost of a block is proportional to its size and
+    never depends on the length of the history. Statistics over the
+    last `window` samples are computed from a ring buffer of those
+    samples when `summary()` is called.
+
+    Attributes
+    ----------
+    n_channels : int
+        Number of channels.
+    window : int
+        Number of most recent samples of each channel included in the
+        windowed statistics.
+    n_rows : int
+        Number of rows appended since the last reset.
+    count : Numpy array
+        Number of non-NaN samples of each channel.
+    n_nan : Numpy array
+        Number of NaN samples of each channel.
+    mean : Numpy array
+        Mean of each channel.
+    m2 : Numpy array
+        Sum of squared deviations from the mean of each channel.
+    min : Numpy array
+        Minimum of each channel.
+    max : Numpy array
+        Maximum of each channel.
+    t_first : Numpy array
+        Time in seconds of the first non-NaN sample of each channel.
+    t_last : Numpy array
+        Time in seconds of the last non-NaN sample of each channel.
+    """
+
+    def __init__(self, n_channels, window=400):
+        """Create empty statistics.
+
+        Parameters
+        ----------
+        n_channels : int
+            Number of channels. Blocks with fewer channels are padded
+            with NaNs and blocks with more are truncated.
+        window : int, default 400
+            Number of most recent samples included in the windowed
+            statistics.
+        """
+        self.n_channels = n_channels
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Forget all samples."""
+        n = self.n_channels
+        self.n_rows = 0
+        self.count = np.zeros(n, dtype=np.int64)
+        self.n_nan = np.zeros(n, dtype=np.int64)
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self.min = np.full(n, np.nan)
+        self.max = np.full(n, np.nan)
+        self.t_first = np.full(n, np.nan)
+        self.t_last = np.full(n, np.nan)
+
+        self._ring = np.full((self.window, n), np.nan)
+        self._n_written = 0
+
+    def set_window(self, window):
+        """Change the window of the windowed statistics, which restart."""
+        self.window = window
+        self._ring = np.full((window, self.n_channels), np.nan)
+        self._n_written = 0
+
+    def append(self, y, t=None):
+        """Update the statistics with a block of samples.
+
+        Parameters
+        ----------
+        y : 2D Numpy array
+            Samples, one column per channel.
+        t : Numpy array or None, default None
+            Time in seconds of each row of `y`, used to compute sample
+            rates. If None, rates are not updated.
+        """
+        if len(y) == 0:
+            return
+
+        block = np.full((len(y), self.n_channels), np.nan)
+        n_cols = min(y.shape[1], self.n_channels)
+        block[:, :n_cols] = y[:, :n_cols]
+
+        self.n_rows += len(block)
+
+        valid = ~np.isnan(block)
+        n_b = valid.sum(axis=0)
+        self.n_nan += len(block) - n_b
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.nansum(block, axis=0) / n_b
+            m2_b = np.nansum((block - mean_b) ** 2, axis=0)
+
+            # Merge the block into the running statistics
+            n_a = self.count
+            n = n_a + n_b
+            delta = mean_b - self.mean
+            has_new = n_b > 0
+            self.mean = np.where(has_new, self.mean + delta * n_b / n, self.mean)
+            self.m2 = np.where(
+                has_new, self.m2 + m2_b + delta**2 * n_a * n_b / n, self.m2
+            )
+        self.count = n
+
+        self.min = np.fmin(self.min, np.fmin.reduce(block, axis=0))
+        self.max = np.fmax(self.max, np.fmax.reduce(block, axis=0))
+
+        if t is not None:
+            # First and last rows with a sample of each channel
+            first = np.argmax(valid, axis=0)
+            last = len(block) - 1 - np.argmax(valid[::-1], axis=0)
+            self.t_first = np.where(
+                has_new & np.isnan(self.t_first), t[first], self.t_first
+            )
+            self.t_last = np.where(has_new, t[last], self.t_last)
+
+        # Keep the last `window` rows
+        block = block[-self.window :]
+        inds = np.arange(self._n_written, self._n_written + len(block)) % self.window
+        self._ring[inds] = block
+        self._n_written += len(block)
+
+    def summary(self):
+        """Current statistics of each channel.
+
+        Returns
+        -------
+        output : dict
+            Numpy arrays, with an entry for each channel, of the number
+            of samples (`n`), number of NaNs (`nan`), sample rate in
+            Hz (`rate`), and the `mean`, standard deviation (`std`),
+            `min`, and `max`, overall and, prefixed with `window_`, over
+            the last `window` samples.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(self.m2 / (self.count - 1))
+            rate = (self.count - 1) / (self.t_last - self.t_first)
+
+        std[self.count < 2] = np.nan
+        rate[~np.isfinite(rate) | (rate <= 0)] = np.nan
+
+        out = dict(
+            n=self.count,
+            nan=self.n_nan,
+            rate=rate,
+            mean=np.where(self.count > 0, self.mean, np.nan),
+            std=std,
+            min=self.min,
+            max=self.max,
+        )
+
+        ring = self._ring[: min(self._n_written, self.window)]
+        if len(ring) == 0:
+            for stat in ("mean", "std", "min", "max"):
+                out["window_" + stat] = np.full(self.n_channels, np.nan)
+        else:
+            valid = ~np.isnan(ring)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                n = valid.sum(axis=0)
+                mean = np.nansum(ring, axis=0) / n
+                out["window_mean"] = mean
+                out["window_std"] = np.sqrt(
+                    np.nansum((ring - mean) ** 2, axis=0) / (n - 1)
+                )
+            out["window_std"][n < 2] = np.nan
+            out["window_min"] = np.fmin.reduce(ring, axis=0)
+            out["window_max"] = np.fmax.reduce(ring, axis=0)
+
+        return out
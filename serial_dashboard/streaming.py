@@ -0,0 +1,463 @@
+import asyncio
+import queue
+import threading
+import time
+
+import numpy as np
+
+from . import capture
+from . import comms
+from . import connection
+from . import options
+from . import parsers
+from . import replay
+from . import worker
+
+allowed_policies = ("block", "drop")
+
+
+def _check_policy(policy):
+    if policy not in allowed_policies:
+        raise RuntimeError(
+            f'Inputted policy "{policy}" is not allowed. Must be either "block" or "drop".'
+        )
+
+
+def _check_positive(name, value):
+    if type(value) != int or value < 1:
+        raise RuntimeError(
+            f'Inputted {name} "{value}" is invalid. {name} must be a positive integer.'
+        )
+
+
+class Stream(object):
+    """Blocks of parsed data streaming from a serial device.
+
+    A Stream reads and parses data from a serial device in a background
+    thread, without the dashboard, and delivers them in blocks of rows
+    as 2D Numpy arrays with `maxcols` columns, NaN-padded as in the
+    plotter. Each block is a freshly allocated array that is handed
+    over without copying. Blocks wait for the consumer in a bounded
+    queue.
+
+    A Stream is an iterator and an asynchronous iterator. Iteration
+    ends after `close()` is called and all queued blocks have been
+    delivered. It may also be used as a context manager, which closes
+    it on exit.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        import serial_dashboard
+
+        with serial_dashboard.stream("/dev/ttyACM0", maxcols=3) as s:
+            for block in s:
+                print(block.mean(axis=0))
+
+    Attributes
+    ----------
+    serial_connection : SerialConnection instance
+        The connection to the device.
+    n_rows : int
+        Number of rows parsed.
+    n_dropped : int
+        Number of rows discarded because the queue was full when using
+        the "drop" policy.
+    parse_errors : parsers.ParseErrors instance
+        Accounting of lines that did not parse cleanly.
+    """
+
+    def __init__(
+        self,
+        port,
+        baudrate=115200,
+        delimiter="comma",
+        maxcols=10,
+        blocksize=1024,
+        latency=100,
+        queuesize=16,
+        policy="block",
+        timestamps=False,
+        acquisition="async",
+        handshake=True,
+    ):
+        """Connect to a device and start streaming.
+
+        Parameters
+        ----------
+        port : str, int, or serial.tools.list_ports_common.ListPortInfo instance
+            Port to connect to, as for `SerialConnection.connect()`.
+        baudrate : int, default 115200
+            Baud rate of serial connection.
+        delimiter : str, default "comma"
+            Delimiter of data coming off of the board. Allowed values
+            are as for `launch()`, including "auto", with which data
+            are held until the delimiter is detected from the first
+            lines.
+        maxcols : int, default 10
+            Number of columns of each block. Longer rows are truncated
+            and shorter ones are padded with NaNs.
+        blocksize : int, default 1024
+            Number of rows in a full block.
+        latency : float, default 100
+            Longest time, in milliseconds, that a row waits to be
+            delivered. If a block is not full this long after its first
+            row arrived, it is delivered with the rows it has.
+        queuesize : int, default 16
+            Maximum number of blocks waiting for the consumer.
+        policy : str, default "block"
+            What to do when the queue is full. If "block", reading
+            waits until the consumer takes a block, so no data are lost
+            as long as the device's buffers do not overflow. If "drop",
+            the oldest queued block is discarded.
+        timestamps : bool, default False
+            If True, iteration yields tuples `(host_times, block)`,
+            where `host_times` is a 1D Numpy array of the estimated
+            arrival time of each row in nanoseconds since the epoch.
+        acquisition : str, default "async"
+            If "async", data are read and parsed in a background thread.
+            If "process", they are read and parsed in a worker process,
+            as in the dashboard.
+        handshake : bool, default True
+            If True, handshake with the device on connecting, discarding
+            anything in its input buffer.
+        """
+        options._check_baudrate(baudrate)
+        options._check_maxcols(maxcols)
+        options._check_delimiter(delimiter)
+        options._check_acquisition(acquisition)
+        _check_positive("blocksize", blocksize)
+        _check_positive("queuesize", queuesize)
+        _check_policy(policy)
+
+        self.ncols = maxcols
+        self.delimiter = parsers._delimiter_convert(delimiter)
+        self.blocksize = blocksize
+        self.latency = latency
+        self.policy = policy
+        self.timestamps = timestamps
+
+        self.n_rows = 0
+        self.n_dropped = 0
+        self.parse_errors = parsers.ParseErrors()
+
+        self._queue = queue.Queue(maxsize=queuesize)
+        self._stop = threading.Event()
+        self._error = None
+
+        self.serial_connection = connection.SerialConnection(
+            baudrate=baudrate, acquisition=acquisition
+        )
+        self.serial_connection.connect(port, handshake=handshake)
+
+        # Do not wait on the port for longer than the latency
+        timeout = min(latency, 50) / 1000
+
+        if acquisition == "process" and not isinstance(
+            self.serial_connection.ser, replay.ReplaySerial
+        ):
+            self.serial_connection.ser.close()
+            self.serial_connection.ser = worker.WorkerSerial(
+                self.serial_connection.port,
+                baudrate=baudrate,
+                bytesize=self.serial_connection.bytesize,
+                parity=self.serial_connection.parity,
+                stopbits=self.serial_connection.stopbits,
+                delimiter=self.delimiter,
+                ncols=maxcols,
+                timeout=timeout,
+            )
+        else:
+            self.serial_connection.ser.timeout = timeout
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _rows_from_port(self, state):
+        """Read and parse available data from the port."""
+        ser = self.serial_connection.ser
+
+        raw = ser.read(max(1, ser.in_waiting))
+        t_read = time.monotonic_ns() + state["wall_offset"]
+
+        if len(raw) == 0:
+            return None, None
+
+        # Hold data until the delimiter is found from the first lines
+        if self.delimiter == "auto":
+            delimiter = parsers.sniff_delimiter(state["read_buffer"] + raw)
+            if delimiter is None:
+                state["read_buffer"] += raw
+                return None, None
+
+            self.delimiter = parsers._delimiter_convert(delimiter)
+
+        # Lines that do not parse cleanly are accounted for
+        try:
+            buffer = state["read_buffer"] + raw
+            data, _, state["read_buffer"] = parsers.parse_read(
+                buffer, sep=self.delimiter, errors=self.parse_errors
+            )
+        except:
+            self.parse_errors.record("chunk", raw)
+            return None, None
+
+        if len(data) == 0:
+            return None, None
+
+        host_times = comms.line_timestamps(buffer, t_read, state["byte_time"])
+        if len(host_times) != len(data):
+            host_times = np.full(len(data), t_read, dtype=np.int64)
+
+        return capture._as_rows(data, self.ncols, np.float64), host_times
+
+    def _rows_from_worker(self, state):
+        """Take parsed rows and accounting of parse errors from the
+        worker process."""
+        ser = self.serial_connection.ser
+        records, state["count"], _ = ser.rows.read(state["count"])
+
+        # Reports pile up in the worker's queue unless they are taken
+        for report in ser.reports():
+            if report[0] == "errors":
+                self.parse_errors.merge(*report[1:])
+
+        if len(records["rows"]) == 0:
+            time.sleep(min(self.latency, 50) / 1000)
+            return None, None
+
+        return records["rows"], records["stamps"]
+
+    def _run(self):
+        """Fill blocks and queue them; target of the reading thread."""
+        if isinstance(self.serial_connection.ser, worker.WorkerSerial):
+            read_rows = self._rows_from_worker
+            state = dict(count=self.serial_connection.ser.rows.count)
+        else:
+            read_rows = self._rows_from_port
+            state = dict(
+                read_buffer=b"",
+                wall_offset=time.time_ns() - time.monotonic_ns(),
+                byte_time=1e9
+                * comms.bits_per_byte(self.serial_connection)
+                / self.serial_connection.baudrate,
+            )
+
+        block, host_times = self._new_block()
+        n = 0
+        t_first = None
+
+        try:
+            while not self._stop.is_set():
+                rows, new_host_times = read_rows(state)
+
+                if rows is not None:
+                    if t_first is None:
+                        t_first = time.monotonic()
+
+                    self.n_rows += len(rows)
+
+                    i = 0
+                    while i < len(rows):
+                        k = min(self.blocksize - n, len(rows) - i)
+                        block[n : n + k] = rows[i : i + k]
+                        host_times[n : n + k] = new_host_times[i : i + k]
+                        n += k
+                        i += k
+
+                        if n == self.blocksize:
+                            self._put(host_times, block)
+                            block, host_times = self._new_block()
+                            n = 0
+                            t_first = time.monotonic() if i < len(rows) else None
+
+                # Deliver a partial block that has waited long enough
+                if t_first is not None and time.monotonic() - t_first >= (
+                    self.latency / 1000
+                ):
+                    self._put(host_times[:n], block[:n])
+                    block, host_times = self._new_block()
+                    n = 0
+                    t_first = None
+        except Exception as e:
+            self._error = e
+        finally:
+            # Deliver what is left
+            if n > 0 and self._error is None:
+                self._put(host_times[:n], block[:n])
+
+    def _new_block(self):
+        return (
+            np.empty((self.blocksize, self.ncols)),
+            np.empty(self.blocksize, dtype=np.int64),
+        )
+
+    def _put(self, host_times, block):
+        """Queue a block according to the policy."""
+        item = (host_times, block) if self.timestamps else block
+
+        if self.policy == "block":
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+            # Closing; queue the block if there is room
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                pass
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        dropped = self._queue.get_nowait()
+                        if self.timestamps:
+                            dropped = dropped[1]
+                        self.n_dropped += len(dropped)
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        """Get the next block.
+
+        Parameters
+        ----------
+        timeout : float or None, default None
+            Longest time in seconds to wait for a block. If None, wait
+            until a block arrives or the stream ends.
+
+        Returns
+        -------
+        output : Numpy array, tuple, or None
+            The next block, or `(host_times, block)` if the stream was
+            created with `timestamps=True`. None if the stream has
+            ended or no block arrived within `timeout`.
+        """
+        t_end = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            try:
+                return self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._error is not None:
+                    error, self._error = self._error, None
+                    raise error
+
+                if not self._thread.is_alive() and self._queue.empty():
+                    return None
+
+                if t_end is not None and time.monotonic() >= t_end:
+                    return None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = self.get()
+        if item is None:
+            raise StopIteration
+
+        return item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_event_loop()
+        item = await loop.run_in_executor(None, self.get)
+        if item is None:
+            raise StopAsyncIteration
+
+        return item
+
+    def close(self):
+        """Stop reading and disconnect from the device.
+
+        Blocks already queued may still be taken.
+        """
+        self._stop.set()
+        self._thread.join()
+        self.serial_connection.disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def stream(
+    port,
+    baudrate=115200,
+    delimiter="comma",
+    maxcols=10,
+    blocksize=1024,
+    latency=100,
+    queuesize=16,
+    policy="block",
+    timestamps=False,
+    acquisition="async",
+    handshake=True,
+):
+    """Stream blocks of parsed data from a serial device without the
+    dashboard.
+
+    Parameters
+    ----------
+    port : str, int, or serial.tools.list_ports_common.ListPortInfo instance
+        Port to connect to, as for `SerialConnection.connect()`.
+    baudrate : int, default 115200
+        Baud rate of serial connection.
+    delimiter : str, default "comma"
+        Delimiter of data coming off of the board. Allowed values are
+        "comma", "space", "tab", "whitespace", "vertical line",
+        "semicolon", "asterisk", "slash", and "auto". If "auto", the
+        delimiter is detected from the first lines, and data are held
+        until it is.
+    maxcols : int, default 10
+        Number of columns of each block.
+    blocksize : int, default 1024
+        Number of rows in a full block.
+    latency : float, default 100
+        Longest time, in milliseconds, that a row waits before its
+        block is delivered, full or not.
+    queuesize : int, default 16
+        Maximum number of blocks waiting for the consumer.
+    policy : str, default "block"
+        What to do when the queue is full, either "block" to wait for
+        the consumer or "drop" to discard the oldest queued block.
+    timestamps : bool, default False
+        If True, yield tuples `(host_times, block)` with the estimated
+        arrival time of each row in nanoseconds since the epoch.
+    acquisition : str, default "async"
+        If "async", data are read and parsed in a background thread. If
+        "process", they are read and parsed in a worker process.
+    handshake : bool, default True
+        If True, handshake with the device on connecting.
+
+    Returns
+    -------
+    output : Stream instance
+        Iterator and asynchronous iterator over blocks, each a 2D Numpy
+        array of shape `(n_rows, maxcols)`.
+    """
+    return Stream(
+        port,
+        baudrate=baudrate,
+        delimiter=delimiter,
+        maxcols=maxcols,
+        blocksize=blocksize,
+        latency=latency,
+        queuesize=queuesize,
+        policy=policy,
+        timestamps=timestamps,
+        acquisition=acquisition,
+        handshake=handshake,
+    )
@@ -0,0 +1,222 @@
+import numpy as np
+
+allowed_trigger_modes = ("off", "auto", "normal", "single")
+allowed_trigger_edges = ("rising", "falling")
+
+
+class Trigger(object):
+    """Oscilloscope-style capture of frames around threshold crossings.
+
+    Each block of new rows is searched for crossings of `level` on one
+    column at once, with Numpy, rather than row by row. The last `pre`
+    rows are kept between blocks, so a frame may start before the block
+    in which its trigger occurred. A frame is the `pre` rows before a
+    trigger, the row of the trigger, and the `post - 1` rows after it.
+    Crossings within a frame that is being captured are ignored.
+
+    Attributes
+    ----------
+    column : int
+        Column of the plotted data the trigger watches.
+    edge : str
+        Either "rising" or "falling".
+    level : float
+        Threshold that triggers a capture when it is crossed.
+    pre : int
+        Number of rows before the trigger in each frame.
+    post : int
+        Number of rows from the trigger on in each frame.
+    mode : str
+        "normal" to capture every trigger, "single" to capture one
+        trigger and then wait until `arm()` is called, or "auto" to also
+        capture untriggered frames when no trigger has occurred in the
+        last `pre + post` rows.
+    armed : bool
+        Whether a capture will be made on the next trigger.
+    n_frames : int
+        Number of triggered frames captured.
+    """
+
+    def __init__(
+        self, column, edge="rising", level=0.0, pre=100, post=300, mode="normal"
+    ):
+        """Set up a trigger.
+
+        Parameters
+        ----------
+        column : int
+            Column of the plotted data to watch.
+        edge : str, default "rising"
+            Trigger on a "rising" or "falling" crossing of `level`.
+        level : float, default 0.0
+            Threshold.
+        pre : int, default 100
+            Number of rows before the trigger in each frame.
+        post : int, default 300
+            Number of rows from the trigger on in each frame.
+        mode : str, default "normal"
+            One of "auto", "normal", or "single".
+        """
+        if edge not in allowed_trigger_edges:
+            raise RuntimeError(
+                f'Trigger edge "{edge}" is not allowed. Must be either "rising" or "falling".'
+            )
+
+        if mode not in allowed_trigger_modes[1:]:
+            raise RuntimeError(
+                f'Trigger mode "{mode}" is not allowed. Must be either "auto", "normal", or "single".'
+            )
+
+        if pre < 0 or post < 1:
+            raise RuntimeError(
+                "Trigger must have a nonnegative number of rows before the trigger and a positive number after it."
+            )
+
+        self.column = column
+        self.edge = edge
+        self.level = level
+        self.pre = pre
+        self.post = post
+        self.mode = mode
+        self.reset()
+
+    def reset(self):
+        """Forget all previous rows and arm the trigger."""
+        self.armed = True
+        self.n_frames = 0
+        self._forget_rows()
+
+    def _forget_rows(self, n_cols=0):
+        """Forget the rows kept between blocks, keeping the state of
+        arming and the count of frames."""
+        # Rows kept between blocks
+        self._t = np.array([])
+        self._y = np.empty((0, n_cols))
+
+        # Index in the kept rows of the first row not yet searched for
+        # a trigger, and of a trigger waiting for its post-trigger rows
+        self._search = 0
+        self._pending = None
+
+        # Rows since the last frame, for auto mode
+        self._since_frame = 0
+
+    def arm(self):
+        """Arm the trigger, e.g., for another capture in single mode."""
+        self.armed = True
+
+    def _crossings(self, start):
+        """Indices of triggers in the kept rows from `start` on."""
+        if self._y.shape[1] <= self.column:
+            return np.array([], dtype=int)
+
+        # Include the row before to catch a crossing at `start`
+        first = max(start - 1, 0)
+        x = self._y[first:, self.column]
+
+        with np.errstate(invalid="ignore"):
+            if self.edge == "rising":
+                crossed = (x[:-1] < self.level) & (x[1:] >= self.level)
+            else:
+                crossed = (x[:-1] > self.level) & (x[1:] <= self.level)
+
+        return np.flatnonzero(crossed) + first + 1
+
+    def _frame(self, i_trigger):
+        """Rows of the frame around the trigger at `i_trigger`, with
+        times relative to the trigger."""
+        start = max(i_trigger - self.pre, 0)
+        end = i_trigger + self.post
+
+        return (
+            self._t[start:end] - self._t[i_trigger],
+            self._y[start:end],
+        )
+
+    def process(self, t, y):
+        """Search new rows for triggers and capture frames.
+
+        Parameters
+        ----------
+        t : Numpy array
+            Time of each new row.
+        y : 2D Numpy array
+            Plotted data of the new rows.
+
+        Returns
+        -------
+        frames : list of tuples
+            `(t, y, triggered)` of each frame completed by the new rows,
+            oldest first. Times are relative to the trigger. `triggered`
+            is False for the untriggered frames of auto mode.
+        """
+        if len(t) == 0:
+            return []
+
+        # Kept rows of another width cannot be matched with new ones
+        if self._y.shape[1] != y.shape[1]:
+            self._forget_rows(y.shape[1])
+
+        self._t = np.concatenate((self._t, t))
+        self._y = np.concatenate((self._y, y))
+        self._since_frame += len(t)
+
+        frames = []
+        n = len(self._t)
+
+        crossings = None
+        while self.armed:
+            if self._pending is None:
+                # Search once; later frames take crossings past the last
+                if crossings is None:
+                    crossings = self._crossings(self._search)
+
+                i = np.searchsorted(crossings, self._search)
+                if i == len(crossings):
+                    self._search = n
+                    break
+
+                self._pending = int(crossings[i])
+
+            if n - self._pending < self.post:
+                break
+
+            frames.append(self._frame(self._pending) + (True,))
+            self.n_frames += 1
+            self._since_frame = n - self._pending - self.post
+            self._search = self._pending + self.post
+            self._pending = None
+
+            if self.mode == "single":
+                self.armed = False
+
+        # Rows arriving while disarmed are never searched
+        if not self.armed:
+            self._search = n
+
+        # Show what is arriving when there is nothing to trigger on
+        if (
+            self.mode == "auto"
+            and len(frames) == 0
+            and self._pending is None
+            and self._since_frame >= self.pre + self.post
+        ):
+            i = max(n - self.post, 0)
+            frames.append(self._frame(i) + (False,))
+            self._since_frame = 0
+
+        # Keep only the rows that a future frame may need
+        if self._pending is not None:
+            keep = self._pending - self.pre
+        else:
+            keep = self._search - self.pre - 1
+
+        keep = min(max(keep, 0), max(n - self.pre - 1, 0))
+        if keep > 0:
+            self._t = self._t[keep:]
+            self._y = self._y[keep:]
+            self._search = max(self._search - keep, 0)
+            if self._pending is not None:
+                self._pending -= keep
+
+        return frames
@@ -0,0 +1,476 @@
+import multiprocessing
+import queue
+import time
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import serial
+
+from . import capture
+from . import comms
+from . import parsers
+
+# Bytes at the start of a ring holding the count of records written,
+# padded so that the arrays after it are aligned
+_count_size = 64
+
+
+class SharedRing(object):
+    """Ring buffer of records in shared memory.
+
+    A ring has a single writer and a single reader, which may be in
+    different processes. Each record has one or more fields, each held
+    in its own Numpy array in the shared memory block. The only shared
+    state besides the records is the total number of records ever
+    written, which the writer updates after the records are in place,
+    so no data are pickled or sent through pipes.
+
+    Attributes
+    ----------
+    capacity : int
+        Number of records the ring holds before the oldest are
+        overwritten.
+    fields : dict
+        Shape of a single record (a tuple) and dtype of each field,
+        keyed by field name.
+    shm : multiprocessing.shared_memory.SharedMemory instance
+        Shared memory block holding the ring.
+    arrays : dict
+        Numpy array of each field, of shape `(capacity,) + shape`.
+    """
+
+    def __init__(self, capacity, fields, name=None):
+        """Create a ring, or attach to an existing one.
+
+        Parameters
+        ----------
+        capacity : int
+            Number of records the ring holds.
+        fields : dict
+            Shape of a single record, as a tuple, and dtype of each
+            field, keyed by field name, e.g.,
+            `dict(rows=((10,), np.float64), stamps=((), np.int64))`.
+        name : str or None, default None
+            Name of the shared memory block of an existing ring to
+            attach to. If None, a new block is created.
+        """
+        self.capacity = capacity
+        self.fields = fields
+
+        sizes = [
+            capacity * int(np.prod(shape)) * np.dtype(dtype).itemsize
+            for shape, dtype in fields.values()
+        ]
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=_count_size + sum(sizes)
+            )
+            self._owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+
+        self._count = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        if self._owner:
+            self._count[0] = 0
+
+        self.arrays = dict()
+        offset = _count_size
+        for (field, (shape, dtype)), size in zip(fields.items(), sizes):
+            self.arrays[field] = np.ndarray(
+                (capacity,) + tuple(shape),
+                dtype=dtype,
+                buffer=self.shm.buf,
+                offset=offset,
+            )
+            offset += size
+
+    @property
+    def spec(self):
+        """Arguments needed to attach to the ring from another process."""
+        return self.capacity, self.fields, self.shm.name
+
+    @property
+    def count(self):
+        """Total number of records written to the ring."""
+        return int(self._count[0])
+
+    def write(self, **records):
+        """Write records to the ring.
+
+        Parameters
+        ----------
+        records : Numpy arrays
+            Records for each field, all of the same length. If there
+            are more records than the capacity, only the last
+            `capacity` are kept.
+        """
+        n_new = len(next(iter(records.values())))
+        if n_new == 0:
+            return
+
+        count = self.count
+        skip = max(n_new - self.capacity, 0)
+        inds = np.arange(count + skip, count + n_new) % self.capacity
+
+        for field, values in records.items():
+            self.arrays[field][inds] = values[skip:]
+
+        # Publish the records only once they are in place
+        self._count[0] = count + n_new
+
+    def read(self, start):
+        """Read records written since a given count.
+
+        Parameters
+        ----------
+        start : int
+            Count of records already read, as returned by a previous
+            call.
+
+        Returns
+        -------
+        records : dict
+            Copies of the records of each field.
+        count : int
+            Count of records read, to be passed as `start` to the next
+            call.
+        n_lost : int
+            Number of records that were overwritten before they could
+            be read.
+        """
+        count = self.count
+        n_lost = max(count - self.capacity - start, 0)
+        start += n_lost
+
+        inds = np.arange(start, count) % self.capacity
+        records = {field: array[inds] for field, array in self.arrays.items()}
+
+        # Discard records the writer overwrote while we were copying
+        overwritten = max(self.count - self.capacity - start, 0)
+        if overwritten > 0:
+            records = {field: array[overwritten:] for field, array in records.items()}
+            n_lost += min(overwritten, count - start)
+
+        return records, count, n_lost
+
+    def close(self):
+        """Detach from the ring, freeing it if this is the creator."""
+        self.arrays = dict()
+        self._count = None
+        self.shm.close()
+
+        if self._owner:
+            self.shm.unlink()
+
+
+def _run(
+    port,
+    settings,
+    delimiter,
+    ncols,
+    autocolumns,
+    row_spec,
+    raw_spec,
+    chunk_spec,
+    control,
+    reports,
+    stop,
+):
+    """Read and parse serial data, writing them to shared rings.
+
+    This is the target of the worker process. Parse errors and changes
+    of the detected columns are reported through the `reports` queue.
+    """
+    ser = serial.Serial(port=port, **settings)
+    rows_ring = SharedRing(*row_spec)
+    raw_ring = SharedRing(*raw_spec)
+    chunk_ring = SharedRing(*chunk_spec)
+
+    errors = parsers.ParseErrors()
+    layout = parsers.ColumnLayout() if autocolumns else None
+    layout_reported = 0
+
+    # Wall-clock time is monotonic time plus a fixed offset
+    wall_offset = time.time_ns() - time.monotonic_ns()
+    byte_time = 1e9 * comms.bits_per_byte(ser) / ser.baudrate
+
+    read_buffer = b""
+    try:
+        while not stop.is_set():
+            # Requests from the dashboard
+            while True:
+                try:
+                    request, arg = control.get_nowait()
+                except queue.Empty:
+                    break
+
+                if request == "write":
+                    ser.write(arg)
+                elif request == "delimiter":
+                    delimiter = arg
+
+            # Block for at most the timeout of the port
+            raw = ser.read(max(1, ser.in_waiting))
+            t_monotonic = time.monotonic_ns()
+            t_read = t_monotonic + wall_offset
+
+            if len(raw) == 0:
+                continue
+
+            # The end of each chunk in the raw ring and when it was read
+            raw_ring.write(raw=np.frombuffer(raw, dtype=np.uint8))
+            chunk_ring.write(
+                end=np.array([raw_ring.count]), t=np.array([t_monotonic])
+            )
+
+            # Hold data until the delimiter is found from the first lines
+            if delimiter == "auto":
+                sniffed = parsers.sniff_delimiter(read_buffer + raw)
+                if sniffed is None:
+                    read_buffer += raw
+                    continue
+
+                delimiter = parsers._delimiter_convert(sniffed)
+
+            # Parse it; lines that do not parse cleanly are accounted for
+            try:
+                buffer = read_buffer + raw
+                data, _, read_buffer = parsers.parse_read(
+                    buffer, sep=delimiter, errors=errors, layout=layout
+                )
+
+                if len(data) > 0:
+                    t_lines = comms.line_timestamps(buffer, t_read, byte_time)
+
+                    # Fall back to time of read if lines were skipped
+                    if len(t_lines) != len(data):
+                        t_lines = np.full(len(data), t_read, dtype=np.int64)
+
+                    rows_ring.write(
+                        rows=capture._as_rows(data, ncols, np.float64),
+                        stamps=t_lines,
+                    )
+            except Exception:
+                errors.record("chunk", raw)
+
+            # Only errors since the last report are sent
+            if errors.n_errors > 0:
+                reports.put(("errors", errors.counts, list(errors.quarantine)))
+                errors.reset()
+
+            if layout is not None and layout.n_changes != layout_reported:
+                layout_reported = layout.n_changes
+                reports.put(("layout", layout.format, layout.labels, layout.n_cols))
+    finally:
+        ser.close()
+        rows_ring.close()
+        raw_ring.close()
+        chunk_ring.close()
+
+
+class WorkerSerial(object):
+    """Stand-in for a serial.Serial instance whose port is read and
+    parsed in a separate worker process.
+
+    The worker writes parsed rows, with the host timestamp of each, to
+    one shared ring and the raw bytes read to another, so that only
+    ring counts cross the process boundary. Data sent to the device and
+    changes of delimiter are passed to the worker through a queue, and
+    parse errors and the columns detected in the data are passed back
+    through another, to be taken with `reports()`.
+
+    Attributes
+    ----------
+    port : str
+        Name of the port.
+    rows : SharedRing instance
+        Ring of parsed rows, with fields `rows` (NaN-padded to `ncols`
+        columns) and `stamps` (host times in nanoseconds since the
+        epoch).
+    raw : SharedRing instance
+        Ring of raw bytes read, with field `raw`.
+    chunks : SharedRing instance
+        Ring of the chunks of raw bytes read at once, with fields `end`
+        (count of raw bytes written up to the end of the chunk) and `t`
+        (host monotonic time in nanoseconds at which it was read).
+    process : multiprocessing.Process instance
+        The worker process.
+    is_open : bool
+        True until `close()` is called.
+    n_lost : int
+        Number of parsed rows overwritten in the ring before the
+        dashboard read them.
+    """
+
+    def __init__(
+        self,
+        port,
+        baudrate=115200,
+        bytesize=8,
+        parity="N",
+        stopbits=1,
+        delimiter=",",
+        ncols=10,
+        autocolumns=False,
+        timeout=0.02,
+        capacity=65536,
+        raw_capacity=1048576,
+        chunk_capacity=65536,
+    ):
+        """Start a worker reading from a port.
+
+        Parameters
+        ----------
+        port : str
+            Name of the port, as for `serial.Serial()`. The port must
+            not be open in this process.
+        baudrate, bytesize, parity, stopbits
+            Settings of the connection, as for `serial.Serial()`.
+        delimiter : str, default ","
+            Delimiter of the data, as for `parsers.parse_read()`, or
+            "auto" to find it from the first lines of data.
+        ncols : int, default 10
+            Number of columns of the parsed rows.
+        autocolumns : bool, default False
+            If True, header lines and `key:value` or `key=value` lines
+            are detected with a `parsers.ColumnLayout`, as in the
+            dashboard process. Columns beyond `ncols` are dropped.
+        timeout : float, default 0.02
+            Longest time in seconds the worker waits for data before
+            checking for requests from the dashboard.
+        capacity : int, default 65536
+            Number of parsed rows the ring holds.
+        raw_capacity : int, default 1048576
+            Number of raw bytes the ring holds.
+        chunk_capacity : int, default 65536
+            Number of chunks of raw bytes whose read times the ring
+            holds.
+        """
+        self.port = port
+        self.n_lost = 0
+
+        self.rows = SharedRing(
+            capacity, dict(rows=((ncols,), np.float64), stamps=((), np.int64))
+        )
+        self.raw = SharedRing(raw_capacity, dict(raw=((), np.uint8)))
+        self.chunks = SharedRing(
+            chunk_capacity, dict(end=((), np.int64), t=((), np.int64))
+        )
+
+        # Raw bytes read from the ring that no chunk has covered yet
+        self._raw_count = 0
+        self._chunk_count = 0
+        self._pending = b""
+        self._pending_start = 0
+
+        # Spawn rather than fork, since the dashboard runs an event loop
+        ctx = multiprocessing.get_context("spawn")
+        self._control = ctx.Queue()
+        self._reports = ctx.Queue()
+        self._stop = ctx.Event()
+
+        settings = dict(
+            baudrate=baudrate,
+            bytesize=bytesize,
+            parity=parity,
+            stopbits=stopbits,
+            timeout=timeout,
+        )
+        self.process = ctx.Process(
+            target=_run,
+            args=(
+                port,
+                settings,
+                delimiter,
+                ncols,
+                autocolumns,
+                self.rows.spec,
+                self.raw.spec,
+                self.chunks.spec,
+                self._control,
+                self._reports,
+                self._stop,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+        self.is_open = True
+
+    def write(self, data):
+        """Send bytes to the device."""
+        self._control.put(("write", bytes(data)))
+
+    def set_delimiter(self, delimiter):
+        """Change the delimiter used to parse the data."""
+        self._control.put(("delimiter", delimiter))
+
+    def read_chunks(self):
+        """Chunks of raw bytes read by the worker since the last call,
+        with the times they were read.
+
+        Returns
+        -------
+        output : list of tuples
+            `(raw, t)` for each chunk, oldest first, where `t` is the
+            host monotonic time in nanoseconds at which the worker read
+            `raw`. Bytes overwritten in the ring before they could be
+            taken are missing.
+        """
+        # Chunks are published after their bytes, so reading the chunks
+        # first leaves no chunk without its bytes
+        chunks, self._chunk_count, _ = self.chunks.read(self._chunk_count)
+        raw, self._raw_count, _ = self.raw.read(self._raw_count)
+        raw = raw["raw"].tobytes()
+
+        start = self._raw_count - len(raw)
+        if start != self._pending_start + len(self._pending):
+            self._pending = b""
+            self._pending_start = start
+        self._pending += raw
+
+        output = []
+        for end, t in zip(chunks["end"], chunks["t"]):
+            n = int(end) - self._pending_start
+            if n > 0:
+                output.append((self._pending[:n], int(t)))
+                self._pending = self._pending[n:]
+                self._pending_start = int(end)
+
+        return output
+
+    def reports(self):
+        """Reports from the worker since the last call, oldest first.
+
+        Returns
+        -------
+        output : list of tuples
+            `("errors", counts, quarantine)` with the parse errors since
+            the previous report, as for `parsers.ParseErrors.merge()`,
+            or `("layout", format, labels, n_cols)` with the columns
+            detected in the data, as for `parsers.ColumnLayout.adopt()`.
+        """
+        reports = []
+        while True:
+            try:
+                reports.append(self._reports.get_nowait())
+            except queue.Empty:
+                return reports
+
+    def close(self):
+        """Stop the worker and free the rings."""
+        if not self.is_open:
+            return
+
+        self._stop.set()
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+
+        self.rows.close()
+        self.raw.close()
+        self.chunks.close()
+        self.is_open = False